@@ -0,0 +1,155 @@
+"""
+Overload test for admission control in src/python/server.py: a burst of
+concurrent /api/generate-day-itinerary requests, far beyond what the
+upstream can serve, with admission control off and on.
+
+The FastAPI app runs in-process behind httpx's ASGI transport, with
+stub_upstream as the model. --upstream-concurrency caps how many completions
+the stub serves at once, like an upstream rate limit. Each request carries
+the trip's other days as existingDays, as the Node backend sends them.
+Reports the latency of served requests, how fast rejections come back,
+the most requests held inside the app at once, and peak Python heap
+(tracemalloc).
+
+    python benchmarks/bench_admission.py [--requests 1500] [--upstream-concurrency 8] [--max-in-flight 8] [--max-queued 16]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tracemalloc
+import importlib.util
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ["PREWARM_DAY_ITINERARIES"] = "false"
+os.environ["AI_HEDGE_ENABLED"] = "false"
+os.environ["AI_BREAKER_ENABLED"] = "false"
+
+import httpx
+
+from stub_upstream import StubOpenAI, synth_day
+
+
+def load_app(max_in_flight: int, max_queued: int, queue_timeout: float):
+    os.environ["ADMISSION_MAX_IN_FLIGHT"] = str(max_in_flight)
+    os.environ["ADMISSION_MAX_QUEUED"] = str(max_queued)
+    os.environ["ADMISSION_QUEUE_TIMEOUT_SECONDS"] = str(queue_timeout)
+    # Loaded from its path: importing it as "server" would shadow the src/server package
+    spec = importlib.util.spec_from_file_location("itinerai_api", os.path.join(ROOT, "src", "python", "server.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class LimitedStub(StubOpenAI):
+    """Stub upstream that serves at most `concurrency` completions at once."""
+
+    def __init__(self, concurrency: int, **kwargs):
+        super().__init__(**kwargs)
+        slots = asyncio.Semaphore(concurrency)
+        create = self.chat.completions.create
+
+        async def limited_create(**request):
+            async with slots:
+                return await create(**request)
+
+        self.chat.completions.create = limited_create
+
+
+def day_request(index: int) -> dict:
+    return {
+        "dayNumber": 4,
+        "tripData": {
+            "tripId": f"bench-{index}",
+            "destination": "Paris",
+            "startDate": "2025-06-01",
+            "endDate": "2025-06-07",
+            "budget": 3000,
+            "preferences": {"activities": ["museums", "food"], "dietaryRestrictions": ["vegetarian"]},
+            "existingDays": [synth_day(day) for day in (1, 2, 3, 5, 6, 7)],
+        },
+    }
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)] if ordered else 0.0
+
+
+async def burst(module, count: int, upstream_concurrency: int, time_scale: float):
+    module.ai_service.openai_client = LimitedStub(upstream_concurrency, time_scale=time_scale)
+    inside = {"now": 0, "peak": 0}
+    run = module.ai_service.run_request
+
+    async def counted_run(*args, **kwargs):
+        inside["now"] += 1
+        inside["peak"] = max(inside["peak"], inside["now"])
+        try:
+            return await run(*args, **kwargs)
+        finally:
+            inside["now"] -= 1
+
+    module.ai_service.run_request = counted_run
+    bodies = [day_request(i) for i in range(count)]
+
+    async def one(client, body):
+        start = time.perf_counter()
+        response = await client.post("/api/generate-day-itinerary", json=body)
+        return response.status_code, time.perf_counter() - start
+
+    transport = httpx.ASGITransport(app=module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        tracemalloc.start()
+        results = await asyncio.gather(*[one(client, body) for body in bodies])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        big = {"tripPreferences": {"notes": "x" * (8 * 1024 * 1024)}}
+        start = time.perf_counter()
+        too_large = await client.post("/api/generate-travel-plan", json=big)
+        too_large_ms = (time.perf_counter() - start) * 1000
+    return results, peak, inside["peak"], too_large.status_code, too_large_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1500)
+    parser.add_argument("--upstream-concurrency", type=int, default=8)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--max-queued", type=int, default=16)
+    parser.add_argument("--queue-timeout", type=float, default=30)
+    parser.add_argument("--time-scale", type=float, default=0.1)
+    args = parser.parse_args()
+
+    module = load_app(args.max_in_flight, args.max_queued, args.queue_timeout)
+
+    print(
+        f"{'admission':<9} | {'200':>5} {'503':>5} {'error':>5} | {'served p50 s':>12} {'p99 s':>7} | "
+        f"{'503 p50 ms':>10} | {'peak in app':>11} | {'peak heap MiB':>13} | {'8 MiB body':>12}"
+    )
+    for enabled in (False, True):
+        module.admission.enabled = enabled
+        # Keep the service's per-request prints out of the table
+        with redirect_stdout(sys.stderr):
+            results, peak, inside, too_large, too_large_ms = asyncio.run(
+                burst(module, args.requests, args.upstream_concurrency, args.time_scale)
+            )
+        served = [seconds for status, seconds in results if status == 200]
+        rejected = [seconds for status, seconds in results if status == 503]
+        errors = len(results) - len(served) - len(rejected)
+        print(
+            f"{'on' if enabled else 'off':<9} | {len(served):>5} {len(rejected):>5} {errors:>5} | "
+            f"{percentile(served, 50):>12.2f} {percentile(served, 99):>7.2f} | "
+            f"{percentile(rejected, 50) * 1000:>10.1f} | {inside:>11} | {peak / 2**20:>13.1f} | "
+            f"{too_large} {too_large_ms:>5.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Microbenchmarks for the CPU-bound hot paths of the Python AI service:
+the trip-plan and day-itinerary prompt builders, the response parser over
+the response corpus in benchmarks/corpus/, and the itinerary transform in
+migrations/001_update_trip_schema.py.
+
+Each case reports operations per second and the peak memory allocated by
+one call (tracemalloc). The last section records a trip plan and a day
+itinerary from the stub upstream to cassettes, replays them twice with a
+fresh AIService and checks the results are identical.
+
+    python benchmarks/bench_hot_paths.py [--min-time 0.5] [--skip-replay]
+"""
+
+import io
+import os
+import sys
+import glob
+import json
+import timeit
+import asyncio
+import argparse
+import tempfile
+import importlib.util
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from server.ai_service import AIService
+from server.cassettes import CassetteClient
+from stub_upstream import StubOpenAI
+
+
+def load_migration():
+    # The module name starts with a digit, so it cannot be imported normally.
+    path = os.path.join(SRC_DIR, "server", "migrations", "001_update_trip_schema.py")
+    spec = importlib.util.spec_from_file_location("update_trip_schema", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def trip_for(days: int) -> dict:
+    # One stop per three days, so longer trips also have more destinations
+    cities = [
+        ("Paris", ["Louvre"]),
+        ("Lyon", ["Old Lyon"]),
+        ("Nice", ["Promenade des Anglais"]),
+        ("Marseille", ["Vieux-Port"]),
+        ("Bordeaux", ["Place de la Bourse"]),
+        ("Strasbourg", ["Petite France"]),
+        ("Annecy", ["Lake Annecy"]),
+    ]
+    stops = cities[:max(1, min(len(cities), days // 3))]
+    per_stop = max(1, days // len(stops))
+
+    def day(offset: int) -> str:
+        return (datetime(2025, 6, 1) + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+    return {
+        "destination": "France",
+        "startDate": "2025-06-01",
+        "endDate": (datetime(2025, 6, 1) + timedelta(days=days - 1)).strftime("%Y-%m-%d"),
+        "budget": 6000,
+        "departureLocation": "New York",
+        "travelers": 2,
+        # Consecutive stays in the shape the Trip model stores; the last runs to the end of the trip
+        "destinations": [
+            {
+                "location": stop,
+                "startDate": day(min(days - 1, i * per_stop)),
+                "endDate": day(days - 1 if i == len(stops) - 1 else min(days - 1, (i + 1) * per_stop - 1)),
+                "placesToVisit": places,
+            }
+            for i, (stop, places) in enumerate(stops)
+        ],
+        "preferences": {
+            "activities": ["museums", "food", "hiking"],
+            "accommodationType": "hotel",
+            "transportationType": "train",
+            "dietaryRestrictions": ["vegetarian"],
+            "placesToVisit": ["Louvre", "Old Lyon", "Promenade des Anglais"],
+        },
+        "existingDays": [
+            {"day": 1, "activities": [{"name": "Louvre"}], "meals": [{"restaurant": "Le Procope"}]},
+        ],
+    }
+
+
+def legacy_trip(days: int, activities_per_day: int = 4) -> dict:
+    start = datetime(2025, 6, 1, 9)
+    return {
+        "_id": f"trip-{days}",
+        "itinerary": {
+            "flights": [{"airline": "Air France", "price": 650, "departureTime": start, "arrivalTime": start}],
+            "accommodations": [{"name": "Hotel Le Marais", "price": 1800, "location": "Paris"}],
+            "activities": [
+                {
+                    "name": f"Activity {day}-{i}",
+                    "date": start + timedelta(days=day),
+                    "time": "10:00 AM",
+                    "location": "Paris",
+                    "price": 20,
+                    "duration": "2 hours",
+                    "description": "Guided visit",
+                }
+                for day in range(days)
+                for i in range(activities_per_day)
+            ],
+            "transportation": [
+                {"type": "Metro", "from": "Hotel", "to": "Museum", "price": 4, "duration": "20 minutes",
+                 "departureTime": start + timedelta(days=day)}
+                for day in range(days)
+            ],
+        },
+    }
+
+
+def measure(fn, min_time: float) -> dict:
+    """Ops/sec over at least min_time seconds, and peak bytes allocated by one call."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    repeat = max(1, int(min_time / max(timer.timeit(number) / number, 1e-9) / number))
+    elapsed = timer.timeit(number * repeat)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"ops_per_sec": number * repeat / elapsed, "peak_kib": (peak - baseline) / 1024}
+
+
+def print_row(name: str, result: dict, note: str = ""):
+    print(f"{name:<40} {result['ops_per_sec']:>12,.0f} {result['peak_kib']:>10.1f}  {note}")
+
+
+def bench_prompts(service: AIService, min_time: float):
+    print(f"{'prompt builder':<40} {'ops/sec':>12} {'peak KiB':>10}")
+    for days in (3, 7, 14, 21):
+        trip = trip_for(days)
+        prompt = service._create_trip_plan_prompt(trip)
+        print_row(f"_create_trip_plan_prompt ({days} days)", measure(lambda: service._create_trip_plan_prompt(trip), min_time),
+                  f"{len(trip['destinations'])} destinations, {len(prompt)} chars")
+    for days in (3, 14):
+        trip = trip_for(days)
+        prompt = service._create_day_itinerary_prompt(trip, 2)
+        print_row(f"_create_day_itinerary_prompt ({days} days)",
+                  measure(lambda: service._create_day_itinerary_prompt(trip, 2), min_time), f"{len(prompt)} chars")
+    print()
+
+
+def bench_parser(service: AIService, min_time: float):
+    print(f"{'_parse_ai_response corpus file':<40} {'ops/sec':>12} {'peak KiB':>10}  outcome")
+    sink = io.StringIO()
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.txt"))):
+        with open(path) as f:
+            response = f.read()
+
+        def parse():
+            sink.seek(0)
+            with redirect_stdout(sink):
+                return service._parse_ai_response(response)
+
+        parsed = parse()
+        outcome = "fallback" if parsed.get("dailyItinerary") == [] and "dayItinerary" not in parsed else "parsed"
+        print_row(os.path.basename(path), measure(parse, min_time), f"{outcome}, {len(response)} chars")
+    print()
+
+
+def bench_migration(min_time: float):
+    migration = load_migration()
+    print(f"{'migrate_trip':<40} {'ops/sec':>12} {'peak KiB':>10}")
+    for days in (3, 14, 30):
+        trip = legacy_trip(days)
+        # migrate_trip rewrites the document in place; work on a fresh shallow copy each call.
+        print_row(f"migrate_trip ({days} days)", measure(lambda: migration.migrate_trip(dict(trip)), min_time),
+                  f"{len(trip['itinerary']['activities'])} activities")
+    print()
+
+
+async def replay_check():
+    os.environ["PREWARM_DAY_ITINERARIES"] = "false"
+    os.environ["AI_HEDGE_ENABLED"] = "false"
+    trip = trip_for(7)
+
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = AIService()
+        recorder.openai_client = CassetteClient("record", directory, StubOpenAI(time_scale=0))
+        recorded = [await recorder.generate_trip_plan(trip), await recorder.generate_day_itinerary(trip, 3)]
+        cassettes = len(os.listdir(directory))
+
+        outputs = []
+        for _ in range(2):
+            service = AIService()
+            service.openai_client = CassetteClient("replay", directory)
+            outputs.append([await service.generate_trip_plan(trip), await service.generate_day_itinerary(trip, 3)])
+
+    canonical = [json.dumps(run, sort_keys=True, default=str) for run in [recorded] + outputs]
+    print(f"replay: {cassettes} cassettes recorded, replays identical to recording: {len(set(canonical)) == 1}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds to run each case")
+    parser.add_argument("--skip-replay", action="store_true")
+    args = parser.parse_args()
+
+    service = AIService()
+    bench_prompts(service, args.min_time)
+    bench_parser(service, args.min_time)
+    bench_migration(args.min_time)
+    if not args.skip_replay:
+        asyncio.run(replay_check())
+
+
+if __name__ == "__main__":
+    main()
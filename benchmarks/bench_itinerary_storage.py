@@ -0,0 +1,120 @@
+"""
+Trip document size, read latency and write throughput for the nested
+itinerary layout versus the compressed layout (DB_ITINERARY_STORAGE=compressed),
+by trip length.
+
+Without --mongo-uri only the client side is measured: BSON encoding for
+writes, BSON decoding for reads. With --mongo-uri, documents are also
+inserted into and read back from a scratch database, which is dropped
+afterwards.
+
+Itineraries come from stub_upstream.synth_trip_plan. Its text repeats more
+than real model output does, so treat the compression ratio as an upper
+bound.
+
+    python benchmarks/bench_itinerary_storage.py [--days 3 7 14 21] [--mongo-uri mongodb://localhost:27017]
+"""
+
+import os
+import sys
+import time
+import timeit
+import argparse
+
+import bson
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.itinerary_codec import decode_trip, encode_itinerary
+from stub_upstream import synth_trip_plan
+
+
+def trip_document(days: int, compressed: bool) -> dict:
+    itinerary = synth_trip_plan(days)
+    itinerary["generatedFrom"] = {"destination": "Paris", "startDate": "2025-06-01"}
+    trip = {"user_id": "bench", "destination": "Paris", "destinations": [{"location": "Paris"}], "status": "planning"}
+    if compressed:
+        trip.update(encode_itinerary(itinerary, trip))
+    else:
+        trip["itinerary"] = itinerary
+    return trip
+
+
+def per_second(fn, runs: int) -> float:
+    return runs / timeit.timeit(fn, number=runs)
+
+
+def micros(fn, runs: int) -> float:
+    return timeit.timeit(fn, number=runs) / runs * 1e6
+
+
+def client_side(days: int, runs: int):
+    plain = trip_document(days, compressed=False)
+    itinerary = plain["itinerary"]
+    packed = trip_document(days, compressed=True)
+    plain_bytes, packed_bytes = bson.encode(plain), bson.encode(packed)
+
+    writes_plain = per_second(lambda: bson.encode({**plain, "itinerary": itinerary}), runs)
+    writes_packed = per_second(lambda: bson.encode({**plain, "itinerary": None, **encode_itinerary(itinerary, plain)}), runs)
+
+    read_plain = micros(lambda: bson.decode(plain_bytes)["itinerary"]["dailyItinerary"], runs)
+    read_summary = micros(lambda: decode_trip(bson.decode(packed_bytes))["itinerarySummary"]["totalCost"], runs)
+    read_full = micros(lambda: decode_trip(bson.decode(packed_bytes))["itinerary"]["dailyItinerary"], runs)
+
+    print(
+        f"{days:>4} | {len(plain_bytes):>9,} {len(packed_bytes):>9,} {len(packed_bytes) / len(plain_bytes):>6.1%} | "
+        f"{writes_plain:>9,.0f} {writes_packed:>9,.0f} | {read_plain:>8.1f} {read_summary:>8.1f} {read_full:>8.1f}"
+    )
+
+
+def against_mongo(uri: str, days_list, count: int):
+    from pymongo import MongoClient
+
+    client = MongoClient(uri)
+    db = client["itinerary_storage_bench"]
+    print(f"\nMongoDB round trips ({count} documents per layout)")
+    print(f"{'days':>4} | {'layout':<10} {'inserts/s':>9} {'find ms':>8} {'storage B':>10}")
+    try:
+        for days in days_list:
+            for layout in ("document", "compressed"):
+                collection = db[f"trips_{layout}_{days}"]
+                collection.drop()
+                docs = [trip_document(days, layout == "compressed") for _ in range(count)]
+
+                start = time.perf_counter()
+                ids = collection.insert_many(docs).inserted_ids
+                inserts = count / (time.perf_counter() - start)
+
+                start = time.perf_counter()
+                for _id in ids:
+                    trip = decode_trip(collection.find_one({"_id": _id}))
+                    trip["itinerary"]["dailyItinerary"]
+                find_ms = (time.perf_counter() - start) / count * 1000
+
+                storage = db.command("collStats", collection.name)["storageSize"]
+                print(f"{days:>4} | {layout:<10} {inserts:>9,.0f} {find_ms:>8.2f} {storage:>10,}")
+    finally:
+        client.drop_database(db.name)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[3, 7, 14, 21])
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--mongo-uri", help="Also measure round trips against this server")
+    parser.add_argument("--documents", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'':>4} | {'BSON bytes':^26} | {'writes/s (encode)':^19} | {'read us (decode)':^26}")
+    print(f"{'days':>4} | {'nested':>9} {'compress':>9} {'ratio':>6} | {'nested':>9} {'compress':>9} | {'nested':>8} {'summary':>8} {'full':>8}")
+    for days in args.days:
+        client_side(days, args.runs)
+
+    if args.mongo_uri:
+        against_mongo(args.mongo_uri, args.days, args.documents)
+
+
+if __name__ == "__main__":
+    main()
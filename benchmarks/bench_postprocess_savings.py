@@ -0,0 +1,55 @@
+"""
+Output tokens and completion latency saved per trip by deriving totalCost,
+per-day dates and per-day accommodation locally instead of having the model
+write them, and the cost of the local post-processing that replaces them.
+
+Token counts use the stub's estimate (4 characters per token) on indented
+JSON; latency uses the stub's per-token decode time.
+
+    python benchmarks/bench_postprocess_savings.py [--days 3 5 7 10 14]
+"""
+
+import os
+import sys
+import json
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server.postprocess import postprocess_trip_plan
+from server.trip_spec import TripSpec
+from stub_upstream import StubOpenAI, estimate_tokens, synth_trip_plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[3, 5, 7, 10, 14])
+    args = parser.parse_args()
+
+    seconds_per_token = StubOpenAI().seconds_per_token
+
+    print(f"{'days':>4} | {'before tok':>10} {'after tok':>9} {'saved':>6} {'saved %':>7} | {'latency saved s':>15} | {'postprocess ms':>14}")
+    for days in args.days:
+        before = estimate_tokens(json.dumps(synth_trip_plan(days, derived_fields=True), indent=2))
+        lean = synth_trip_plan(days, derived_fields=False)
+        after = estimate_tokens(json.dumps(lean, indent=2))
+
+        spec = TripSpec.from_trip_data({
+            "destination": "Paris",
+            "startDate": "2025-06-01",
+            "endDate": f"2025-06-{days:02d}",
+        })
+        runs = 200
+        postprocess_ms = timeit.timeit(lambda: postprocess_trip_plan(lean, spec), number=runs) / runs * 1000
+
+        saved = before - after
+        print(
+            f"{days:>4} | {before:>10} {after:>9} {saved:>6} {saved / before:>7.1%} | "
+            f"{saved * seconds_per_token:>15.1f} | {postprocess_ms:>14.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Prose-schema prompts versus structured output (AI_STRUCTURED_OUTPUT), for
+trip plans and single days: prompt tokens, the share of each prompt that is
+an identical (cacheable) prefix across trips, parse-failure rate and latency.
+
+Token counts come from the real prompts (4 characters per token). By
+default, failures and latency come from stub_upstream. In prose mode the
+stub returns free text, and --malformed-rate of those responses take one of
+the shapes in corpus/ that the parser rejects (truncated, trailing commas,
+braces in a preamble). In structured mode it returns bare schema-conforming
+JSON. With --live the runs go to the OpenAI API instead; that needs
+OPENAI_API_KEY and a model that supports json_schema response formats.
+
+    python benchmarks/bench_prompt_modes.py [--runs 40] [--malformed-rate 0.05] [--live --model gpt-4o-mini]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ["PREWARM_DAY_ITINERARIES"] = "false"
+os.environ["AI_HEDGE_ENABLED"] = "false"
+
+from server.ai_service import AIService
+from stub_upstream import StubOpenAI, estimate_tokens
+
+TRIPS = [
+    ("Paris", "New York", ["museums", "food"], ["vegetarian"]),
+    ("Tokyo", "San Francisco", ["temples", "shopping"], []),
+    ("Lisbon", "Boston", ["beaches", "nightlife"], ["gluten-free"]),
+    ("Mexico City", "Chicago", ["history", "street food"], ["vegan"]),
+]
+
+
+def trip_for(index: int) -> dict:
+    destination, departure, activities, diet = TRIPS[index % len(TRIPS)]
+    start_day = 1 + index % 20
+    return {
+        "tripId": f"bench-{index}",
+        "destination": destination,
+        "startDate": f"2025-07-{start_day:02d}",
+        "endDate": f"2025-07-{start_day + 2:02d}",
+        "budget": 2000 + 250 * index,
+        "departureLocation": departure,
+        "travelers": 1 + index % 3,
+        "preferences": {"activities": activities, "dietaryRestrictions": diet},
+    }
+
+
+def shared_prefix_tokens(prompts) -> int:
+    return estimate_tokens(os.path.commonprefix(prompts))
+
+
+def render_for(malformed_rate: float, rng: random.Random):
+    def render(response: dict, request: dict) -> str:
+        if request.get("response_format"):
+            return json.dumps(response)
+        text = json.dumps(response, indent=2)
+        if rng.random() < malformed_rate:
+            return rng.choice([
+                lambda t: t[: len(t) // 2],
+                lambda t: t.replace("]\n", "],\n", 1),
+                lambda t: "Prices are estimates {in USD}.\n" + t,
+            ])(text)
+        return rng.choice([text, f"```json\n{text}\n```", f"Here is your itinerary:\n{text}"])
+    return render
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)] if ordered else 0.0
+
+
+async def run_mode(service: AIService, structured: bool, runs: int, time_scale: float):
+    service.structured_output = structured
+    failures = {"trip": 0, "day": 0}
+    latencies = {"trip": [], "day": []}
+    for index in range(runs):
+        trip = trip_for(index)
+
+        start = time.perf_counter()
+        plan = await service.generate_trip_plan(trip, mode="single")
+        latencies["trip"].append((time.perf_counter() - start) / time_scale)
+        failures["trip"] += not plan.get("dailyItinerary")
+
+        start = time.perf_counter()
+        day = await service.generate_day_itinerary({**trip, "existingDays": []}, 2)
+        latencies["day"].append((time.perf_counter() - start) / time_scale)
+        failures["day"] += not (day.get("dayItinerary") or {}).get("activities")
+    return failures, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=40)
+    parser.add_argument("--malformed-rate", type=float, default=0.05)
+    parser.add_argument("--time-scale", type=float, default=0.002)
+    parser.add_argument("--live", action="store_true", help="Call the OpenAI API instead of the stub")
+    parser.add_argument("--model", default="gpt-4o-mini", help="Model for --live runs")
+    args = parser.parse_args()
+
+    service = AIService()
+    if args.live:
+        args.time_scale = 1.0
+        for route in service.model_router.config["tasks"].values():
+            route["models"] = [args.model]
+    else:
+        service.openai_client = StubOpenAI(
+            time_scale=args.time_scale,
+            seconds_per_prompt_token=0.0002,
+            render=render_for(args.malformed_rate, random.Random(7)),
+        )
+
+    print(f"{'mode':<11} {'prompt':<6} {'tokens':>7} {'shared prefix':>14} | {'parse failures':>14} | {'p50 s':>6} {'p95 s':>6}")
+    for structured in (False, True):
+        service.structured_output = structured
+        trips = [trip_for(i) for i in range(len(TRIPS))]
+        prompts = {
+            "trip": [service._create_trip_plan_prompt(t) for t in trips],
+            "day": [service._create_day_itinerary_prompt(t, 2) for t in trips],
+        }
+        # Keep the service's parse-error prints out of the table
+        with redirect_stdout(sys.stderr):
+            failures, latencies = asyncio.run(run_mode(service, structured, args.runs, args.time_scale))
+
+        mode = "structured" if structured else "prose"
+        for kind in ("trip", "day"):
+            tokens = sum(estimate_tokens(p) for p in prompts[kind]) / len(prompts[kind])
+            prefix = shared_prefix_tokens(prompts[kind])
+            print(
+                f"{mode:<11} {kind:<6} {tokens:>7.0f} {prefix:>7} ({prefix / tokens:>4.0%}) | "
+                f"{failures[kind]:>5}/{args.runs:<3} {failures[kind] / args.runs:>5.0%} | "
+                f"{percentile(latencies[kind], 50):>6.1f} {percentile(latencies[kind], 95):>6.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
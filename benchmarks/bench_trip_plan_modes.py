@@ -0,0 +1,71 @@
+"""
+Wall-clock time of generate_trip_plan in single-call vs chunked mode, by
+trip length, against the simulated upstream in stub_upstream.py.
+
+Times are reported in simulated seconds (real sleep time / time scale).
+
+    python benchmarks/bench_trip_plan_modes.py [--days 3 5 7 10 14 21] [--time-scale 0.01]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from server.ai_service import AIService
+from stub_upstream import StubOpenAI
+
+
+def trip_for(days: int) -> dict:
+    return {
+        "destination": "Paris",
+        "startDate": "2025-06-01",
+        "endDate": f"2025-06-{days:02d}",
+        "budget": 5000,
+        "departureLocation": "New York",
+        "travelers": 2,
+        "preferences": {"activities": ["museums", "food"], "dietaryRestrictions": ["vegetarian"]},
+    }
+
+
+async def run_once(service: AIService, stub: StubOpenAI, days: int, mode: str, time_scale: float) -> dict:
+    stub.reset()
+    start = time.perf_counter()
+    itinerary = await service.generate_trip_plan(trip_for(days), mode=mode)
+    elapsed = (time.perf_counter() - start) / time_scale
+    return {
+        "seconds": elapsed,
+        "calls": stub.calls,
+        "output_tokens": stub.completion_tokens,
+        "days_returned": sum(1 for day in itinerary.get("dailyItinerary", []) if day.get("activities")),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[3, 5, 7, 10, 14, 21])
+    parser.add_argument("--time-scale", type=float, default=0.01)
+    args = parser.parse_args()
+
+    stub = StubOpenAI(time_scale=args.time_scale)
+    service = AIService()
+    service.openai_client = stub
+
+    print(f"{'days':>4} | {'single s':>9} {'days ok':>7} {'tokens':>7} | {'chunked s':>9} {'days ok':>7} {'tokens':>7} {'calls':>5} | speedup")
+    for days in args.days:
+        single = await run_once(service, stub, days, "single", args.time_scale)
+        chunked = await run_once(service, stub, days, "chunked", args.time_scale)
+        print(
+            f"{days:>4} | {single['seconds']:>9.1f} {single['days_returned']:>7} {single['output_tokens']:>7} | "
+            f"{chunked['seconds']:>9.1f} {chunked['days_returned']:>7} {chunked['output_tokens']:>7} {chunked['calls']:>5} | "
+            f"{single['seconds'] / chunked['seconds']:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,260 @@
+"""
+Offline stand-in for the OpenAI async client used by AIService.
+
+Responses are synthesized from the prompt (trip plans, skeletons, day
+batches, single days, meal plans, partial updates, recommendations) and
+delayed like a real completion: a fixed time to first token plus a cost per
+output token. Output beyond max_tokens is cut off, so long single-call trip
+plans come back truncated the same way real ones do.
+
+Usage:
+    service = AIService()
+    service.openai_client = StubOpenAI(time_scale=0.01)
+"""
+
+import re
+import json
+import random
+import asyncio
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import Dict, List, Any
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _activity(day: int, index: int) -> Dict[str, Any]:
+    return {
+        "time": ["09:00 AM", "01:00 PM", "04:00 PM"][index % 3],
+        "activity": f"Guided visit of the main galleries and the sculpture garden, day {day}",
+        "name": f"Museum of Fine Arts Wing {day}-{index}",
+        "location": f"{10 + index} Rue de Rivoli, 1st Arrondissement",
+        "cost": 20 + index * 5,
+        "duration": "2 hours",
+        "notes": "Book timed-entry tickets online to skip the queue; closed on Tuesdays.",
+    }
+
+
+def _meal(day: int, index: int) -> Dict[str, Any]:
+    return {
+        "time": ["08:30 AM", "01:00 PM", "07:30 PM"][index % 3],
+        "restaurant": f"Bistro Saint-Germain {day}-{index}",
+        "cuisine": "French bistro",
+        "priceRange": "$$",
+        "cost": 25 + index * 10,
+        "dietaryOptions": ["Vegetarian", "Gluten-free"],
+    }
+
+
+def _transport(day: int) -> Dict[str, Any]:
+    return {
+        "type": "Metro Line 1",
+        "route": f"Hotel to Museum of Fine Arts Wing {day}-0",
+        "cost": 4,
+        "duration": "20 minutes",
+    }
+
+
+def synth_day(day: int, derived_fields: bool = True) -> Dict[str, Any]:
+    """One day; derived_fields adds the date and accommodation echo older prompts asked for."""
+    body = {"day": day}
+    if derived_fields:
+        body["date"] = (date(2025, 6, 1) + timedelta(days=day - 1)).isoformat()
+        body["accommodation"] = {
+            "name": "Hotel Le Marais",
+            "location": "12 Rue des Archives, Paris",
+            "notes": "Breakfast included; check-in after 3 PM",
+        }
+    body["activities"] = [_activity(day, i) for i in range(3)]
+    body["meals"] = [_meal(day, i) for i in range(3)]
+    body["transportation"] = [_transport(day)]
+    return body
+
+
+def synth_flights() -> List[Dict[str, Any]]:
+    return [
+        {
+            "airline": "Air France",
+            "flightNumber": f"AF{100 + i}",
+            "departureTime": "2025-06-01T08:00:00",
+            "arrivalTime": "2025-06-01T20:00:00",
+            "price": 650,
+            "bookingLink": "https://www.airfrance.com",
+            "departureLocation": "JFK - New York",
+            "arrivalLocation": "CDG - Paris",
+        }
+        for i in range(2)
+    ]
+
+
+def synth_accommodations(count: int = 1) -> List[Dict[str, Any]]:
+    return [
+        {
+            "name": f"Hotel Le Marais {i}",
+            "location": "12 Rue des Archives, Paris",
+            "checkIn": "2025-06-01T15:00:00",
+            "checkOut": "2025-06-30T11:00:00",
+            "price": 1800,
+            "amenities": ["Free WiFi", "Breakfast", "Air conditioning"],
+            "bookingLink": "https://www.booking.com",
+            "type": "Hotel",
+        }
+        for i in range(count)
+    ]
+
+
+def synth_additional_info() -> Dict[str, Any]:
+    return {
+        "emergencyContacts": ["Emergency: 112", "US Embassy Paris: +33 1 43 12 22 22"],
+        "localCustoms": ["Greet shopkeepers with 'Bonjour'", "Tipping is modest; service is included"],
+        "packingList": ["Comfortable walking shoes", "Light rain jacket", "Plug adapter (Type E)"],
+    }
+
+
+def _cost_totals(days: List[Dict[str, Any]]) -> Dict[str, Any]:
+    totals = {"flights": 1300, "accommodation": 1800, "activities": 0, "transportation": 0, "meals": 0}
+    for day in days:
+        totals["activities"] += sum(a["cost"] for a in day["activities"])
+        totals["transportation"] += sum(t["cost"] for t in day["transportation"])
+        totals["meals"] += sum(m.get("cost", 0) for m in day["meals"])
+    totals["total"] = sum(totals.values())
+    return totals
+
+
+def synth_trip_plan(day_count: int, derived_fields: bool = True) -> Dict[str, Any]:
+    """Full single-call trip plan; derived_fields adds totals, per-day dates and accommodation."""
+    days = [synth_day(day, derived_fields) for day in range(1, day_count + 1)]
+    plan = {
+        "flights": synth_flights(),
+        "accommodations": synth_accommodations(),
+        "dailyItinerary": days,
+    }
+    if derived_fields:
+        plan["totalCost"] = _cost_totals(days)
+    plan["additionalInfo"] = synth_additional_info()
+    return plan
+
+
+def synthesize_response(prompt: str) -> Dict[str, Any]:
+    """Build a plausible JSON response for one of AIService's prompts."""
+    if "TRAVEL ITINERARY SKELETON" in prompt:
+        return {
+            "flights": synth_flights(),
+            "accommodations": synth_accommodations(),
+            "additionalInfo": synth_additional_info(),
+        }
+
+    if "DAILY ITINERARIES GENERATION" in prompt:
+        days = [int(n) for n in re.findall(r"^- Day (\d+)", prompt, re.MULTILINE)]
+        return {"dailyItinerary": [synth_day(day, derived_fields=False) for day in days]}
+
+    if "DAILY ITINERARY GENERATION" in prompt:
+        match = re.search(r"Day Number: (\d+)", prompt)
+        day = int(match.group(1)) if match else 1
+        body = synth_day(day, derived_fields=False)
+        if '"date":' in prompt:
+            body["date"] = (date(2025, 6, 1) + timedelta(days=day - 1)).isoformat()
+        return {"dayItinerary": body}
+
+    if "MEAL PLAN UPDATE" in prompt:
+        days = [int(n) for n in re.findall(r"^- Day (\d+)", prompt, re.MULTILINE)]
+        return {"days": [{"day": day, "meals": [_meal(day, i) for i in range(3)]} for day in days]}
+
+    if "PARTIAL TRAVEL ITINERARY" in prompt:
+        return {"flights": synth_flights(), "accommodations": synth_accommodations()}
+
+    if "TRAVEL ITINERARY GENERATION" in prompt:
+        match = re.search(r"\((\d+) days\)", prompt)
+        day_count = int(match.group(1)) if match else 3
+        return synth_trip_plan(day_count, derived_fields='"totalCost"' in prompt)
+
+    return synth_trip_plan(1)
+
+
+class StubCompletions:
+    def __init__(self, owner: "StubOpenAI"):
+        self.owner = owner
+
+    async def create(self, model: str, messages: List[Dict[str, str]], max_tokens: int = 4096, **kwargs):
+        owner = self.owner
+        prompt = messages[-1]["content"]
+        content = owner.render(owner.respond(prompt), kwargs)
+
+        completion_tokens = estimate_tokens(content)
+        if completion_tokens > max_tokens:
+            content = content[:max_tokens * CHARS_PER_TOKEN]
+            completion_tokens = max_tokens
+
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        seconds = owner.first_token_seconds + prompt_tokens * owner.seconds_per_prompt_token + completion_tokens * owner.seconds_per_token
+        if owner.jitter:
+            seconds *= 1 + random.uniform(-owner.jitter, owner.jitter)
+
+        owner.calls += 1
+        owner.in_flight += 1
+        owner.max_in_flight = max(owner.max_in_flight, owner.in_flight)
+        try:
+            await asyncio.sleep(seconds * owner.time_scale)
+        finally:
+            owner.in_flight -= 1
+
+        owner.prompt_tokens += prompt_tokens
+        owner.completion_tokens += completion_tokens
+        owner.simulated_seconds += seconds
+
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+
+class StubOpenAI:
+    """
+    Drop-in replacement for openai.AsyncOpenAI (chat.completions.create only).
+
+    Args:
+        first_token_seconds: Simulated time to first token
+        seconds_per_token: Simulated decode time per output token
+        seconds_per_prompt_token: Simulated prefill time per prompt token
+        time_scale: Multiplier applied to real sleeps, to run benchmarks faster
+        jitter: Relative random variation of each call's latency
+        respond: Optional prompt -> response dict override
+        render: Optional (response dict, request kwargs) -> completion text override
+    """
+
+    def __init__(
+        self,
+        first_token_seconds: float = 0.5,
+        seconds_per_token: float = 0.015,
+        time_scale: float = 1.0,
+        jitter: float = 0.0,
+        respond=None,
+        seconds_per_prompt_token: float = 0.0,
+        render=None,
+    ):
+        self.first_token_seconds = first_token_seconds
+        self.seconds_per_token = seconds_per_token
+        self.seconds_per_prompt_token = seconds_per_prompt_token
+        self.time_scale = time_scale
+        self.jitter = jitter
+        self.respond = respond or synthesize_response
+        self.render = render or (lambda response, request: json.dumps(response, indent=2))
+        self.chat = SimpleNamespace(completions=StubCompletions(self))
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.simulated_seconds = 0.0
@@ -4,14 +4,116 @@ import sys
 import json
 import os
 import asyncio
+import argparse
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.append(parent_dir)
 
 from server.ai_service import AIService
+from server.batch import BATCH_COMMANDS, BatchRunner, read_jsonl, trip_requests
+from server.profiling import Profiler, deterministic_profile
+
+def pop_profile_options(argv):
+    """
+    Remove the profiling flags from argv, which may appear anywhere:
+
+        --profile FILE              write a profile of the command to FILE
+        --profile-mode sampled      collapsed stacks for flame graphs (default)
+        --profile-mode deterministic
+                                    cProfile stats (flameprof, gprof2dot, snakeviz)
+    """
+    options = {'--profile': None, '--profile-mode': 'sampled'}
+    remaining = []
+    args = iter(argv)
+    for arg in args:
+        if arg in options:
+            options[arg] = next(args, None)
+        else:
+            remaining.append(arg)
+    argv[:] = remaining
+    if options['--profile-mode'] not in ('sampled', 'deterministic'):
+        print(f"Error: Unknown profile mode: {options['--profile-mode']}", file=sys.stderr)
+        sys.exit(1)
+    return options['--profile'], options['--profile-mode']
+
+async def run_profiled(coro, path, mode):
+    """Run a command's coroutine, writing its profile to path when one was asked for."""
+    if not path:
+        return await coro
+    if mode == 'deterministic':
+        with deterministic_profile(path):
+            return await coro
+    profiler = Profiler(enabled=True, directory='')
+    try:
+        async with profiler.profile_request(' '.join(sys.argv[1:2])) as profile:
+            return await coro
+    finally:
+        with open(path, 'w') as f:
+            f.write(profiler.get(profile.id) or '')
+        print(f"Profile written to {path}", file=sys.stderr)
+
+async def run_batch(args):
+    """
+    Bulk mode: read JSONL requests, run them concurrently and stream JSONL
+    results (in completion order) to stdout or --output.
+
+        wrapper.py batch [--input FILE | --mongo-query JSON] [--concurrency N]
+                         [--rate PER_SECOND] [--checkpoint FILE] [--output FILE]
+    """
+    parser = argparse.ArgumentParser(prog='wrapper.py batch')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--input', default='-', help='JSONL requests file, "-" for stdin (default)')
+    source.add_argument('--mongo-query', help='JSON filter for trips to process, read through DatabaseService')
+    parser.add_argument('--command', choices=BATCH_COMMANDS, default='regenerate_trip_plan',
+                        help='Command for requests that do not name one, and for --mongo-query trips '
+                             '(generate_day_itinerary runs one request per day of each trip)')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rate', type=float, help='Max requests started per second')
+    parser.add_argument('--timeout', type=float, help='Deadline per request in seconds')
+    parser.add_argument('--output', help='Append results here instead of stdout')
+    parser.add_argument('--checkpoint', help='File of completed IDs; rerun with the same file to resume')
+    options = parser.parse_args(args)
+
+    # Results own stdout; route the service's diagnostic prints to stderr.
+    output = open(options.output, 'a') if options.output else sys.stdout
+    sys.stdout = sys.stderr
+
+    service = AIService()
+    # Nobody will ask for the follow-up days of a bulk job.
+    service.prewarmer.enabled = False
+
+    input_file = None
+    try:
+        if options.mongo_query:
+            from server.services.database import DatabaseService
+            requests = trip_requests(DatabaseService().iter_trips(json.loads(options.mongo_query)), options.command)
+        else:
+            input_file = sys.stdin if options.input == '-' else open(options.input)
+            requests = read_jsonl(input_file, options.command)
+
+        runner = BatchRunner(
+            service,
+            output,
+            concurrency=options.concurrency,
+            rate=options.rate,
+            checkpoint_path=options.checkpoint,
+            timeout_seconds=options.timeout,
+        )
+        stats = await runner.run(requests)
+        print(f"Batch finished: {json.dumps(stats)}", file=sys.stderr)
+        return stats
+    finally:
+        if input_file not in (None, sys.stdin):
+            input_file.close()
+        if options.output:
+            output.close()
 
 async def async_main():
+    profile_path, profile_mode = pop_profile_options(sys.argv)
+    await run_profiled(run_command(), profile_path, profile_mode)
+
+async def run_command():
     if len(sys.argv) < 2:
         print('Error: Missing command', file=sys.stderr)
         sys.exit(1)
@@ -19,6 +121,10 @@ async def async_main():
     command = sys.argv[1]
     print(f"Command: {command}", file=sys.stderr)
     
+    if command == 'batch':
+        stats = await run_batch(sys.argv[2:])
+        sys.exit(1 if stats['failed'] else 0)
+    
     try:
         service = AIService()
         
@@ -28,7 +134,18 @@ async def async_main():
                 sys.exit(1)
             
             trip_data = json.loads(sys.argv[2])
-            itinerary = await service.generate_trip_plan(trip_data)
+            itinerary = await service.run_request(service.generate_trip_plan(trip_data))
+            print(json.dumps(itinerary))
+            
+        elif command == 'regenerate_trip_plan':
+            if len(sys.argv) < 3:
+                print('Error: Missing data for trip regeneration', file=sys.stderr)
+                sys.exit(1)
+            
+            data = json.loads(sys.argv[2])
+            itinerary = await service.run_request(service.regenerate_trip_plan(
+                data.get('tripId'), data.get('tripData'), data.get('previousItinerary')
+            ))
             print(json.dumps(itinerary))
             
         elif command == 'generate_day_itinerary':
@@ -44,7 +161,7 @@ async def async_main():
                 print('Error: Missing trip data or day number', file=sys.stderr)
                 sys.exit(1)
                 
-            day_itinerary = await service.generate_day_itinerary(trip_data, day_number)
+            day_itinerary = await service.run_request(service.generate_day_itinerary(trip_data, day_number))
             print(json.dumps(day_itinerary))
             
         else:
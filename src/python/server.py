@@ -1,23 +1,42 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Header, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Optional
-from datetime import date
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Any, List, Dict, Literal, Optional
+from datetime import date, datetime
 import sys
 import os
-import importlib.util
+import math
+import time
 
 src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.append(src_dir)
+# Put src/ ahead of this script's directory so that "server" resolves to the
+# src/server package rather than to this file.
+sys.path.insert(0, src_dir)
 
-ai_service_path = os.path.join(src_dir, 'server', 'ai_service.py')
-spec = importlib.util.spec_from_file_location("ai_service", ai_service_path)
-ai_service_module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(ai_service_module)
-AIService = ai_service_module.AIService
+from server.admission import AdmissionController, AdmissionMiddleware
+from server.ai_service import AIService
+from server.circuit_breaker import CircuitOpenError
+from server.deadlines import ClientDisconnected, DeadlineExceeded
+from server.profiling import Profiler, ProfilingMiddleware, ProfilingRateLimited
 
 app = FastAPI()
 
+# Opt-in profiling (PROFILING_ENABLED): requests sent with X-Profile are sampled
+# and /admin/profile samples the whole process; both output collapsed stacks.
+profiler = Profiler()
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+# Bound in-flight and queued requests per generation endpoint, and body sizes;
+# a burst beyond that gets 503 + Retry-After instead of queueing unboundedly.
+admission = AdmissionController([
+    "/api/generate-trip-plan",
+    "/api/generate-day-itinerary",
+    "/api/regenerate-trip-plan",
+    "/api/generate-travel-plan",
+])
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -41,112 +60,213 @@ class TripPreferences(BaseModel):
 class TripPreferencesRequest(BaseModel):
     tripPreferences: Dict
 
+def _validate_iso_date(value: Optional[str]) -> Optional[str]:
+    if value:
+        try:
+            datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f"Invalid ISO date: {value}")
+    return value
+
+class DestinationRequest(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    location: str
+    startDate: Optional[str] = None
+    endDate: Optional[str] = None
+    placesToVisit: List[str] = []
+
+    @field_validator("startDate", "endDate")
+    @classmethod
+    def check_dates(cls, value: Optional[str]) -> Optional[str]:
+        return _validate_iso_date(value)
+
+class PreferencesRequest(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    accommodationType: Optional[str] = None
+    transportationType: Optional[str] = None
+    activities: List[str] = []
+    dietaryRestrictions: List[str] = []
+    placesToVisit: List[str] = []
+
+class TripPlanRequest(BaseModel):
+    """Trip details in the same shape AIService.generate_trip_plan consumes."""
+    model_config = ConfigDict(extra="allow")
+
+    tripId: Optional[str] = None
+    destination: str
+    startDate: str
+    endDate: str
+    budget: Optional[float] = Field(default=None, ge=0)
+    departureLocation: Optional[str] = None
+    travelers: Optional[int] = Field(default=None, ge=1)
+    numberOfTravelers: Optional[int] = Field(default=None, ge=1)
+    destinations: List[DestinationRequest] = []
+    preferences: PreferencesRequest = PreferencesRequest()
+    existingDays: List[Dict[str, Any]] = []
+
+    @field_validator("startDate", "endDate")
+    @classmethod
+    def check_dates(cls, value: Optional[str]) -> Optional[str]:
+        return _validate_iso_date(value)
+
+class DayItineraryRequest(BaseModel):
+    tripData: TripPlanRequest
+    dayNumber: int = Field(ge=1)
+
+class RegenerateTripRequest(BaseModel):
+    tripId: str
+    tripData: TripPlanRequest
+    previousItinerary: Optional[Dict[str, Any]] = None
+
+def _to_trip_data(request: TripPlanRequest) -> Dict[str, Any]:
+    return request.model_dump(exclude_none=True)
+
+async def _run(http_request: Request, coro, timeout_ms: Optional[int]):
+    """Run a generation under the caller's deadline, cancelling it if the client disconnects."""
+    timeout_seconds = timeout_ms / 1000 if timeout_ms else None
+    arrived_at = http_request.scope.get("state", {}).get("arrived_at")
+    if timeout_seconds is not None and arrived_at is not None:
+        # The deadline runs from arrival, so time spent queued for admission counts against it
+        timeout_seconds -= time.monotonic() - arrived_at
+        if timeout_seconds <= 0:
+            coro.close()
+            raise DeadlineExceeded("Deadline exceeded before the generation started")
+    return await ai_service.run_request(coro, timeout_seconds, http_request.is_disconnected)
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    print(f"[Python Backend] Deadline exceeded for {request.url.path}")
+    return JSONResponse(status_code=504, content={"detail": "Deadline exceeded"})
+
+@app.exception_handler(ClientDisconnected)
+async def client_disconnected_handler(request: Request, exc: ClientDisconnected):
+    print(f"[Python Backend] Client disconnected from {request.url.path}; generation cancelled")
+    # Nobody is listening; 499 is the conventional "client closed request" status.
+    return JSONResponse(status_code=499, content={"detail": "Client disconnected"})
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    # Only reached when no stale result matched the request
+    print(f"[Python Backend] Upstream circuit open; rejecting {request.url.path}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "AI service temporarily unavailable"},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
 @app.get("/")
 async def root():
     return {"message": "ItinerAI API"}
 
-@app.post("/api/generate-travel-plan")
-async def generate_travel_plan(request: TripPreferencesRequest):
+@app.post("/api/generate-trip-plan")
+async def generate_trip_plan(
+    request: TripPlanRequest,
+    http_request: Request,
+    mode: Optional[Literal["single", "chunked"]] = None,
+    x_request_timeout_ms: Optional[int] = Header(default=None, ge=1),
+):
+    try:
+        print(f"[Python Backend] Received request to generate trip plan")
+        return await _run(http_request, ai_service.generate_trip_plan(_to_trip_data(request), mode), x_request_timeout_ms)
+    except (DeadlineExceeded, ClientDisconnected, CircuitOpenError):
+        raise
+    except Exception as e:
+        print(f"[Python Backend] Error generating trip plan: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating trip plan: {str(e)}")
+
+@app.post("/api/generate-day-itinerary")
+async def generate_day_itinerary(
+    request: DayItineraryRequest,
+    http_request: Request,
+    x_request_timeout_ms: Optional[int] = Header(default=None, ge=1),
+):
     try:
-        print(f"[Python Backend] Received request to generate travel plan")
-        preferences = request.tripPreferences
-        
-        query = f"Plan a trip to {preferences.get('destination', 'Unknown')} for "
-        
-        if preferences.get('startDate') and preferences.get('endDate'):
-            from datetime import datetime
-            start = datetime.fromisoformat(preferences['startDate'].replace('Z', '+00:00')) if 'Z' in preferences['startDate'] else datetime.fromisoformat(preferences['startDate'])
-            end = datetime.fromisoformat(preferences['endDate'].replace('Z', '+00:00')) if 'Z' in preferences['endDate'] else datetime.fromisoformat(preferences['endDate'])
-            days = (end - start).days + 1
-            query += f"{days} days "
-        
-        if preferences.get('preferences', {}).get('dietaryRestrictions'):
-            dietary = ", ".join(preferences['preferences']['dietaryRestrictions'])
-            query += f"with {dietary} dietary requirements "
-        
-        if preferences.get('preferences', {}).get('activities'):
-            activities = ", ".join(preferences['preferences']['activities'])
-            query += f"including {activities} activities"
-        
-        print(f"[Python Backend] Calling AI service with query: {query}")
-        
-        recommendations = await ai_service.get_travel_recommendations(query)
-        
-        print(f"[Python Backend] Received recommendations from AI service")
-        
-        formatted_response = {
-            "flights": [],
-            "accommodations": [],
-            "dailyItinerary": [],
-            "totalCost": {
-                "flights": 0,
-                "accommodation": 0,
-                "activities": 0,
-                "transportation": 0,
-                "meals": 0,
-                "total": 0
-            },
-            "additionalInfo": {
-                "emergencyContacts": [],
-                "localCustoms": [],
-                "packingList": [],
-                "weatherForecast": []
-            }
-        }
-        
-        for rec in recommendations:
-            rec_type = rec.get("type")
-            content = rec.get("content", {})
-            
-            if rec_type == "accommodation":
-                formatted_response["accommodations"].append({
-                    "name": content.get("name", ""),
-                    "checkIn": preferences.get('startDate', ""),
-                    "checkOut": preferences.get('endDate', ""),
-                    "address": content.get("location", ""),
-                    "price": 100, # Default placeholder
-                    "rating": 4.5, # Default placeholder
-                    "amenities": content.get("highlights", [])
-                })
-            elif rec_type == "itinerary":
-                formatted_response["dailyItinerary"].append({
-                    "day": content.get("day", 0),
-                    "date": content.get("date", ""),
-                    "activities": [
-                        {
-                            "name": content.get("morning", "Morning activity"),
-                            "time": "09:00",
-                            "description": "Morning activity"
-                        },
-                        {
-                            "name": content.get("afternoon", "Afternoon activity"),
-                            "time": "14:00",
-                            "description": "Afternoon activity"
-                        },
-                        {
-                            "name": content.get("evening", "Evening activity"),
-                            "time": "19:00",
-                            "description": "Evening activity"
-                        }
-                    ]
-                })
-            elif rec_type == "transportation":
-                formatted_response["flights"].append({
-                    "departure": preferences.get('destination', ""),
-                    "arrival": preferences.get('destination', ""),
-                    "airline": "Airline",
-                    "flightNumber": "AB123",
-                    "departureTime": preferences.get('startDate', ""),
-                    "arrivalTime": preferences.get('endDate', ""),
-                    "price": 300 # Default placeholder
-                })
-            elif rec_type == "tips":
-                formatted_response["additionalInfo"]["localCustoms"] = content.get("tips", [])
-        
-        return formatted_response
+        print(f"[Python Backend] Received request to generate day {request.dayNumber} itinerary")
+        return await _run(
+            http_request,
+            ai_service.generate_day_itinerary(_to_trip_data(request.tripData), request.dayNumber),
+            x_request_timeout_ms,
+        )
+    except (DeadlineExceeded, ClientDisconnected, CircuitOpenError):
+        raise
     except Exception as e:
-        print(f"[Python Backend] Error generating travel plan: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error generating travel plan: {str(e)}")
+        print(f"[Python Backend] Error generating day itinerary: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating day itinerary: {str(e)}")
+
+@app.post("/api/regenerate-trip-plan")
+async def regenerate_trip_plan(
+    request: RegenerateTripRequest,
+    http_request: Request,
+    x_request_timeout_ms: Optional[int] = Header(default=None, ge=1),
+):
+    try:
+        print(f"[Python Backend] Received request to regenerate trip {request.tripId}")
+        return await _run(
+            http_request,
+            ai_service.regenerate_trip_plan(request.tripId, _to_trip_data(request.tripData), request.previousItinerary),
+            x_request_timeout_ms,
+        )
+    except (DeadlineExceeded, ClientDisconnected, CircuitOpenError):
+        raise
+    except Exception as e:
+        print(f"[Python Backend] Error regenerating trip plan: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error regenerating trip plan: {str(e)}")
+
+@app.delete("/api/trips/{trip_id}/prewarm")
+async def cancel_prewarm(trip_id: str):
+    return {"cancelled": ai_service.cancel_prewarm(trip_id)}
+
+@app.get("/api/metrics")
+async def metrics():
+    return {**ai_service.get_metrics(), "admission": admission.metrics(), "profiling": profiler.metrics()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Admission queue-depth gauges for autoscaling (Prometheus text format)."""
+    return admission.prometheus()
+
+def _check_profiler_access(token: Optional[str]):
+    if not profiler.enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiler.authorized(token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+@app.get("/admin/profile", response_class=PlainTextResponse)
+async def profile_process(
+    seconds: float = Query(default=10, gt=0),
+    x_profile_token: Optional[str] = Header(default=None),
+):
+    """Sample every thread and asyncio task for `seconds`; collapsed stacks for flame graphs."""
+    _check_profiler_access(x_profile_token)
+    try:
+        profiler.take_budget()
+        return await profiler.sample_process(seconds)
+    except ProfilingRateLimited as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
+@app.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, x_profile_token: Optional[str] = Header(default=None)):
+    """Collapsed stacks of a request profiled with X-Profile (see its X-Profile-Id response header)."""
+    _check_profiler_access(x_profile_token)
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@app.post("/api/generate-travel-plan")
+async def generate_travel_plan(
+    request: TripPreferencesRequest,
+    http_request: Request,
+    x_request_timeout_ms: Optional[int] = Header(default=None, ge=1),
+):
+    """Legacy endpoint, kept for older clients; same output as /api/generate-trip-plan."""
+    try:
+        trip_request = TripPlanRequest.model_validate(request.tripPreferences)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return await generate_trip_plan(trip_request, http_request, None, x_request_timeout_ms)
 
 if __name__ == "__main__":
     import uvicorn
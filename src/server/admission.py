@@ -0,0 +1,200 @@
+import os
+import json
+import math
+import time
+import asyncio
+from typing import Any, Dict, Iterable, Optional
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+
+class _EndpointGate:
+    """In-flight slots and a bounded wait queue for one endpoint."""
+
+    def __init__(self, max_in_flight: int, max_queued: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.queued = 0
+        # Moving average of time in flight, for Retry-After estimates
+        self.service_seconds = 1.0
+        self.stats = {
+            "admitted": 0,
+            "rejected_queue_full": 0,
+            "rejected_queue_timeout": 0,
+            "rejected_too_large": 0,
+            "deadline_exceeded_in_queue": 0,
+        }
+
+    def retry_after(self) -> int:
+        backlog = (self.queued + 1) / self.max_in_flight
+        return min(120, max(1, math.ceil(backlog * self.service_seconds)))
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued,
+            "service_seconds": self.service_seconds,
+        }
+
+
+class AdmissionController:
+    """
+    Bounds the work each endpoint accepts so that a burst is shed at the door
+    instead of piling up coroutines (and their request bodies) behind the
+    upstream.
+
+    Each controlled endpoint runs at most max_in_flight requests; up to
+    max_queued more wait, for at most the queue timeout, in arrival order.
+    Anything beyond that gets an immediate 503 with a Retry-After estimated
+    from the queue depth and recent service times. Request bodies larger than
+    the size limit get 413, before they are read when Content-Length is sent.
+
+    A request's X-Request-Timeout-Ms deadline runs from its arrival: the
+    queue wait is capped by it (a request whose deadline passes in the queue
+    gets 504), and the arrival time is left in scope["state"]["arrived_at"]
+    so the handler can charge the wait against the deadline.
+
+    Configuration (environment):
+        ADMISSION_ENABLED: "false" to disable (default "true")
+        ADMISSION_MAX_IN_FLIGHT: concurrent requests per endpoint (default 16)
+        ADMISSION_MAX_QUEUED: waiting requests per endpoint (default 32)
+        ADMISSION_QUEUE_TIMEOUT_SECONDS: longest wait for a slot (default 30)
+        ADMISSION_MAX_BODY_BYTES: largest request body (default 1 MiB)
+        ADMISSION_LIMITS: JSON per-endpoint overrides, e.g.
+            {"/api/generate-day-itinerary": {"max_in_flight": 32, "max_queued": 64}}
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[str],
+        enabled: Optional[bool] = None,
+        max_in_flight: Optional[int] = None,
+        max_queued: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        max_body_bytes: Optional[int] = None,
+        overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        self.enabled = enabled if enabled is not None else os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+        self.max_body_bytes = max_body_bytes or int(os.getenv("ADMISSION_MAX_BODY_BYTES", str(1024 * 1024)))
+        if overrides is None:
+            overrides = json.loads(os.getenv("ADMISSION_LIMITS") or "{}")
+
+        defaults = {
+            "max_in_flight": max_in_flight or int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "16")),
+            "max_queued": max_queued if max_queued is not None else int(os.getenv("ADMISSION_MAX_QUEUED", "32")),
+            "queue_timeout": queue_timeout or float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "30")),
+        }
+        self.gates = {path: _EndpointGate(**{**defaults, **overrides.get(path, {})}) for path in paths}
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_body_bytes": self.max_body_bytes,
+            "endpoints": {path: gate.metrics() for path, gate in self.gates.items()},
+        }
+
+    def prometheus(self) -> str:
+        """Queue-depth and rejection gauges in the Prometheus text format, for autoscalers."""
+        lines = []
+        for name, kind, help_text, value in (
+            ("itinerai_admission_in_flight", "gauge", "Requests being served", lambda g: g.in_flight),
+            ("itinerai_admission_queued", "gauge", "Requests waiting for a slot", lambda g: g.queued),
+            ("itinerai_admission_utilization", "gauge", "(in flight + queued) / (max in flight + max queued)",
+             lambda g: (g.in_flight + g.queued) / (g.max_in_flight + g.max_queued)),
+            ("itinerai_admission_rejected_total", "counter", "Requests rejected with 503 or 413",
+             lambda g: g.stats["rejected_queue_full"] + g.stats["rejected_queue_timeout"] + g.stats["rejected_too_large"]),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for path, gate in self.gates.items():
+                lines.append(f'{name}{{endpoint="{path}"}} {value(gate)}')
+        return "\n".join(lines) + "\n"
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to the endpoints it controls."""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        gate = self.controller.gates.get(scope.get("path")) if scope["type"] == "http" else None
+        if gate is None or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        scope.setdefault("state", {})["arrived_at"] = time.monotonic()
+        headers = dict(scope["headers"])
+        max_body = self.controller.max_body_bytes
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_body:
+            gate.stats["rejected_too_large"] += 1
+            await _reject(scope, receive, send, 413, "Request body too large")
+            return
+
+        if gate.in_flight + gate.queued >= gate.max_in_flight + gate.max_queued:
+            gate.stats["rejected_queue_full"] += 1
+            await _reject(scope, receive, send, 503, "Server busy", gate.retry_after())
+            return
+
+        if gate._slots.locked():
+            timeout = _request_timeout(headers)
+            expires_first = timeout is not None and timeout < gate.queue_timeout
+            gate.queued += 1
+            try:
+                await asyncio.wait_for(gate._slots.acquire(), timeout=timeout if expires_first else gate.queue_timeout)
+            except asyncio.TimeoutError:
+                if expires_first:
+                    gate.stats["deadline_exceeded_in_queue"] += 1
+                    await _reject(scope, receive, send, 504, "Deadline exceeded")
+                else:
+                    gate.stats["rejected_queue_timeout"] += 1
+                    await _reject(scope, receive, send, 503, "Server busy", gate.retry_after())
+                return
+            finally:
+                gate.queued -= 1
+        else:
+            # A free slot is taken without yielding, so in_flight is exact
+            await gate._slots.acquire()
+
+        gate.in_flight += 1
+        gate.stats["admitted"] += 1
+        start = time.monotonic()
+        received = 0
+
+        async def limited_receive():
+            # Bodies sent without Content-Length (chunked) are counted as they arrive
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    gate.stats["rejected_too_large"] += 1
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        try:
+            await self.app(scope, limited_receive, send)
+        finally:
+            gate.in_flight -= 1
+            gate._slots.release()
+            gate.service_seconds = 0.8 * gate.service_seconds + 0.2 * (time.monotonic() - start)
+
+
+def _request_timeout(headers: Dict[bytes, bytes]) -> Optional[float]:
+    """The X-Request-Timeout-Ms deadline in seconds, or None if absent or malformed."""
+    value = headers.get(b"x-request-timeout-ms", b"")
+    return int(value) / 1000 if value.isdigit() and int(value) > 0 else None
+
+
+async def _reject(scope, receive, send, status_code: int, detail: str, retry_after: Optional[int] = None):
+    headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+    await JSONResponse(status_code=status_code, content={"detail": detail}, headers=headers)(scope, receive, send)
@@ -1,13 +1,202 @@
 import os
 import json
+import time
 import asyncio
-from typing import Dict, List, Any, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from datetime import datetime, timedelta
 import openai
 from dotenv import load_dotenv
 
+from server.cassettes import cassette_client_from_env
+from server.circuit_breaker import CircuitBreaker, CircuitOpenError
+from server.deadlines import ClientDisconnected, DeadlineExceeded, bounded_timeout, gather_or_cancel, remaining, run_until
+from server.hedging import Hedger
+from server.output_schemas import DAY_ITINERARY_SCHEMA, TRIP_PLAN_SCHEMA, response_format
+from server.model_router import ModelRouter, TASK_DAY, TASK_RECOMMENDATIONS, TASK_TRIP_PLAN
+from server.prewarm import DayPrewarmer
+from server.postprocess import postprocess_day, postprocess_trip_plan
+from server.regeneration import RegenerationPlan, generation_inputs, plan_regeneration
+from server.stale_results import StaleResultStore
+from server.trip_spec import TripSpec, parse_iso_datetime, trip_key
+
 load_dotenv()
 
+# Static prompt sections. They are kept free of per-request values and come
+# before the request details, so every call shares the same cacheable prefix.
+_TRIP_PLAN_INSTRUCTIONS = """
+# TRAVEL ITINERARY GENERATION REQUEST
+
+Plan the trip described under TRIP DETAILS at the end of this prompt.
+
+"""
+
+_TRIP_PLAN_OUTPUT_FORMAT = """## REQUIRED OUTPUT FORMAT
+You MUST provide a complete travel itinerary in valid JSON format matching the following structure. Do not include any explanations or text outside of the JSON structure.
+
+```json
+{
+  "flights": [
+    {
+      "airline": "Real Airline Name (not 'Sample Airlines' or 'Example Airlines')",
+      "flightNumber": "AA123",
+      "departureTime": "YYYY-MM-DDTHH:MM:SS",
+      "arrivalTime": "YYYY-MM-DDTHH:MM:SS",
+      "price": 0,
+      "bookingLink": "https://example.com",
+      "departureLocation": "Airport Code - City/Region (e.g., JFK - New York)",
+      "arrivalLocation": "Airport Code - City/Region (e.g., CDG - Paris)"
+    }
+  ],
+  "accommodations": [
+    {
+      "name": "Real Hotel or Accommodation Name",
+      "location": "Address or Area",
+      "checkIn": "YYYY-MM-DDTHH:MM:SS",
+      "checkOut": "YYYY-MM-DDTHH:MM:SS",
+      "price": 0,
+      "amenities": ["Amenity 1", "Amenity 2"],
+      "bookingLink": "https://example.com",
+      "type": "Hotel/Hostel/Airbnb/etc."
+    }
+  ],
+  "dailyItinerary": [
+    {
+      "day": 1,
+      "activities": [
+        {
+          "time": "HH:MM AM/PM",
+          "activity": "Description of activity",
+          "name": "Real Attraction or Activity Name",
+          "location": "Specific Location",
+          "cost": 0,
+          "duration": "X hours",
+          "notes": "Any additional information"
+        }
+      ],
+      "meals": [
+        {
+          "time": "HH:MM AM/PM",
+          "restaurant": "Real Restaurant Name",
+          "cuisine": "Type of cuisine",
+          "priceRange": "$-$$$",
+          "cost": 0,
+          "dietaryOptions": ["Option 1", "Option 2"]
+        }
+      ],
+      "transportation": [
+        {
+          "type": "Specific Transportation Type",
+          "route": "From A to B",
+          "cost": 0,
+          "duration": "X minutes/hours"
+        }
+      ]
+    }
+  ],
+  "additionalInfo": {
+    "emergencyContacts": ["Contact 1", "Contact 2"],
+    "localCustoms": ["Custom 1", "Custom 2"],
+    "packingList": ["Item 1", "Item 2"]
+  }
+}
+```
+
+"""
+
+_TRIP_PLAN_GUIDELINES = """## GENERATION GUIDELINES
+1. Include 2-3 activities per day.
+2. Include 2-3 meal locations per day.
+3. Ensure all activities are appropriate for the destination and preferences.
+4. Include realistic cost estimates for all items, including an estimated cost per meal. Totals are computed for you; do not include them.
+5. Provide emergency contacts specific to the destination.
+6. Include accommodation details suitable for the budget and preferences.
+7. Provide 2-3 packing recommendations appropriate for the destination.
+8. Include 2-3 local customs or cultural norms to be aware of.
+9. Provide detailed transportation options based on preferences.
+10. ALWAYS use real airline names (Delta, United, American Airlines, British Airways, Air France, etc.) instead of generic names like "Sample Airlines" or "Example Airlines".
+11. ALWAYS use real hotel chains, restaurant names, and attraction names when available.
+12. When planning flights, use the provided departure location as the origin, NOT the destination. This should be the user's home airport/city.
+13. If the user provided a city name or region rather than an airport code, select the most appropriate major airport serving that location (e.g., "JFK" or "LaGuardia" if user provided "New York").
+14. For flights, clearly include both the airport code and city name in both departure and arrival locations.
+15. IMPORTANT: For multi-destination trips, plan activities appropriate for each destination during the dates specified.
+16. CRITICAL: If the trip includes multiple destinations, plan daily itineraries for ALL destinations based on their respective date ranges.
+17. Make sure to include transportation between different destinations in the itinerary.
+"""
+
+_DAY_ITINERARY_INSTRUCTIONS = """
+# DAILY ITINERARY GENERATION REQUEST
+
+Plan the single day described under DAY DETAILS at the end of this prompt.
+
+"""
+
+_DAY_ITINERARY_OUTPUT_FORMAT = """## REQUIRED OUTPUT FORMAT
+You MUST provide a daily itinerary in valid JSON format matching the following structure. Do not include any explanations or text outside of the JSON structure.
+
+```json
+{
+  "dayItinerary": {
+    "day": 1,
+    "activities": [
+      {
+        "time": "HH:MM AM/PM",
+        "activity": "Description of activity",
+        "name": "Real Attraction or Activity Name",
+        "location": "Specific Location",
+        "cost": 0,
+        "duration": "X hours",
+        "notes": "Any additional information"
+      }
+    ],
+    "meals": [
+      {
+        "time": "HH:MM AM/PM",
+        "restaurant": "Real Restaurant Name",
+        "cuisine": "Type of cuisine",
+        "priceRange": "$-$$$",
+        "cost": 0,
+        "dietaryOptions": ["Option 1", "Option 2"]
+      }
+    ],
+    "transportation": [
+      {
+        "type": "Specific Transportation Type",
+        "route": "From A to B",
+        "cost": 0,
+        "duration": "X minutes/hours"
+      }
+    ]
+  }
+}
+```
+
+"""
+
+_DAY_ITINERARY_GUIDELINES = """## GENERATION GUIDELINES
+1. Include EXACTLY 3 specific activities for this day - do NOT use generic placeholders.
+2. Include EXACTLY 3 meal locations (breakfast, lunch, dinner) - always use real restaurant names.
+3. All activities MUST be real, well-known attractions or experiences in the Current Destination.
+4. Include specific and realistic cost estimates for all items.
+5. Provide detailed transportation details between activities with exact routes.
+6. All activities and restaurants MUST be specific to the Current Destination - research real places.
+7. For restaurants, include specific cuisine types that honor the Dietary Restrictions.
+8. All times should be realistic and allow for proper travel time between locations.
+9. Focus only on this specific day's itinerary - be thorough and detailed.
+10. DO NOT use generic descriptions like "Local Museum" or "City Park" - always use real, specific names.
+11. DO NOT recommend any activities or restaurants already recommended in previous days.
+12. DO NOT duplicate any of the previously recommended activities or restaurants listed under DAY DETAILS.
+13. IMPORTANT: Activity and restaurant names should be specific and identifiable (e.g., "The Louvre Museum" not "Art Museum", "Café de Flore" not "Local Café").
+14. Include highly specific details in all descriptions - mention specific exhibits, dishes, routes, etc.
+15. Every restaurant must be a real establishment that exists in the Current Destination.
+"""
+
+# Replaces the prose formats when the schema is sent as a response_format.
+_STRUCTURED_OUTPUT_FORMAT = """## REQUIRED OUTPUT FORMAT
+Respond with a JSON object that follows the provided response schema.
+
+"""
+
+
 class AIService:
     """
     Service for handling interactions with AI and search services to generate 
@@ -17,41 +206,245 @@ class AIService:
     def __init__(self):
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         
-        self.openai_client = openai.OpenAI(api_key=self.openai_api_key)
+        # Async client so that cancelling a call (e.g. a losing hedge) also
+        # closes the upstream request instead of leaving a worker thread running.
+        # AI_CASSETTE_MODE=record|replay captures or replays upstream calls.
+        self.openai_client = cassette_client_from_env(lambda: openai.AsyncOpenAI(api_key=self.openai_api_key))
         
-        # Maximum token count for GPT-3.5-Turbo
+        # Default output token cap; routes may override it per task
         self.max_tokens = 4096
         
-    async def generate_trip_plan(self, trip_data: Dict[str, Any]) -> Dict[str, Any]:
+        # Per-task primary/fallback models (AI_MODEL_ROUTES_FILE)
+        self.model_router = ModelRouter()
+        
+        # Speculative day generation after a trip plan (PREWARM_DAY_ITINERARIES)
+        self.prewarmer = DayPrewarmer(self._generate_day_itinerary)
+        
+        # Duplicate slow upstream calls to cut tail latency (AI_HEDGE_ENABLED)
+        self.hedger = Hedger()
+        
+        # Trips at least this long are generated as a skeleton plus parallel day batches
+        self.chunked_min_days = int(os.getenv("AI_CHUNKED_PLAN_MIN_DAYS", "5"))
+        self.chunked_days_per_batch = int(os.getenv("AI_CHUNKED_PLAN_DAYS_PER_BATCH", "3"))
+        self.chunked_concurrency = int(os.getenv("AI_CHUNKED_PLAN_CONCURRENCY", "4"))
+        
+        # Send the trip plan and day itinerary schemas as a response_format
+        # instead of prose (AI_STRUCTURED_OUTPUT). Those calls only go to the
+        # route's models that support json_schema response formats; a route
+        # without one is refused here rather than failing every request.
+        self.structured_output = os.getenv("AI_STRUCTURED_OUTPUT", "false").lower() == "true"
+        if self.structured_output:
+            for task in (TASK_TRIP_PLAN, TASK_DAY):
+                self.model_router.route(task, structured_output=True)
+        
+        # Deadline for requests whose caller does not pass one (AI_REQUEST_TIMEOUT_SECONDS)
+        default_timeout = os.getenv("AI_REQUEST_TIMEOUT_SECONDS")
+        self.default_request_timeout = float(default_timeout) if default_timeout else None
+        
+        # Work given up on because its deadline passed or its caller went away
+        self.abandoned = {"deadline_exceeded": 0, "client_disconnected": 0, "upstream_calls_aborted": 0}
+        
+        # Fail fast while the upstream is erroring or slow (AI_BREAKER_ENABLED) and
+        # serve the last good result for a matching request, marked stale; those
+        # results are refreshed in the background once the circuit closes again
+        self.stale_results = StaleResultStore()
+        self.breaker = CircuitBreaker(on_close=self.stale_results.revalidate)
+        
+    async def run_request(
+        self,
+        coro: Awaitable[Any],
+        timeout_seconds: Optional[float] = None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> Any:
+        """
+        Run one caller's generation under its deadline.
+        
+        The deadline bounds time spent queueing for upstream slots as well as
+        each upstream call's timeout. When it passes, or is_disconnected
+        reports the caller is gone, the work is cancelled, which aborts the
+        in-flight upstream requests.
+        
+        Args:
+            coro (Awaitable[Any]): Generation to run, e.g. generate_trip_plan(...)
+            timeout_seconds (float, optional): Caller's time budget; defaults
+                to AI_REQUEST_TIMEOUT_SECONDS
+            is_disconnected (Callable, optional): Async check for a gone caller
+            
+        Returns:
+            Any: The generation's result
+        """
+        if timeout_seconds is None:
+            timeout_seconds = self.default_request_timeout
+        try:
+            return await run_until(coro, timeout_seconds, is_disconnected)
+        except DeadlineExceeded:
+            self.abandoned["deadline_exceeded"] += 1
+            raise
+        except ClientDisconnected:
+            self.abandoned["client_disconnected"] += 1
+            raise
+    
+    async def generate_trip_plan(self, trip_data: Dict[str, Any], mode: Optional[str] = None) -> Dict[str, Any]:
         """
         Generate a comprehensive trip plan based on user preferences.
         
         Args:
             trip_data (Dict[str, Any]): User's trip preferences and details
+            mode (str, optional): "single" for one completion, "chunked" for a
+                skeleton plus parallel day batches; chosen by trip length when omitted
             
         Returns:
-            Dict[str, Any]: Complete trip itinerary
+            Dict[str, Any]: Complete trip itinerary; with the circuit breaker
+                enabled and the upstream unavailable, the last plan for the same
+                inputs (or the same trip and dates) marked "stale" instead
         """
         try:
-            prompt = self._create_trip_plan_prompt(trip_data)
+            itinerary = await self._generate_trip_plan_fresh(trip_data, mode)
             
-            ai_response = await self._get_ai_response(prompt)
-            
-            itinerary = self._parse_ai_response(ai_response)
+            self.prewarmer.schedule(trip_data, itinerary)
             
             return itinerary
             
         except Exception as e:
+            stale = self._stale_result(e, *self._trip_plan_keys(trip_data))
+            if stale is not None:
+                return stale
             print(f"Error generating trip plan: {str(e)}")
             raise e
     
-    async def regenerate_trip_plan(self, trip_id: str, modifications: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def _generate_trip_plan_fresh(self, trip_data: Dict[str, Any], mode: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Generate a trip plan with the upstream model and remember it as the
+        stale fallback for its inputs.
+        
+        Args:
+            trip_data (Dict[str, Any]): User's trip preferences and details
+            mode (str, optional): "single" or "chunked"; chosen by trip length when omitted
+            
+        Returns:
+            Dict[str, Any]: Complete trip itinerary
+        """
+        spec = TripSpec.from_trip_data(trip_data)
+        if mode is None:
+            mode = "chunked" if spec.day_count >= self.chunked_min_days else "single"
+        
+        # While the breaker only lets probes through, the parallel calls of a
+        # chunked plan would be short-circuited and cancel the probe with them
+        generation_mode = "single" if self.breaker.recovering() else mode
+        
+        async with self.prewarmer.interactive():
+            if generation_mode == "chunked":
+                itinerary = await self._generate_trip_plan_chunked(trip_data, spec)
+            else:
+                prompt = self._create_trip_plan_prompt(trip_data)
+                ai_response = await self._get_ai_response(
+                    prompt, TASK_TRIP_PLAN, self._response_format("trip_plan", TRIP_PLAN_SCHEMA)
+                )
+                itinerary = postprocess_trip_plan(self._parse_ai_response(ai_response), spec)
+        
+        itinerary["generatedFrom"] = generation_inputs(trip_data)
+        
+        if self.breaker.enabled:
+            key, aliases = self._trip_plan_keys(trip_data)
+            trip_data = dict(trip_data)
+            self.stale_results.put(key, itinerary, aliases, refresh=lambda: self._generate_trip_plan_fresh(trip_data, mode))
+        
+        return itinerary
+    
+    def _trip_plan_keys(self, trip_data: Dict[str, Any]):
+        """Stale-result key for a trip plan's exact inputs, and the looser same-trip-and-dates alias."""
+        spec = TripSpec.from_trip_data(trip_data)
+        same_trip = f"trip:{trip_key(trip_data)}:{spec.destination}:{spec.first_day}:{spec.last_day}"
+        return f"trip:{spec.fingerprint}", [same_trip]
+    
+    def _stale_result(self, error: Exception, key: str, aliases: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        The stored result to serve in place of a failed upstream generation.
+        
+        Args:
+            error (Exception): Why the fresh generation failed
+            key (str): Exact stale-result key of the request
+            aliases (List[str]): Looser keys to fall back to
+            
+        Returns:
+            Optional[Dict[str, Any]]: The stale result, or None when the breaker
+                is disabled, the error is not an upstream failure, or nothing matches
+        """
+        if not self.breaker.enabled or not isinstance(error, (CircuitOpenError, asyncio.TimeoutError, openai.OpenAIError)):
+            return None
+        reason = "circuit_open" if isinstance(error, CircuitOpenError) else "upstream_error"
+        stale = self.stale_results.get(key, aliases, reason)
+        if stale is not None:
+            print(f"Serving stale result ({reason}): {str(error)}")
+        return stale
+    
+    async def _generate_trip_plan_chunked(self, trip_data: Dict[str, Any], spec: TripSpec) -> Dict[str, Any]:
+        """
+        Generate a trip plan as one skeleton call (flights, accommodations,
+        additional info) running alongside batches of daily itineraries, then
+        stitch the parts into the single-call output shape.
+        
+        Args:
+            trip_data (Dict[str, Any]): User's trip preferences and details
+            spec (TripSpec): Normalized trip inputs
+            
+        Returns:
+            Dict[str, Any]: Complete trip itinerary
+        """
+        day_numbers = list(range(1, spec.day_count + 1))
+        batches = [
+            day_numbers[i:i + self.chunked_days_per_batch]
+            for i in range(0, len(day_numbers), self.chunked_days_per_batch)
+        ]
+        semaphore = asyncio.Semaphore(self.chunked_concurrency)
+        
+        async def generate_batch(batch: List[int]) -> Dict[str, Any]:
+            async with semaphore:
+                # Fail fast if the deadline passed while waiting for a slot
+                bounded_timeout(None)
+                prompt = self._create_days_batch_prompt(trip_data, batch)
+                return self._parse_ai_response(await self._get_ai_response(prompt, TASK_DAY))
+        
+        skeleton_response, *batch_results = await gather_or_cancel(
+            self._get_ai_response(self._create_trip_skeleton_prompt(trip_data), TASK_TRIP_PLAN),
+            *[generate_batch(batch) for batch in batches],
+        )
+        itinerary = self._parse_ai_response(skeleton_response)
+        
+        generated = {}
+        for batch, result in zip(batches, batch_results):
+            days = result.get("dailyItinerary", [])
+            for position, day in enumerate(days):
+                day_number = day.get("day") if day.get("day") in batch else None
+                if day_number is None and position < len(batch):
+                    day_number = batch[position]
+                if day_number is not None:
+                    generated.setdefault(day_number, day)
+        
+        itinerary["dailyItinerary"] = [
+            {**(generated.get(day_number) or {"activities": [], "meals": [], "transportation": []}), "day": day_number}
+            for day_number in day_numbers
+        ]
+        
+        return postprocess_trip_plan(itinerary, spec)
+    
+    async def regenerate_trip_plan(
+        self,
+        trip_id: str,
+        modifications: Optional[Dict[str, Any]] = None,
+        previous_itinerary: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         """
         Regenerate a trip plan with specified modifications.
         
+        When the previous itinerary is given and records the inputs it was
+        generated from, only the sections affected by the changed inputs are
+        regenerated and merged back in; otherwise the whole plan is regenerated.
+        
         Args:
             trip_id (str): ID of the trip to regenerate
-            modifications (Dict[str, Any], optional): Specific changes to make
+            modifications (Dict[str, Any], optional): Updated trip details and preferences
+            previous_itinerary (Dict[str, Any], optional): The trip's current itinerary
             
         Returns:
             Dict[str, Any]: Updated trip itinerary
@@ -60,12 +453,121 @@ class AIService:
             if not modifications:
                 raise ValueError("Modifications are required for trip regeneration")
             
-            return await self.generate_trip_plan(modifications)
+            old_inputs = (previous_itinerary or {}).get("generatedFrom")
+            plan = plan_regeneration(old_inputs, modifications, previous_itinerary)
+            print(f"Regenerating trip {trip_id}: {plan.summary()}")
+            
+            self.prewarmer.cancel(trip_key(modifications))
+            
+            # A sectional update fans out like a chunked plan, so while the breaker
+            # is probing the plan is regenerated as one call instead
+            if plan.full or self.breaker.recovering():
+                return await self.generate_trip_plan(modifications)
+            
+            try:
+                return await self._regenerate_sections(modifications, previous_itinerary, plan)
+            except (CircuitOpenError, asyncio.TimeoutError, openai.OpenAIError) as e:
+                if not self.breaker.enabled:
+                    raise
+                # Keep the trip's current plan; its generatedFrom still records
+                # the old inputs, so the next regeneration picks the change up.
+                print(f"Serving previous itinerary for trip {trip_id}: {str(e)}")
+                reason = "circuit_open" if isinstance(e, CircuitOpenError) else "upstream_error"
+                return {**previous_itinerary, "stale": True, "staleReason": reason}
             
         except Exception as e:
             print(f"Error regenerating trip plan: {str(e)}")
             raise e
     
+    async def _regenerate_sections(
+        self,
+        trip_data: Dict[str, Any],
+        previous_itinerary: Dict[str, Any],
+        plan: RegenerationPlan,
+    ) -> Dict[str, Any]:
+        """
+        Regenerate the sections named by a RegenerationPlan and merge them into
+        the previous itinerary.
+        
+        Args:
+            trip_data (Dict[str, Any]): Updated trip details and preferences
+            previous_itinerary (Dict[str, Any]): The trip's current itinerary
+            plan (RegenerationPlan): Sections to regenerate
+            
+        Returns:
+            Dict[str, Any]: Merged trip itinerary
+        """
+        spec = TripSpec.from_trip_data(trip_data)
+        old_days = {day.get("day"): day for day in previous_itinerary.get("dailyItinerary", [])}
+        kept_days = [old_days[old_day] for old_day in plan.kept_days.values()]
+        
+        travel_task = None
+        if plan.flights or plan.stays:
+            travel_prompt = self._create_travel_sections_prompt(trip_data, plan.flights, plan.stays)
+            travel_task = self._get_ai_response(travel_prompt, TASK_DAY)
+        
+        day_numbers = sorted(plan.days)
+        day_data = {**trip_data, "existingDays": kept_days}
+        day_tasks = [self._generate_day_itinerary(day_data, day) for day in day_numbers]
+        
+        meals_task = None
+        if plan.meal_days:
+            meals_task = self._get_ai_response(self._create_meals_prompt(trip_data, sorted(plan.meal_days)), TASK_DAY)
+        
+        results = await gather_or_cancel(
+            travel_task or asyncio.sleep(0, result=None),
+            meals_task or asyncio.sleep(0, result=None),
+            *day_tasks,
+        )
+        travel = self._parse_ai_response(results[0]) if results[0] else {}
+        meals = self._parse_ai_response(results[1]) if results[1] else {}
+        new_days = {day: result.get("dayItinerary", result) for day, result in zip(day_numbers, results[2:])}
+        
+        itinerary = dict(previous_itinerary)
+        
+        if plan.flights:
+            itinerary["flights"] = travel.get("flights", [])
+        
+        if plan.stays:
+            def replaced(accommodation: Dict[str, Any]) -> bool:
+                # Nights booked: check-in up to the night before check-out
+                check_in = parse_iso_datetime(accommodation.get("checkIn"))
+                if check_in is None:
+                    return True
+                check_out = parse_iso_datetime(accommodation.get("checkOut"))
+                first_night = check_in.date()
+                last_night = max(first_night, check_out.date() - timedelta(days=1)) if check_out else first_night
+                if last_night < spec.first_day or first_night > spec.last_day:
+                    return True
+                return any(first_night <= end and last_night >= start for _, start, end in plan.stays)
+            
+            itinerary["accommodations"] = [
+                acc for acc in previous_itinerary.get("accommodations", []) if not replaced(acc)
+            ] + travel.get("accommodations", [])
+        
+        meals_by_day = {entry.get("day"): entry.get("meals", []) for entry in meals.get("days", [])}
+        
+        daily_itinerary = []
+        for day in range(1, spec.day_count + 1):
+            if day in new_days:
+                entry = {key: value for key, value in new_days[day].items() if key != "accommodation"}
+            else:
+                entry = dict(old_days[plan.kept_days[day]])
+                if day in plan.meal_days and day in meals_by_day:
+                    entry["meals"] = meals_by_day[day]
+                day_date = spec.date_for_day(day)
+                if any(start <= day_date <= end for _, start, end in plan.stays):
+                    # Filled in again from the new accommodations
+                    entry.pop("accommodation", None)
+            entry["day"] = day
+            daily_itinerary.append(entry)
+        
+        itinerary["dailyItinerary"] = daily_itinerary
+        itinerary = postprocess_trip_plan(itinerary, spec, previous_itinerary)
+        itinerary["generatedFrom"] = generation_inputs(trip_data)
+        
+        return itinerary
+    
     async def generate_day_itinerary(self, trip_data: Dict[str, Any], day_number: int) -> Dict[str, Any]:
         """
         Generate an itinerary for a specific day of a trip.
@@ -78,18 +580,69 @@ class AIService:
             Dict[str, Any]: The daily itinerary for the specified day
         """
         try:
-            prompt = self._create_day_itinerary_prompt(trip_data, day_number)
-            
-            ai_response = await self._get_ai_response(prompt)
+            prewarmed = await self.prewarmer.take(trip_data, day_number)
+            if prewarmed is not None:
+                return prewarmed
             
-            day_itinerary = self._parse_ai_response(ai_response)
-            
-            return day_itinerary
+            async with self.prewarmer.interactive():
+                return await self._generate_day_itinerary(trip_data, day_number)
             
         except Exception as e:
             print(f"Error generating day itinerary: {str(e)}")
             raise e
     
+    async def _generate_day_itinerary(self, trip_data: Dict[str, Any], day_number: int) -> Dict[str, Any]:
+        """
+        Generate a day itinerary with the upstream model, bypassing the prewarm cache.
+        
+        Args:
+            trip_data (Dict[str, Any]): Trip details and preferences
+            day_number (int): The day number to generate an itinerary for
+            
+        Returns:
+            Dict[str, Any]: The daily itinerary for the specified day
+        """
+        prompt = self._create_day_itinerary_prompt(trip_data, day_number)
+        
+        ai_response = await self._get_ai_response(
+            prompt, TASK_DAY, self._response_format("day_itinerary", DAY_ITINERARY_SCHEMA)
+        )
+        
+        day_itinerary = self._parse_ai_response(ai_response)
+        if isinstance(day_itinerary.get("dayItinerary"), dict):
+            spec = TripSpec.from_trip_data(trip_data)
+            day_itinerary["dayItinerary"] = postprocess_day(day_itinerary["dayItinerary"], spec, day_number)
+        
+        return day_itinerary
+    
+    def cancel_prewarm(self, trip_id: str) -> bool:
+        """
+        Discard prewarmed days for a trip that was edited or deleted.
+        
+        Args:
+            trip_id (str): ID of the trip
+            
+        Returns:
+            bool: True if the trip had prewarmed state
+        """
+        return self.prewarmer.cancel(trip_id)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Snapshot of the service's runtime counters.
+        
+        Returns:
+            Dict[str, Any]: Metrics grouped by component
+        """
+        return {
+            "prewarm": self.prewarmer.metrics(),
+            "hedging": self.hedger.metrics(),
+            "routing": self.model_router.metrics(),
+            "abandoned": dict(self.abandoned),
+            "breaker": self.breaker.metrics(),
+            "stale_results": self.stale_results.metrics(),
+        }
+    
     async def get_travel_recommendations(self, query: str) -> Dict[str, Any]:
         """
         Get travel recommendations based on a natural language query.
@@ -98,48 +651,150 @@ class AIService:
             query (str): Natural language query about travel plans
             
         Returns:
-            Dict[str, Any]: Travel recommendations in structured format
+            Dict[str, Any]: Travel recommendations in structured format; marked
+                "stale" when served from an earlier identical query (see generate_trip_plan)
         """
         try:
-            prompt = self._create_recommendations_prompt(query)
-            
-            ai_response = await self._get_ai_response(prompt)
-            
-            recommendations = self._parse_ai_response(ai_response)
-            
-            return recommendations
+            return await self._get_travel_recommendations_fresh(query)
             
         except Exception as e:
+            stale = self._stale_result(e, self._recommendations_key(query), [])
+            if stale is not None:
+                return stale
             print(f"Error getting travel recommendations: {str(e)}")
             raise e
     
-    async def _get_ai_response(self, prompt: str) -> str:
+    async def _get_travel_recommendations_fresh(self, query: str) -> Dict[str, Any]:
+        prompt = self._create_recommendations_prompt(query)
+        
+        ai_response = await self._get_ai_response(prompt, TASK_RECOMMENDATIONS)
+        
+        recommendations = self._parse_ai_response(ai_response)
+        
+        if self.breaker.enabled:
+            self.stale_results.put(
+                self._recommendations_key(query),
+                recommendations,
+                refresh=lambda: self._get_travel_recommendations_fresh(query),
+            )
+        
+        return recommendations
+    
+    def _recommendations_key(self, query: str) -> str:
+        return "recommendations:" + " ".join(query.lower().split())
+    
+    def _response_format(self, name: str, schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The response_format for a schema in structured-output mode, else None."""
+        return response_format(name, schema) if self.structured_output else None
+    
+    async def _get_ai_response(
+        self,
+        prompt: str,
+        task: str = TASK_TRIP_PLAN,
+        output_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         Get a response from the OpenAI API.
         
+        When the circuit breaker is enabled, the call fails fast with
+        CircuitOpenError while the circuit is open, and its outcome and
+        latency (across all fallback models) feed the breaker.
+        
         Args:
             prompt (str): The prompt to send to OpenAI
+            task (str): Routing task (trip plan, single day or recommendations)
+            output_format (Dict[str, Any], optional): response_format constraining the output
             
         Returns:
             str: The AI response
         """
+        probe = self.breaker.before_call()
+        start = time.monotonic()
         try:
-            response = await asyncio.to_thread(
-                self.openai_client.chat.completions.create,
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a travel planning expert that always responds in valid JSON format."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=self.max_tokens,
-                temperature=0.7
-            )
+            content = await self._get_model_response(prompt, task, output_format)
+        except (asyncio.CancelledError, DeadlineExceeded):
+            # The caller gave up; that says nothing about the upstream's health
+            self.breaker.release(probe)
+            raise
+        except Exception:
+            self.breaker.record(False, time.monotonic() - start, probe)
+            raise
+        self.breaker.record(True, time.monotonic() - start, probe)
+        return content
+    
+    async def _get_model_response(
+        self,
+        prompt: str,
+        task: str,
+        output_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Get a response from the task's models.
+        
+        The task's models are tried in the order given by the model router;
+        a model that errors or exceeds the task timeout falls through to the
+        next one. Each attempt is hedged when hedging is enabled and it is
+        slower than the configured latency percentile. Timeouts are capped by
+        the request deadline; once it passes no further model is tried.
+        
+        Args:
+            prompt (str): The prompt to send to OpenAI
+            task (str): Routing task (trip plan, single day or recommendations)
+            output_format (Dict[str, Any], optional): response_format constraining the output
             
-            return response.choices[0].message.content
+        Returns:
+            str: The AI response
+        """
+        route = self.model_router.route(task, structured_output=output_format is not None)
+        last_error: Optional[Exception] = None
+        
+        for attempt, model in enumerate(route["models"]):
+            if attempt:
+                self.model_router.record_fallback()
+                print(f"Falling back to {model} for {task}")
             
-        except Exception as e:
-            print(f"Error getting AI response: {str(e)}")
-            raise e
+            route_timeout = route["timeout_seconds"]
+            timeout = bounded_timeout(route_timeout)
+            start = time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    self.hedger.run(
+                        lambda: self.openai_client.chat.completions.create(
+                            model=model,
+                            messages=[
+                                {"role": "system", "content": "You are a travel planning expert that always responds in valid JSON format."},
+                                {"role": "user", "content": prompt}
+                            ],
+                            max_tokens=route["max_tokens"] or self.max_tokens,
+                            temperature=0.7,
+                            **({"response_format": output_format} if output_format else {})
+                        ),
+                        key=f"{task}:{model}",
+                    ),
+                    timeout=timeout,
+                )
+                self.model_router.record(model, True, time.monotonic() - start)
+                
+                return response.choices[0].message.content
+                
+            except asyncio.CancelledError:
+                self.abandoned["upstream_calls_aborted"] += 1
+                raise
+            except asyncio.TimeoutError as e:
+                left = remaining()
+                if left is not None and left <= 0 and (route_timeout is None or timeout < route_timeout):
+                    # The caller's deadline, not the model, cut the call short
+                    self.abandoned["upstream_calls_aborted"] += 1
+                    raise DeadlineExceeded(f"Deadline exceeded waiting for {model}") from e
+                self.model_router.record(model, False, time.monotonic() - start, timed_out=True)
+                print(f"Error getting AI response from {model}: timed out after {timeout:.0f}s")
+                last_error = e
+            except openai.OpenAIError as e:
+                self.model_router.record(model, False, time.monotonic() - start)
+                print(f"Error getting AI response from {model}: {str(e)}")
+                last_error = e
+        
+        raise last_error or RuntimeError(f"No model configured for task {task}")
     
     def _parse_ai_response(self, response: str) -> Dict[str, Any]:
         """
@@ -182,15 +837,15 @@ class AIService:
                 }
             }
     
-    def _create_trip_plan_prompt(self, trip_data: Dict[str, Any]) -> str:
+    def _format_trip_overview(self, trip_data: Dict[str, Any]) -> str:
         """
-        Create a detailed prompt for trip plan generation.
+        Format the trip overview and preference sections shared by the trip prompts.
         
         Args:
             trip_data (Dict[str, Any]): Trip details and preferences
             
         Returns:
-            str: Formatted prompt
+            str: Overview, preferences and additional destinations as prompt text
         """
         destination = trip_data.get("destination", "Unknown")
         start_date = trip_data.get("startDate", "")
@@ -254,25 +909,156 @@ class AIService:
                 if dest_places:
                     additional_destinations_text += f"  - Places to Visit: {dest_places}\n"
         
-        prompt = f"""
-# TRAVEL ITINERARY GENERATION REQUEST
-
-## Trip Overview
+        return f"""## Trip Overview
 - Main Destination: {destination}
 - Dates: {start_date} to {end_date} ({trip_duration})
 - Total Budget: ${budget}
 - Accommodation Preference: {accommodation_type}
 - Transportation Preference: {transportation_type}
-- Departure Location: {departure_location}
-- Number of Travelers: {number_of_travelers}
+- Departure Location: {departure_location}
+- Number of Travelers: {number_of_travelers}
+
+## Preferences
+- Activities of Interest: {activities}
+- Places to Visit: {places_to_visit}
+- Dietary Restrictions: {dietary_restrictions}{additional_destinations_text}"""
+    
+    def _create_trip_plan_prompt(self, trip_data: Dict[str, Any]) -> str:
+        """
+        Create a detailed prompt for trip plan generation.
+        
+        The instructions, output format and guidelines come first and are
+        identical for every trip, so the upstream can cache them as a prompt
+        prefix; the trip details follow at the end.
+        
+        Args:
+            trip_data (Dict[str, Any]): Trip details and preferences
+            
+        Returns:
+            str: Formatted prompt
+        """
+        output_format = _STRUCTURED_OUTPUT_FORMAT if self.structured_output else _TRIP_PLAN_OUTPUT_FORMAT
+        return (
+            _TRIP_PLAN_INSTRUCTIONS
+            + output_format
+            + _TRIP_PLAN_GUIDELINES
+            + "\n# TRIP DETAILS\n\n"
+            + self._format_trip_overview(trip_data)
+            + "\n"
+        )
+    
+    def _create_day_itinerary_prompt(self, trip_data: Dict[str, Any], day_number: int) -> str:
+        """
+        Create a prompt for generating a specific day's itinerary.
+        
+        Args:
+            trip_data (Dict[str, Any]): Trip details and preferences
+            day_number (int): The day number to generate an itinerary for
+            
+        Returns:
+            str: Formatted prompt; static instructions first, day details last
+        """
+        destination = trip_data.get("destination", "Unknown")
+        start_date = trip_data.get("startDate", "")
+        budget = trip_data.get("budget", 0)
+        
+        specific_date = ""
+        try:
+            start = datetime.fromisoformat(start_date.replace('Z', '+00:00')) if 'Z' in start_date else datetime.fromisoformat(start_date)
+            target_date = start + timedelta(days=day_number - 1)
+            specific_date = target_date.strftime('%Y-%m-%d')
+        except:
+            specific_date = "Unknown Date"
+        
+        preferences = trip_data.get("preferences", {})
+        transportation_type = preferences.get("transportationType", "Any")
+        activities = ", ".join(preferences.get("activities", []))
+        dietary_restrictions = ", ".join(preferences.get("dietaryRestrictions", []))
+        places_to_visit = ", ".join(preferences.get("placesToVisit", []))
+        
+        destinations = trip_data.get("destinations", [])
+        current_destination = destination
+        
+        for dest in destinations:
+            dest_start = dest.get("startDate", "")
+            dest_end = dest.get("endDate", "")
+            
+            if dest_start and dest_end:
+                try:
+                    dest_start_date = datetime.fromisoformat(dest_start.replace('Z', '+00:00')) if 'Z' in dest_start else datetime.fromisoformat(dest_start)
+                    dest_end_date = datetime.fromisoformat(dest_end.replace('Z', '+00:00')) if 'Z' in dest_end else datetime.fromisoformat(dest_end)
+                    
+                    if dest_start_date <= target_date <= dest_end_date:
+                        current_destination = dest.get("location", destination)
+                        if "placesToVisit" in dest and dest["placesToVisit"]:
+                            places_to_visit = ", ".join(dest["placesToVisit"])
+                        break
+                except:
+                    pass
+        
+        existing_activities = []
+        existing_restaurants = []
+        
+        if "existingDays" in trip_data and trip_data["existingDays"]:
+            for day in trip_data["existingDays"]:
+                if "activities" in day and day["activities"]:
+                    for activity in day["activities"]:
+                        if "name" in activity and activity["name"]:
+                            existing_activities.append(activity["name"])
+                        if "activity" in activity and activity["activity"]:
+                            existing_activities.append(activity["activity"])
+                
+                if "meals" in day and day["meals"]:
+                    for meal in day["meals"]:
+                        if "restaurant" in meal and meal["restaurant"]:
+                            existing_restaurants.append(meal["restaurant"])
+        
+        existing_activities_str = ", ".join(existing_activities) if existing_activities else "None"
+        existing_restaurants_str = ", ".join(existing_restaurants) if existing_restaurants else "None"
+        
+        output_format = _STRUCTURED_OUTPUT_FORMAT if self.structured_output else _DAY_ITINERARY_OUTPUT_FORMAT
+        details = f"""
+# DAY DETAILS
+
+## Day Overview
+- Day Number: {day_number}
+- Date: {specific_date}
+- Current Destination: {current_destination}
+- Daily Budget: Approximately ${budget / 10} (portion of total budget)
+- Transportation Preference: {transportation_type}
 
 ## Preferences
 - Activities of Interest: {activities}
 - Places to Visit: {places_to_visit}
-- Dietary Restrictions: {dietary_restrictions}{additional_destinations_text}
+- Dietary Restrictions: {dietary_restrictions}
+
+## Previously Recommended (AVOID DUPLICATING THESE)
+- Activities/Attractions: {existing_activities_str}
+- Restaurants: {existing_restaurants_str}
+"""
+        
+        return _DAY_ITINERARY_INSTRUCTIONS + output_format + _DAY_ITINERARY_GUIDELINES + details
+    
+    def _create_trip_skeleton_prompt(self, trip_data: Dict[str, Any]) -> str:
+        """
+        Create a prompt for the trip skeleton used by chunked generation:
+        everything except the daily itineraries and cost totals.
+        
+        Args:
+            trip_data (Dict[str, Any]): Trip details and preferences
+            
+        Returns:
+            str: Formatted prompt
+        """
+        overview = self._format_trip_overview(trip_data)
+        
+        prompt = f"""
+# TRAVEL ITINERARY SKELETON REQUEST
+
+{overview}
 
 ## REQUIRED OUTPUT FORMAT
-You MUST provide a complete travel itinerary in valid JSON format matching the following structure. Do not include any explanations or text outside of the JSON structure.
+Provide ONLY flights, accommodations and additional information in valid JSON format matching the following structure. Daily itineraries are planned separately; do not include them.
 
 ```json
 {{
@@ -300,15 +1086,68 @@ You MUST provide a complete travel itinerary in valid JSON format matching the f
       "type": "Hotel/Hostel/Airbnb/etc."
     }}
   ],
+  "additionalInfo": {{
+    "emergencyContacts": ["Contact 1", "Contact 2"],
+    "localCustoms": ["Custom 1", "Custom 2"],
+    "packingList": ["Item 1", "Item 2"]
+  }}
+}}
+```
+
+## GENERATION GUIDELINES
+1. ALWAYS use real airline names and real hotel chains or accommodation names.
+2. Use the provided departure location as the flight origin and include both airport code and city name for every flight.
+3. For multi-destination trips, include one accommodation per destination covering its dates and flights between destinations where appropriate.
+4. Include realistic prices suitable for the budget and number of travelers.
+5. Provide emergency contacts specific to the destination, 2-3 local customs and 2-3 packing recommendations.
+"""
+        
+        return prompt
+    
+    def _create_days_batch_prompt(self, trip_data: Dict[str, Any], day_numbers: List[int]) -> str:
+        """
+        Create a prompt for a batch of consecutive days used by chunked generation.
+        
+        Args:
+            trip_data (Dict[str, Any]): Trip details and preferences
+            day_numbers (List[int]): Days to generate
+            
+        Returns:
+            str: Formatted prompt
+        """
+        spec = TripSpec.from_trip_data(trip_data)
+        preferences = trip_data.get("preferences", {})
+        activities = ", ".join(preferences.get("activities", []))
+        dietary_restrictions = ", ".join(preferences.get("dietaryRestrictions", []))
+        transportation_type = preferences.get("transportationType", "Any")
+        days_text = "\n".join(
+            f"- Day {day} ({spec.date_for_day(day)}): {spec.destination_for_day(day)}" for day in day_numbers
+        )
+        
+        prompt = f"""
+# DAILY ITINERARIES GENERATION REQUEST
+
+## Trip Context
+- Main Destination: {spec.destination}
+- Trip Dates: {spec.first_day} to {spec.last_day} ({spec.day_count} days)
+- Total Budget: ${spec.budget}
+- Transportation Preference: {transportation_type}
+- Activities of Interest: {activities}
+- Dietary Restrictions: {dietary_restrictions}
+
+## Days To Plan
+{days_text}
+
+The other days of this {spec.day_count}-day trip are planned in parallel. Spread these days over different neighborhoods and attractions so they do not overlap with a typical plan for the other days.
+
+## REQUIRED OUTPUT FORMAT
+Respond with valid JSON only, one entry per day listed above.
+
+```json
+{{
   "dailyItinerary": [
     {{
-      "day": 1,
-      "date": "YYYY-MM-DD",
-      "accommodation": {{
-        "name": "Real Accommodation Name",
-        "location": "Address",
-        "notes": "Any special notes about the stay"
-      }},
+      "day": {day_numbers[0]},
       "activities": [
         {{
           "time": "HH:MM AM/PM",
@@ -326,6 +1165,7 @@ You MUST provide a complete travel itinerary in valid JSON format matching the f
           "restaurant": "Real Restaurant Name",
           "cuisine": "Type of cuisine",
           "priceRange": "$-$$$",
+          "cost": 0,
           "dietaryOptions": ["Option 1", "Option 2"]
         }}
       ],
@@ -338,189 +1178,152 @@ You MUST provide a complete travel itinerary in valid JSON format matching the f
         }}
       ]
     }}
-  ],
-  "totalCost": {{
-    "flights": 0,
-    "accommodation": 0,
-    "activities": 0,
-    "transportation": 0,
-    "meals": 0,
-    "total": 0
-  }},
-  "additionalInfo": {{
-    "emergencyContacts": ["Contact 1", "Contact 2"],
-    "localCustoms": ["Custom 1", "Custom 2"],
-    "packingList": ["Item 1", "Item 2"]
-  }}
+  ]
 }}
 ```
 
 ## GENERATION GUIDELINES
-1. Include 2-3 activities per day.
-2. Include 2-3 meal locations per day.
-3. Ensure all activities are appropriate for the destination and preferences.
-4. Include realistic cost estimates for all items.
-5. Provide emergency contacts specific to the destination.
-6. Include accommodation details suitable for the budget and preferences.
-7. Provide 2-3 packing recommendations appropriate for the destination.
-8. Include 2-3 local customs or cultural norms to be aware of.
-9. Provide detailed transportation options based on preferences.
-10. ALWAYS use real airline names (Delta, United, American Airlines, British Airways, Air France, etc.) instead of generic names like "Sample Airlines" or "Example Airlines".
-11. ALWAYS use real hotel chains, restaurant names, and attraction names when available.
-12. When planning flights, use the provided departure location as the origin, NOT the destination. This should be the user's home airport/city.
-13. If the user provided a city name or region rather than an airport code, select the most appropriate major airport serving that location (e.g., "JFK" or "LaGuardia" if user provided "New York").
-14. For flights, clearly include both the airport code and city name in both departure and arrival locations.
-15. IMPORTANT: For multi-destination trips, plan activities appropriate for each destination during the dates specified.
-16. CRITICAL: If the trip includes multiple destinations, plan daily itineraries for ALL destinations based on their respective date ranges.
-17. Make sure to include transportation between different destinations in the itinerary.
+1. Include 2-3 activities and 2-3 meals per day at real, specific places in that day's destination.
+2. Do not repeat an attraction or restaurant across the days in this batch.
+3. Include realistic cost estimates for all items, including an estimated cost per meal.
+4. Include transportation between activities and between destinations when the destination changes.
 """
         
         return prompt
     
-    def _create_day_itinerary_prompt(self, trip_data: Dict[str, Any], day_number: int) -> str:
+    def _create_travel_sections_prompt(self, trip_data: Dict[str, Any], include_flights: bool, stays: List[Any]) -> str:
         """
-        Create a prompt for generating a specific day's itinerary.
+        Create a prompt that regenerates only flights and/or specific accommodations.
         
         Args:
             trip_data (Dict[str, Any]): Trip details and preferences
-            day_number (int): The day number to generate an itinerary for
+            include_flights (bool): Whether to regenerate the flights
+            stays (List[Any]): (location, first date, last date) stays needing accommodation
             
         Returns:
             str: Formatted prompt
         """
-        destination = trip_data.get("destination", "Unknown")
-        start_date = trip_data.get("startDate", "")
-        budget = trip_data.get("budget", 0)
-        
-        specific_date = ""
-        try:
-            start = datetime.fromisoformat(start_date.replace('Z', '+00:00')) if 'Z' in start_date else datetime.fromisoformat(start_date)
-            target_date = start + timedelta(days=day_number - 1)
-            specific_date = target_date.strftime('%Y-%m-%d')
-        except:
-            specific_date = "Unknown Date"
-        
+        spec = TripSpec.from_trip_data(trip_data)
         preferences = trip_data.get("preferences", {})
-        transportation_type = preferences.get("transportationType", "Any")
-        activities = ", ".join(preferences.get("activities", []))
-        dietary_restrictions = ", ".join(preferences.get("dietaryRestrictions", []))
-        places_to_visit = ", ".join(preferences.get("placesToVisit", []))
-        
-        destinations = trip_data.get("destinations", [])
-        current_destination = destination
         
-        for dest in destinations:
-            dest_start = dest.get("startDate", "")
-            dest_end = dest.get("endDate", "")
-            
-            if dest_start and dest_end:
-                try:
-                    dest_start_date = datetime.fromisoformat(dest_start.replace('Z', '+00:00')) if 'Z' in dest_start else datetime.fromisoformat(dest_start)
-                    dest_end_date = datetime.fromisoformat(dest_end.replace('Z', '+00:00')) if 'Z' in dest_end else datetime.fromisoformat(dest_end)
-                    
-                    if dest_start_date <= target_date <= dest_end_date:
-                        current_destination = dest.get("location", destination)
-                        if "placesToVisit" in dest and dest["placesToVisit"]:
-                            places_to_visit = ", ".join(dest["placesToVisit"])
-                        break
-                except:
-                    pass
+        requested = []
+        if include_flights:
+            requested.append(
+                f"- Round-trip flights from {spec.departure_location} for {spec.travelers} traveler(s), "
+                f"departing {spec.first_day} and returning {spec.last_day}, plus flights between destinations"
+            )
+        for location, first, last in stays:
+            check_out = first + timedelta(days=(last - first).days + 1)
+            requested.append(f"- One accommodation in {location}, check-in {first}, check-out {check_out}")
+        requested_text = "\n".join(requested)
         
-        existing_activities = []
-        existing_restaurants = []
+        prompt = f"""
+# PARTIAL TRAVEL ITINERARY UPDATE
+
+## Trip Overview
+- Main Destination: {spec.destination}
+- Dates: {spec.first_day} to {spec.last_day}
+- Total Budget: ${spec.budget}
+- Accommodation Preference: {preferences.get("accommodationType", "Any")}
+- Number of Travelers: {spec.travelers}
+
+## Sections To Generate
+{requested_text}
+
+## REQUIRED OUTPUT FORMAT
+Respond with valid JSON only. Include only the keys for the sections requested above.
+
+```json
+{{
+  "flights": [
+    {{
+      "airline": "Real Airline Name",
+      "flightNumber": "AA123",
+      "departureTime": "YYYY-MM-DDTHH:MM:SS",
+      "arrivalTime": "YYYY-MM-DDTHH:MM:SS",
+      "price": 0,
+      "bookingLink": "https://example.com",
+      "departureLocation": "Airport Code - City/Region",
+      "arrivalLocation": "Airport Code - City/Region"
+    }}
+  ],
+  "accommodations": [
+    {{
+      "name": "Real Hotel or Accommodation Name",
+      "location": "Address or Area",
+      "checkIn": "YYYY-MM-DDTHH:MM:SS",
+      "checkOut": "YYYY-MM-DDTHH:MM:SS",
+      "price": 0,
+      "amenities": ["Amenity 1", "Amenity 2"],
+      "bookingLink": "https://example.com",
+      "type": "Hotel/Hostel/Airbnb/etc."
+    }}
+  ]
+}}
+```
+
+## GENERATION GUIDELINES
+1. ALWAYS use real airline names and real hotel names.
+2. Use the departure location as the flight origin and include airport codes and city names.
+3. Keep prices realistic for the budget and number of travelers.
+"""
         
-        if "existingDays" in trip_data and trip_data["existingDays"]:
-            for day in trip_data["existingDays"]:
-                if "activities" in day and day["activities"]:
-                    for activity in day["activities"]:
-                        if "name" in activity and activity["name"]:
-                            existing_activities.append(activity["name"])
-                        if "activity" in activity and activity["activity"]:
-                            existing_activities.append(activity["activity"])
-                
-                if "meals" in day and day["meals"]:
-                    for meal in day["meals"]:
-                        if "restaurant" in meal and meal["restaurant"]:
-                            existing_restaurants.append(meal["restaurant"])
+        return prompt
+    
+    def _create_meals_prompt(self, trip_data: Dict[str, Any], day_numbers: List[int]) -> str:
+        """
+        Create a prompt that regenerates only the meals of specific days.
         
-        existing_activities_str = ", ".join(existing_activities) if existing_activities else "None"
-        existing_restaurants_str = ", ".join(existing_restaurants) if existing_restaurants else "None"
+        Args:
+            trip_data (Dict[str, Any]): Trip details and preferences
+            day_numbers (List[int]): Days whose meals should be replaced
+            
+        Returns:
+            str: Formatted prompt
+        """
+        spec = TripSpec.from_trip_data(trip_data)
+        dietary_restrictions = ", ".join(trip_data.get("preferences", {}).get("dietaryRestrictions", [])) or "None"
+        days_text = "\n".join(
+            f"- Day {day} ({spec.date_for_day(day)}): {spec.destination_for_day(day)}" for day in day_numbers
+        )
         
         prompt = f"""
-# DAILY ITINERARY GENERATION REQUEST
-
-## Day Overview
-- Day Number: {day_number}
-- Date: {specific_date}
-- Current Destination: {current_destination}
-- Daily Budget: Approximately ${budget / 10} (portion of total budget)
-- Transportation Preference: {transportation_type}
+# MEAL PLAN UPDATE
 
-## Preferences
-- Activities of Interest: {activities}
-- Places to Visit: {places_to_visit}
-- Dietary Restrictions: {dietary_restrictions}
+## Days
+{days_text}
 
-## Previously Recommended (AVOID DUPLICATING THESE)
-- Activities/Attractions: {existing_activities_str}
-- Restaurants: {existing_restaurants_str}
+## Dietary Restrictions
+{dietary_restrictions}
 
 ## REQUIRED OUTPUT FORMAT
-You MUST provide a daily itinerary in valid JSON format matching the following structure. Do not include any explanations or text outside of the JSON structure.
+Respond with valid JSON only, one entry per day listed above.
 
 ```json
 {{
-  "dayItinerary": {{
-    "day": {day_number},
-    "date": "{specific_date}",
-    "activities": [
-      {{
-        "time": "HH:MM AM/PM",
-        "activity": "Description of activity",
-        "name": "Real Attraction or Activity Name",
-        "location": "Specific Location",
-        "cost": 0,
-        "duration": "X hours",
-        "notes": "Any additional information"
-      }}
-    ],
-    "meals": [
-      {{
-        "time": "HH:MM AM/PM",
-        "restaurant": "Real Restaurant Name",
-        "cuisine": "Type of cuisine",
-        "priceRange": "$-$$$",
-        "dietaryOptions": ["Option 1", "Option 2"]
-      }}
-    ],
-    "transportation": [
-      {{
-        "type": "Specific Transportation Type",
-        "route": "From A to B",
-        "cost": 0,
-        "duration": "X minutes/hours"
-      }}
-    ]
-  }}
+  "days": [
+    {{
+      "day": 1,
+      "meals": [
+        {{
+          "time": "HH:MM AM/PM",
+          "restaurant": "Real Restaurant Name",
+          "cuisine": "Type of cuisine",
+          "priceRange": "$-$$$",
+          "cost": 0,
+          "dietaryOptions": ["Option 1", "Option 2"]
+        }}
+      ]
+    }}
+  ]
 }}
 ```
 
 ## GENERATION GUIDELINES
-1. Include EXACTLY 3 specific activities for this day - do NOT use generic placeholders.
-2. Include EXACTLY 3 meal locations (breakfast, lunch, dinner) - always use real restaurant names.
-3. All activities MUST be real, well-known attractions or experiences in {current_destination}.
-4. Include specific and realistic cost estimates for all items.
-5. Provide detailed transportation details between activities with exact routes.
-6. All activities and restaurants MUST be specific to {current_destination} - research real places.
-7. For restaurants, include specific cuisine types that honor these dietary restrictions: {dietary_restrictions}.
-8. All times should be realistic and allow for proper travel time between locations.
-9. Focus only on this specific day's itinerary - be thorough and detailed.
-10. DO NOT use generic descriptions like "Local Museum" or "City Park" - always use real, specific names.
-11. DO NOT recommend any activities or restaurants already recommended in previous days.
-12. DO NOT duplicate any of the previously recommended activities or restaurants listed above.
-13. IMPORTANT: Activity and restaurant names should be specific and identifiable (e.g., "The Louvre Museum" not "Art Museum", "Café de Flore" not "Local Café").
-14. Include highly specific details in all descriptions - mention specific exhibits, dishes, routes, etc.
-15. Every restaurant must be a real establishment that exists in {current_destination}.
+1. Include EXACTLY 3 meals (breakfast, lunch, dinner) per day at real restaurants in that day's destination.
+2. Every restaurant must honor the dietary restrictions above.
+3. Do not repeat a restaurant across days.
+4. Include an estimated cost per meal. Totals are computed for you; do not include them.
 """
         
         return prompt
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import asyncio
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, TextIO
+
+from server.ai_service import AIService
+from server.trip_spec import TRIP_INPUT_FIELDS, TripSpec
+
+BATCH_COMMANDS = ("generate_trip_plan", "regenerate_trip_plan", "generate_day_itinerary")
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def read_jsonl(stream: TextIO, default_command: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Parse batch requests, one JSON object per line:
+        {"id": "...", "command": "regenerate_trip_plan", "data": {...}}
+
+    "data" is what the single-request command takes as its argv JSON. Lines
+    without an id are identified by line number; lines that are not valid
+    JSON are yielded with an "error" so they are reported, not dropped.
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {"id": f"line:{line_number}", "error": f"Invalid JSON: {str(e)}"}
+            continue
+        request.setdefault("id", f"line:{line_number}")
+        request.setdefault("command", default_command)
+        yield request
+
+
+def trip_requests(trips: Iterable[Dict[str, Any]], command: str = "regenerate_trip_plan") -> Iterator[Dict[str, Any]]:
+    """
+    Turn stored trip documents into batch requests for the given command.
+
+    generate_day_itinerary yields one request per day of each trip, with the
+    trip's other planned days as existingDays, as the Node backend sends them.
+    """
+    for trip in trips:
+        trip_id = str(trip["_id"])
+        trip_data = {"tripId": trip_id}
+        trip_data.update({key: _jsonable(trip[key]) for key in TRIP_INPUT_FIELDS if trip.get(key) is not None})
+        previous = _jsonable(dict(trip["itinerary"])) if trip.get("itinerary") else None
+        if command == "generate_day_itinerary":
+            day_count = TripSpec.from_trip_data(trip_data).day_count
+            if not day_count:
+                yield {"id": trip_id, "command": command, "error": "Trip has no dates to plan days for"}
+            planned_days = (previous or {}).get("dailyItinerary", [])
+            for day_number in range(1, day_count + 1):
+                day_data = {
+                    **trip_data,
+                    "existingDays": [day for day in planned_days if day.get("day") != day_number],
+                }
+                yield {
+                    "id": f"{trip_id}:day-{day_number}",
+                    "command": command,
+                    "data": {"tripData": day_data, "dayNumber": day_number},
+                }
+            continue
+        if command == "regenerate_trip_plan":
+            data = {"tripId": trip_id, "tripData": trip_data, "previousItinerary": previous}
+        else:
+            data = trip_data
+        yield {"id": trip_id, "command": command, "data": data}
+
+
+def load_checkpoint(path: Optional[str]) -> Set[str]:
+    """IDs recorded as done by an earlier run."""
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+class BatchRunner:
+    """
+    Runs batch requests through AIService with bounded concurrency and an
+    optional rate limit, writing one JSONL line per request as it finishes:
+
+        {"id": ..., "ok": true, "result": {...}}
+        {"id": ..., "ok": false, "error": "..."}
+
+    IDs of successful requests are appended to the checkpoint file, so a
+    rerun with the same checkpoint skips them and retries only failures and
+    requests that never ran.
+
+    Args:
+        service: AIService to run requests on
+        output: Stream for result lines
+        concurrency: Requests in flight at once
+        rate: Max requests started per second (None for no limit)
+        checkpoint_path: File of completed IDs (None to disable resume)
+        timeout_seconds: Deadline per request
+    """
+
+    def __init__(
+        self,
+        service: AIService,
+        output: TextIO,
+        concurrency: int = 4,
+        rate: Optional[float] = None,
+        checkpoint_path: Optional[str] = None,
+        timeout_seconds: Optional[float] = None,
+    ):
+        self.service = service
+        self.output = output
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = RateLimiter(rate) if rate else None
+        self.checkpoint_path = checkpoint_path
+        self.timeout_seconds = timeout_seconds
+        self.completed = load_checkpoint(checkpoint_path)
+        self.stats = {"succeeded": 0, "failed": 0, "skipped": 0}
+
+    async def run(self, requests: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """Process every request; returns the succeeded/failed/skipped counts."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        checkpoint = open(self.checkpoint_path, "a") if self.checkpoint_path else None
+        workers = [asyncio.create_task(self._worker(queue, checkpoint)) for _ in range(self.concurrency)]
+        try:
+            # Requests are read lazily, so inputs larger than memory are fine.
+            for request in requests:
+                if str(request.get("id")) in self.completed:
+                    self.stats["skipped"] += 1
+                    continue
+                await queue.put(request)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            if checkpoint:
+                checkpoint.close()
+        return dict(self.stats)
+
+    async def _worker(self, queue: asyncio.Queue, checkpoint: Optional[TextIO]):
+        while True:
+            request = await queue.get()
+            if request is None:
+                return
+            request_id = str(request.get("id"))
+            try:
+                if request.get("error"):
+                    raise ValueError(request["error"])
+                if self.rate_limiter:
+                    await self.rate_limiter.acquire()
+                result = await self.service.run_request(self._dispatch(request), self.timeout_seconds)
+            except Exception as e:
+                self.stats["failed"] += 1
+                self._emit({"id": request_id, "ok": False, "error": f"{type(e).__name__}: {str(e)}"})
+                continue
+
+            self.stats["succeeded"] += 1
+            self._emit({"id": request_id, "ok": True, "result": result})
+            if checkpoint:
+                checkpoint.write(request_id + "\n")
+                checkpoint.flush()
+
+    def _dispatch(self, request: Dict[str, Any]):
+        command = request.get("command")
+        data = request.get("data") or {}
+        if command == "generate_trip_plan":
+            return self.service.generate_trip_plan(data)
+        if command == "regenerate_trip_plan":
+            return self.service.regenerate_trip_plan(data.get("tripId"), data.get("tripData"), data.get("previousItinerary"))
+        if command == "generate_day_itinerary":
+            if not data.get("tripData") or data.get("dayNumber") is None:
+                raise ValueError("Missing trip data or day number")
+            return self.service.generate_day_itinerary(data["tripData"], data["dayNumber"])
+        raise ValueError(f"Unknown command: {command}")
+
+    def _emit(self, record: Dict[str, Any]):
+        self.output.write(json.dumps(record, default=str) + "\n")
+        self.output.flush()
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items() if key != "_id"}
+    if isinstance(value, list):
+        return [_jsonable(item) for item in value]
+    return value
@@ -0,0 +1,122 @@
+import os
+import json
+import hashlib
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Any, Optional
+
+
+class CassetteMissError(Exception):
+    """Raised in replay mode when no recorded response matches a request."""
+
+
+def request_key(model: str, messages: List[Dict[str, str]], max_tokens: Optional[int], **params) -> str:
+    """
+    Stable identifier for an upstream request. Sampling parameters other than
+    the model, messages and token cap are included when they affect the output
+    format (e.g. response_format).
+    """
+    relevant = {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "response_format": params.get("response_format"),
+    }
+    encoded = json.dumps(relevant, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class _CassetteCompletions:
+    def __init__(self, owner: "CassetteClient"):
+        self.owner = owner
+
+    async def create(self, model: str, messages: List[Dict[str, str]], max_tokens: Optional[int] = None, **params):
+        owner = self.owner
+        key = request_key(model, messages, max_tokens, **params)
+        path = os.path.join(owner.directory, f"{key[:24]}.json")
+
+        if owner.mode == "replay":
+            try:
+                with open(path) as f:
+                    cassette = json.load(f)
+            except FileNotFoundError:
+                raise CassetteMissError(f"No cassette for request {key[:24]} in {owner.directory}")
+            return _response_from(cassette["response"])
+
+        response = await owner.client.chat.completions.create(
+            model=model, messages=messages, max_tokens=max_tokens, **params
+        )
+        choice = response.choices[0]
+        usage = getattr(response, "usage", None)
+        cassette = {
+            "request": {"model": model, "messages": messages, "max_tokens": max_tokens, **params},
+            "response": {
+                "model": getattr(response, "model", model),
+                "content": choice.message.content,
+                "finish_reason": getattr(choice, "finish_reason", None),
+                "usage": {
+                    "prompt_tokens": getattr(usage, "prompt_tokens", None),
+                    "completion_tokens": getattr(usage, "completion_tokens", None),
+                } if usage else None,
+            },
+        }
+        os.makedirs(owner.directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(cassette, f, indent=2, default=str)
+        return response
+
+
+class CassetteClient:
+    """
+    Wraps the OpenAI async client to record request/response pairs to
+    cassette files, or replays them without network access.
+
+    Modes:
+        record: forward to the real client and write one JSON file per request
+        replay: serve responses from the cassette directory; unknown requests
+            raise CassetteMissError
+    """
+
+    def __init__(self, mode: str, directory: str, client: Any = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == "record" and client is None:
+            raise ValueError("Record mode needs an upstream client")
+        self.mode = mode
+        self.directory = directory
+        self.client = client
+        self.chat = SimpleNamespace(completions=_CassetteCompletions(self))
+
+
+def _response_from(recorded: Dict[str, Any]) -> SimpleNamespace:
+    usage = recorded.get("usage") or {}
+    return SimpleNamespace(
+        model=recorded.get("model"),
+        choices=[SimpleNamespace(
+            message=SimpleNamespace(content=recorded.get("content")),
+            finish_reason=recorded.get("finish_reason"),
+        )],
+        usage=SimpleNamespace(
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+        ),
+    )
+
+
+def cassette_client_from_env(make_client: Callable[[], Any]) -> Any:
+    """
+    Build the upstream client, wrapped according to AI_CASSETTE_MODE ("record"
+    or "replay") and AI_CASSETTE_DIR. In replay mode the real client is never
+    created, so no API key or network access is needed.
+
+    Args:
+        make_client (Callable[[], Any]): Factory for the real OpenAI client
+
+    Returns:
+        Any: The real client when AI_CASSETTE_MODE is unset, else a CassetteClient
+    """
+    mode = os.getenv("AI_CASSETTE_MODE")
+    if not mode:
+        return make_client()
+    directory = os.getenv("AI_CASSETTE_DIR", os.path.join(os.getcwd(), "cassettes"))
+    print(f"AI cassettes: {mode} mode, directory {directory}")
+    return CassetteClient(mode, directory, make_client() if mode == "record" else None)
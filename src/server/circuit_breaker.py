@@ -0,0 +1,175 @@
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The upstream circuit is open; the call was not attempted."""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Stops sending traffic to the upstream while it is failing or slow.
+
+    Closed: calls go through and their outcomes are tracked in a rolling
+    window. The circuit opens when the window's error rate or p95 latency
+    crosses its threshold. Open: calls fail fast with CircuitOpenError until
+    the open period ends. Half-open: a limited number of concurrent probe
+    calls go through; enough consecutive successes close the circuit, and
+    a failure opens it again.
+
+    Configuration (environment):
+        AI_BREAKER_ENABLED: "true" to enable the breaker
+        AI_BREAKER_WINDOW: outcomes kept (default 20)
+        AI_BREAKER_MIN_SAMPLES: outcomes needed before it can open (default 5)
+        AI_BREAKER_ERROR_RATE: error rate that opens it (default 0.5)
+        AI_BREAKER_SLOW_SECONDS: p95 latency that opens it (default 60)
+        AI_BREAKER_OPEN_SECONDS: time open before probing (default 30)
+        AI_BREAKER_PROBES: concurrent probe calls while half-open (default 1)
+        AI_BREAKER_PROBES_TO_CLOSE: probe successes that close it (default 2)
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        window: Optional[int] = None,
+        min_samples: Optional[int] = None,
+        max_error_rate: Optional[float] = None,
+        max_p95_seconds: Optional[float] = None,
+        open_seconds: Optional[float] = None,
+        max_probes: Optional[int] = None,
+        probes_to_close: Optional[int] = None,
+        on_close: Optional[Callable[[], Any]] = None,
+    ):
+        self.enabled = enabled if enabled is not None else os.getenv("AI_BREAKER_ENABLED", "false").lower() == "true"
+        self.min_samples = min_samples or int(os.getenv("AI_BREAKER_MIN_SAMPLES", "5"))
+        self.max_error_rate = max_error_rate or float(os.getenv("AI_BREAKER_ERROR_RATE", "0.5"))
+        self.max_p95_seconds = max_p95_seconds or float(os.getenv("AI_BREAKER_SLOW_SECONDS", "60"))
+        self.open_seconds = open_seconds if open_seconds is not None else float(os.getenv("AI_BREAKER_OPEN_SECONDS", "30"))
+        self.max_probes = max_probes or int(os.getenv("AI_BREAKER_PROBES", "1"))
+        self.probes_to_close = probes_to_close or int(os.getenv("AI_BREAKER_PROBES_TO_CLOSE", "2"))
+        self.on_close = on_close
+
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window or int(os.getenv("AI_BREAKER_WINDOW", "20")))
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.stats = {"opened": 0, "closed": 0, "short_circuited": 0, "probes": 0}
+
+    def before_call(self) -> bool:
+        """
+        Admit or reject a call.
+
+        Returns:
+            bool: True if the call is a half-open probe
+
+        Raises:
+            CircuitOpenError: If the call must not go upstream
+        """
+        if not self.enabled:
+            return False
+
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+            self._probe_successes = 0
+
+        if self.state == CLOSED:
+            return False
+        if self.state == HALF_OPEN and self._probes_in_flight < self.max_probes:
+            self._probes_in_flight += 1
+            self.stats["probes"] += 1
+            return True
+
+        self.stats["short_circuited"] += 1
+        retry_after = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(f"Upstream circuit is {self.state}", retry_after)
+
+    def record(self, ok: bool, latency: float, probe: bool = False):
+        """
+        Record the outcome of an admitted call.
+
+        Args:
+            ok (bool): Whether the call succeeded
+            latency (float): Call duration in seconds
+            probe (bool): The value before_call returned for this call
+        """
+        if not self.enabled:
+            return
+
+        if probe:
+            self._probes_in_flight -= 1
+            if self.state != HALF_OPEN:
+                return
+            if not ok:
+                self._open()
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.probes_to_close:
+                self._close()
+            return
+
+        if self.state != CLOSED:
+            return
+        self._outcomes.append((ok, latency))
+        if len(self._outcomes) < self.min_samples:
+            return
+        p95 = self._p95()
+        if self._error_rate() >= self.max_error_rate or (p95 is not None and p95 > self.max_p95_seconds):
+            self._open()
+
+    def release(self, probe: bool):
+        """Give back a probe slot for a call that ended without an outcome (e.g. cancelled)."""
+        if probe and self.enabled:
+            self._probes_in_flight -= 1
+
+    def recovering(self) -> bool:
+        """Whether only probe calls get through: half-open, or open with its open period over."""
+        if not self.enabled or self.state == CLOSED:
+            return False
+        return self.state == HALF_OPEN or time.monotonic() - self._opened_at >= self.open_seconds
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "state": self.state,
+            "error_rate": self._error_rate(),
+            "p95_latency_seconds": self._p95(),
+        }
+
+    def _open(self):
+        if self.state != OPEN:
+            p95 = self._p95()
+            print(f"Upstream circuit opened: error rate {self._error_rate():.0%}, p95 latency {p95 or 0:.1f}s")
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.stats["opened"] += 1
+
+    def _close(self):
+        print("Upstream circuit closed")
+        self.state = CLOSED
+        self._outcomes.clear()
+        self.stats["closed"] += 1
+        if self.on_close:
+            self.on_close()
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self._outcomes if not ok) / len(self._outcomes)
+
+    def _p95(self) -> Optional[float]:
+        latencies = sorted(latency for ok, latency in self._outcomes if ok)
+        if not latencies:
+            return None
+        return latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
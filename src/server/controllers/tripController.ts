@@ -19,6 +19,18 @@ declare global {
 
 const aiService = new AIService();
 
+// Aborted if the client goes away before the response is sent, so the AI
+// service can stop generating for it.
+const abortOnClientClose = (res: Response): AbortSignal => {
+  const controller = new AbortController();
+  res.on('close', () => {
+    if (!res.writableFinished) {
+      controller.abort();
+    }
+  });
+  return controller.signal;
+};
+
 const hasPermission = (trip: TripDocument | ITrip, userId: string, requiredRole: 'owner' | 'editor' | 'viewer') => {
   if (!trip.collaborators) {
     return false;
@@ -133,6 +145,8 @@ export const updateTrip = async (req: Request, res: Response) => {
       return res.status(404).json({ message: 'Trip not found' });
     }
 
+    aiService.cancelPrewarm(id);
+
     res.json(trip);
   } catch (error) {
     console.error('Error updating trip:', error);
@@ -151,6 +165,8 @@ export const deleteTrip = async (req: Request, res: Response) => {
       return res.status(404).json({ message: 'Trip not found' });
     }
 
+    aiService.cancelPrewarm(req.params.id);
+
     res.json({ message: 'Trip deleted successfully' });
   } catch (error) {
     console.error('Error deleting trip:', error);
@@ -172,6 +188,7 @@ export const regenerateTripPlan = async (req: Request, res: Response) => {
     const clientTripData = req.body.tripData;
     
     const tripDataForAI = {
+      tripId: trip._id.toString(),
       destination: clientTripData?.destination || trip.destination,
       startDate: clientTripData?.startDate || trip.startDate,
       endDate: clientTripData?.endDate || trip.endDate,
@@ -181,7 +198,12 @@ export const regenerateTripPlan = async (req: Request, res: Response) => {
       destinations: clientTripData?.destinations || trip.destinations
     };
 
-    const aiGeneratedPlan = await aiService.generateTravelPlan(tripDataForAI);
+    const aiGeneratedPlan = await aiService.regenerateTravelPlan(
+      trip._id.toString(),
+      tripDataForAI,
+      trip.itinerary,
+      abortOnClientClose(res)
+    );
 
     trip.itinerary = aiGeneratedPlan.itinerary || trip.itinerary;
     await trip.save();
@@ -213,18 +235,22 @@ export const generateDayItinerary = async (req: Request, res: Response) => {
       return res.status(400).json({ message: 'Trip data is required in the request body' });
     }
     
+    // Same fields and fallbacks as regenerateTripPlan, so the Python service
+    // recognizes the trip it planned (and prewarmed days for).
     const tripDataForAI = {
-      destination: clientTripData.destination,
-      startDate: clientTripData.startDate,
-      endDate: clientTripData.endDate,
-      budget: clientTripData.budget,
-      preferences: clientTripData.preferences,
-      destinations: clientTripData.destinations,
+      tripId: trip._id.toString(),
+      destination: clientTripData.destination || trip.destination,
+      startDate: clientTripData.startDate || trip.startDate,
+      endDate: clientTripData.endDate || trip.endDate,
+      budget: clientTripData.budget !== undefined ? clientTripData.budget : trip.budget,
+      numberOfTravelers: clientTripData.numberOfTravelers || trip.travelers || 1,
+      preferences: clientTripData.preferences || trip.preferences,
+      destinations: clientTripData.destinations || trip.destinations,
       itinerary: clientTripData.itinerary,
       existingDays: existingDays
     };
     
-    const dayItinerary = await aiService.generateDayItinerary(tripDataForAI, day);
+    const dayItinerary = await aiService.generateDayItinerary(tripDataForAI, day, abortOnClientClose(res));
     
     if (!dayItinerary || !dayItinerary.dayItinerary) {
       return res.status(500).json({ message: 'Failed to generate day itinerary' });
@@ -0,0 +1,133 @@
+import time
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional
+
+# Absolute time.monotonic() by which the current request must finish. Tasks
+# copy the context they are created in, so gathered sub-calls and hedges
+# inherit the caller's deadline.
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before the work finished."""
+
+
+class ClientDisconnected(Exception):
+    """The caller went away before the work finished."""
+
+
+@contextmanager
+def deadline_scope(timeout_seconds: Optional[float]):
+    """
+    Set the deadline for the current context. A nested scope can only bring
+    the deadline forward; passing None keeps the enclosing one.
+
+    Args:
+        timeout_seconds (float, optional): Time budget from now
+    """
+    current = _deadline.get()
+    if timeout_seconds is not None:
+        proposed = time.monotonic() + timeout_seconds
+        current = proposed if current is None else min(current, proposed)
+    token = _deadline.set(current)
+    try:
+        yield current
+    finally:
+        _deadline.reset(token)
+
+
+def clear_deadline():
+    """Detach the current task from its creator's deadline (for background work)."""
+    _deadline.set(None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def bounded_timeout(timeout_seconds: Optional[float]) -> Optional[float]:
+    """
+    Clamp a per-call timeout to the time left before the deadline.
+
+    Raises:
+        DeadlineExceeded: If the deadline already passed
+    """
+    left = remaining()
+    if left is None:
+        return timeout_seconds
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded before the call started")
+    return left if timeout_seconds is None else min(timeout_seconds, left)
+
+
+async def run_until(
+    coro: Awaitable[Any],
+    timeout_seconds: Optional[float] = None,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    poll_interval: float = 0.5,
+) -> Any:
+    """
+    Run a coroutine under a deadline, cancelling it when the deadline passes
+    or the caller disconnects. Cancellation reaches the upstream calls it is
+    awaiting, which closes their HTTP requests.
+
+    Args:
+        coro (Awaitable[Any]): Work to run
+        timeout_seconds (float, optional): Time budget from now
+        is_disconnected (Callable, optional): Async check for a gone caller
+        poll_interval (float): Seconds between disconnect checks
+
+    Returns:
+        Any: The coroutine's result
+
+    Raises:
+        DeadlineExceeded: If the deadline passed first
+        ClientDisconnected: If the caller disconnected first
+    """
+    with deadline_scope(timeout_seconds) as deadline:
+        task = asyncio.ensure_future(coro)
+
+    try:
+        while True:
+            wait = poll_interval if is_disconnected else None
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise DeadlineExceeded("Deadline exceeded")
+                wait = left if wait is None else min(wait, left)
+            done, _ = await asyncio.wait([task], timeout=wait)
+            if done:
+                return task.result()
+            if is_disconnected and await is_disconnected():
+                raise ClientDisconnected("Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+            # Let the cancellation unwind (and close upstream connections)
+            # before reporting the outcome.
+            await asyncio.wait([task])
+
+
+async def gather_or_cancel(*aws: Awaitable[Any]) -> list:
+    """
+    Like asyncio.gather, but when one awaitable fails the others are cancelled
+    and awaited before the error is raised, so no upstream call outlives it.
+
+    Returns:
+        list: The results, in the order given
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -0,0 +1,167 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Awaitable, TypeVar
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Rolling window of call latencies with percentile lookups."""
+
+    def __init__(self, window: int = 500):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(int(len(ordered) * pct / 100), len(ordered) - 1)
+        return ordered[index]
+
+
+class Hedger:
+    """
+    Issues a duplicate ("hedged") upstream call when the original has not
+    completed by a latency percentile of recent calls, returns whichever
+    finishes first and cancels the other.
+
+    Hedges are capped at a percentage of recent traffic so that a slow
+    upstream cannot double our load.
+
+    Configuration (environment):
+        AI_HEDGE_ENABLED: "true" to enable hedging
+        AI_HEDGE_PERCENTILE: latency percentile that triggers a hedge (default 95)
+        AI_HEDGE_BUDGET_PERCENT: max hedged share of recent calls (default 5)
+        AI_HEDGE_MIN_DELAY_SECONDS: lower bound on the hedge delay (default 2)
+        AI_HEDGE_MIN_SAMPLES: samples needed before hedging starts (default 20)
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        percentile: Optional[float] = None,
+        budget_percent: Optional[float] = None,
+        min_delay: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        window: int = 1000,
+    ):
+        self.enabled = enabled if enabled is not None else os.getenv("AI_HEDGE_ENABLED", "false").lower() == "true"
+        self.percentile = percentile or float(os.getenv("AI_HEDGE_PERCENTILE", "95"))
+        self.budget_percent = budget_percent if budget_percent is not None else float(os.getenv("AI_HEDGE_BUDGET_PERCENT", "5"))
+        self.min_delay = min_delay if min_delay is not None else float(os.getenv("AI_HEDGE_MIN_DELAY_SECONDS", "2"))
+        self.min_samples = min_samples if min_samples is not None else int(os.getenv("AI_HEDGE_MIN_SAMPLES", "20"))
+
+        # Latencies are tracked per key (task and model), since a full trip
+        # plan and a single day have very different latency profiles.
+        self.latency: Dict[str, LatencyTracker] = {}
+        self._recent_hedges = deque(maxlen=window)
+
+        self.stats = {
+            "calls": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "budget_denied": 0,
+        }
+
+    def hedge_delay(self, key: str = "default") -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little data."""
+        tracker = self.latency.get(key)
+        if tracker is None or len(tracker) < self.min_samples:
+            return None
+        return max(tracker.percentile(self.percentile), self.min_delay)
+
+    async def run(self, call: Callable[[], Awaitable[T]], key: str = "default") -> T:
+        """
+        Run an upstream call, hedging it if it is slow.
+
+        Args:
+            call (Callable[[], Awaitable[T]]): Factory for the upstream call; invoked
+                once more for the hedge
+            key (str): Latency class of the call
+
+        Returns:
+            T: The result of whichever attempt succeeded first
+        """
+        self.stats["calls"] += 1
+        delay = self.hedge_delay(key) if self.enabled else None
+        tracker = self.latency.setdefault(key, LatencyTracker())
+
+        # Only the primary feeds the latency window, so the delay tracks the
+        # upstream's own latency rather than the faster of two attempts.
+        started = time.monotonic()
+        primary = asyncio.create_task(self._timed(call, tracker))
+        attempts = [primary]
+        # Whatever ends this call (a result, an error, or the caller being
+        # cancelled while waiting for the hedge delay), no attempt outlives it.
+        try:
+            if delay is None:
+                self._recent_hedges.append(False)
+                return await primary
+
+            done, _ = await asyncio.wait([primary], timeout=delay)
+            if done or not self._within_budget():
+                self._recent_hedges.append(False)
+                return await primary
+
+            self.stats["hedged"] += 1
+            self._recent_hedges.append(True)
+            hedge = asyncio.create_task(self._timed(call))
+            attempts.append(hedge)
+            pending = {primary, hedge}
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.stats["hedge_wins"] += 1
+                            if not primary.done():
+                                # The primary is cancelled; it took at least this long
+                                tracker.record(time.monotonic() - started)
+                        return task.result()
+            # Both attempts failed: surface the original call's error.
+            return primary.result()
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+
+    def metrics(self) -> Dict[str, Any]:
+        calls = self.stats["calls"]
+        hedged = self.stats["hedged"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "hedge_rate": hedged / calls if calls else 0.0,
+            "hedge_win_rate": self.stats["hedge_wins"] / hedged if hedged else 0.0,
+            "latency": {
+                key: {
+                    "hedge_delay_seconds": self.hedge_delay(key),
+                    "p50_seconds": tracker.percentile(50),
+                    "p99_seconds": tracker.percentile(99),
+                }
+                for key, tracker in self.latency.items()
+            },
+        }
+
+    def _within_budget(self) -> bool:
+        window = len(self._recent_hedges) + 1
+        if sum(self._recent_hedges) + 1 > window * self.budget_percent / 100:
+            self.stats["budget_denied"] += 1
+            return False
+        return True
+
+    async def _timed(self, call: Callable[[], Awaitable[T]], tracker: Optional[LatencyTracker] = None) -> T:
+        start = time.monotonic()
+        result = await call()
+        if tracker is not None:
+            tracker.record(time.monotonic() - start)
+        return result
@@ -0,0 +1,210 @@
+import os
+import copy
+import json
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+# Tasks that AIService routes independently.
+TASK_TRIP_PLAN = "trip_plan"
+TASK_DAY = "day"
+TASK_RECOMMENDATIONS = "recommendations"
+
+# Model IDs that accept json_schema response formats (AI_STRUCTURED_OUTPUT).
+# Exact IDs, since earlier snapshots of the same families (e.g. gpt-4o-2024-05-13)
+# reject them. AI_STRUCTURED_OUTPUT_MODELS replaces the set (comma-separated IDs).
+STRUCTURED_OUTPUT_MODELS = frozenset({
+    "gpt-4o", "gpt-4o-2024-08-06", "gpt-4o-2024-11-20",
+    "gpt-4o-mini", "gpt-4o-mini-2024-07-18",
+    "gpt-4.1", "gpt-4.1-2025-04-14", "gpt-4.1-mini", "gpt-4.1-mini-2025-04-14", "gpt-4.1-nano", "gpt-4.1-nano-2025-04-14",
+    "o1", "o1-2024-12-17", "o3-mini", "o3-mini-2025-01-31", "o3", "o3-2025-04-16", "o4-mini", "o4-mini-2025-04-16",
+    "gpt-5", "gpt-5-mini", "gpt-5-nano",
+})
+
+DEFAULT_ROUTES: Dict[str, Any] = {
+    "tasks": {
+        TASK_TRIP_PLAN: {"models": ["gpt-3.5-turbo", "gpt-4o-mini"], "timeout_seconds": 120},
+        TASK_DAY: {"models": ["gpt-3.5-turbo", "gpt-4o-mini"], "timeout_seconds": 45},
+        TASK_RECOMMENDATIONS: {"models": ["gpt-3.5-turbo", "gpt-4o-mini"], "timeout_seconds": 45},
+    },
+    "health": {
+        "window": 50,
+        "min_samples": 5,
+        "max_error_rate": 0.5,
+        "max_p95_latency_seconds": 60,
+        "cooldown_seconds": 60,
+    },
+}
+
+
+class _ModelHealth:
+    """Rolling outcomes for one model."""
+
+    def __init__(self, window: int):
+        self.outcomes = deque(maxlen=window)
+        self.degraded_until = 0.0
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self.outcomes if not ok) / len(self.outcomes)
+
+    def p95_latency(self) -> Optional[float]:
+        latencies = sorted(latency for ok, latency in self.outcomes if ok)
+        if not latencies:
+            return None
+        return latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+
+
+class ModelRouter:
+    """
+    Maps each generation task to an ordered list of models (primary first,
+    then fallbacks) and routes away from models whose recent error rate or
+    latency crosses the configured thresholds.
+
+    Routes are read from the JSON file named by AI_MODEL_ROUTES_FILE when it
+    is set (same shape as DEFAULT_ROUTES); the file is re-read whenever it
+    changes, so routes can be edited without a restart.
+    """
+
+    def __init__(self, routes_file: Optional[str] = None, reload_interval: float = 5.0):
+        self.routes_file = routes_file or os.getenv("AI_MODEL_ROUTES_FILE")
+        self.reload_interval = reload_interval
+        self.config: Dict[str, Any] = copy.deepcopy(DEFAULT_ROUTES)
+        self._loaded_mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._health: Dict[str, _ModelHealth] = {}
+        self.stats = {"fallbacks": 0, "timeouts": 0, "reloads": 0}
+        self.reload()
+
+    def reload(self) -> bool:
+        """
+        Re-read the routes file if it changed since it was last loaded.
+
+        Returns:
+            bool: True if a new configuration was applied
+        """
+        self._last_check = time.monotonic()
+        if not self.routes_file:
+            return False
+        try:
+            mtime = os.path.getmtime(self.routes_file)
+            if mtime == self._loaded_mtime:
+                return False
+            with open(self.routes_file) as f:
+                loaded = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error loading model routes from {self.routes_file}: {str(e)}")
+            return False
+
+        self.config = copy.deepcopy({
+            "tasks": {
+                task: {**DEFAULT_ROUTES["tasks"].get(task, {}), **route}
+                for task, route in {**DEFAULT_ROUTES["tasks"], **loaded.get("tasks", {})}.items()
+            },
+            "health": {**DEFAULT_ROUTES["health"], **loaded.get("health", {})},
+        })
+        self._loaded_mtime = mtime
+        self.stats["reloads"] += 1
+        return True
+
+    def route(self, task: str, structured_output: bool = False) -> Dict[str, Any]:
+        """
+        Resolve the models to try for a task, healthy models first.
+
+        Args:
+            task (str): One of the TASK_* names
+            structured_output (bool): Keep only models that accept json_schema response formats
+
+        Returns:
+            Dict[str, Any]: {"models": [...], "timeout_seconds": float, "max_tokens": Optional[int]}
+
+        Raises:
+            ValueError: If structured_output is set and no model of the route supports it
+        """
+        if time.monotonic() - self._last_check >= self.reload_interval:
+            self.reload()
+
+        route = self.config["tasks"].get(task) or self.config["tasks"][TASK_TRIP_PLAN]
+        models = list(route["models"])
+        if structured_output:
+            models = [m for m in models if supports_structured_output(m)]
+            if not models:
+                raise ValueError(
+                    f"AI_STRUCTURED_OUTPUT is on but no model routed for {task} ({', '.join(route['models'])}) "
+                    "supports json_schema response formats; add one such as gpt-4o-mini to the route"
+                )
+        healthy = [m for m in models if not self._is_degraded(m)]
+        degraded = [m for m in models if m not in healthy]
+
+        return {
+            "models": healthy + degraded,
+            "timeout_seconds": route.get("timeout_seconds"),
+            "max_tokens": route.get("max_tokens"),
+        }
+
+    def record(self, model: str, ok: bool, latency: float, timed_out: bool = False):
+        """
+        Record the outcome of one upstream call.
+
+        Args:
+            model (str): Model that served the call
+            ok (bool): Whether the call succeeded
+            latency (float): Call duration in seconds
+            timed_out (bool): Whether the call hit the task timeout
+        """
+        health = self._health_for(model)
+        health.outcomes.append((ok, latency))
+        if timed_out:
+            self.stats["timeouts"] += 1
+
+        settings = self.config["health"]
+        if len(health.outcomes) < settings["min_samples"]:
+            return
+
+        p95 = health.p95_latency()
+        if health.error_rate() > settings["max_error_rate"] or (p95 is not None and p95 > settings["max_p95_latency_seconds"]):
+            if health.degraded_until <= time.monotonic():
+                print(f"Model {model} degraded: error rate {health.error_rate():.0%}, p95 {p95}")
+            health.degraded_until = time.monotonic() + settings["cooldown_seconds"]
+
+    def record_fallback(self):
+        self.stats["fallbacks"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "models": {
+                model: {
+                    "samples": len(health.outcomes),
+                    "error_rate": health.error_rate(),
+                    "p95_latency_seconds": health.p95_latency(),
+                    "degraded": self._is_degraded(model),
+                }
+                for model, health in self._health.items()
+            },
+        }
+
+    def _health_for(self, model: str) -> _ModelHealth:
+        if model not in self._health:
+            self._health[model] = _ModelHealth(self.config["health"]["window"])
+        return self._health[model]
+
+    def _is_degraded(self, model: str) -> bool:
+        health = self._health.get(model)
+        if health is None or not health.degraded_until:
+            return False
+        if health.degraded_until > time.monotonic():
+            return True
+        # Cooldown over: start the model with a clean window so it can recover.
+        health.degraded_until = 0.0
+        health.outcomes.clear()
+        return False
+
+
+def supports_structured_output(model: str) -> bool:
+    """Whether a model accepts json_schema response formats (fine-tunes count as their base model)."""
+    configured = os.getenv("AI_STRUCTURED_OUTPUT_MODELS")
+    models = {m.strip() for m in configured.split(",") if m.strip()} if configured else STRUCTURED_OUTPUT_MODELS
+    base = model.split(":")[1] if model.startswith("ft:") else model
+    return base in models
@@ -0,0 +1,98 @@
+from typing import Any, Dict
+
+# JSON schemas for structured-output mode (AI_STRUCTURED_OUTPUT). They describe
+# the same shapes as the prose formats in the prompts. Strict mode requires
+# every property to be listed as required and no additional properties.
+
+
+def _object(properties: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def _array(items: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "array", "items": items}
+
+
+_STRING = {"type": "string"}
+_NUMBER = {"type": "number"}
+_STRINGS = _array(_STRING)
+
+ACTIVITY = _object({
+    "time": {"type": "string", "description": "HH:MM AM/PM"},
+    "activity": _STRING,
+    "name": {"type": "string", "description": "Real attraction or activity name"},
+    "location": _STRING,
+    "cost": _NUMBER,
+    "duration": _STRING,
+    "notes": _STRING,
+})
+
+MEAL = _object({
+    "time": {"type": "string", "description": "HH:MM AM/PM"},
+    "restaurant": {"type": "string", "description": "Real restaurant name"},
+    "cuisine": _STRING,
+    "priceRange": {"type": "string", "description": "$-$$$"},
+    "cost": _NUMBER,
+    "dietaryOptions": _STRINGS,
+})
+
+TRANSPORTATION = _object({
+    "type": _STRING,
+    "route": {"type": "string", "description": "From A to B"},
+    "cost": _NUMBER,
+    "duration": _STRING,
+})
+
+DAY = _object({
+    "day": {"type": "integer"},
+    "activities": _array(ACTIVITY),
+    "meals": _array(MEAL),
+    "transportation": _array(TRANSPORTATION),
+})
+
+FLIGHT = _object({
+    "airline": {"type": "string", "description": "Real airline name"},
+    "flightNumber": _STRING,
+    "departureTime": {"type": "string", "description": "YYYY-MM-DDTHH:MM:SS"},
+    "arrivalTime": {"type": "string", "description": "YYYY-MM-DDTHH:MM:SS"},
+    "price": _NUMBER,
+    "bookingLink": _STRING,
+    "departureLocation": {"type": "string", "description": "Airport code - city (e.g. JFK - New York)"},
+    "arrivalLocation": {"type": "string", "description": "Airport code - city (e.g. CDG - Paris)"},
+})
+
+ACCOMMODATION = _object({
+    "name": _STRING,
+    "location": _STRING,
+    "checkIn": {"type": "string", "description": "YYYY-MM-DDTHH:MM:SS"},
+    "checkOut": {"type": "string", "description": "YYYY-MM-DDTHH:MM:SS"},
+    "price": _NUMBER,
+    "amenities": _STRINGS,
+    "bookingLink": _STRING,
+    "type": {"type": "string", "description": "Hotel/Hostel/Airbnb/etc."},
+})
+
+ADDITIONAL_INFO = _object({
+    "emergencyContacts": _STRINGS,
+    "localCustoms": _STRINGS,
+    "packingList": _STRINGS,
+})
+
+TRIP_PLAN_SCHEMA = _object({
+    "flights": _array(FLIGHT),
+    "accommodations": _array(ACCOMMODATION),
+    "dailyItinerary": _array(DAY),
+    "additionalInfo": ADDITIONAL_INFO,
+})
+
+DAY_ITINERARY_SCHEMA = _object({"dayItinerary": DAY})
+
+
+def response_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """The chat.completions response_format that constrains output to a schema."""
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
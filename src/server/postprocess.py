@@ -0,0 +1,220 @@
+import re
+from datetime import date
+from typing import Dict, List, Any, Optional
+
+from server.trip_spec import TripSpec, parse_iso_datetime
+
+# Fields the model no longer writes because they are derived here:
+# totalCost, dailyItinerary[].date, dailyItinerary[].accommodation.
+
+_TIME_RE = re.compile(r"^\s*(\d{1,2})(?:[:.](\d{2}))?\s*([AaPp])\.?\s*[Mm]?\.?\s*$|^\s*(\d{1,2})[:.](\d{2})\s*$")
+
+
+def normalize_time(value: Any) -> Any:
+    """
+    Normalize a clock time ("9am", "21:30", "9:00 p.m.") to "HH:MM AM/PM".
+    Values that are not recognizable times are returned unchanged.
+    """
+    if not isinstance(value, str):
+        return value
+    match = _TIME_RE.match(value)
+    if not match:
+        return value
+
+    if match.group(1) is not None:
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        if not 1 <= hour <= 12:
+            return value
+        hour = hour % 12 + (12 if match.group(3).lower() == "p" else 0)
+    else:
+        hour, minute = int(match.group(4)), int(match.group(5))
+
+    if hour > 23 or minute > 59:
+        return value
+    return f"{hour % 12 or 12:02d}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+def normalize_datetime(value: Any) -> Any:
+    """Normalize an ISO date-time to "YYYY-MM-DDTHH:MM:SS"; other values are returned unchanged."""
+    parsed = parse_iso_datetime(value)
+    return parsed.isoformat(timespec="seconds") if parsed else value
+
+
+def accommodation_for_date(accommodations: List[Dict[str, Any]], day_date: Optional[date]) -> Dict[str, Any]:
+    """
+    Pick the accommodation whose stay covers a date, in the per-day shape.
+
+    Args:
+        accommodations (List[Dict[str, Any]]): Trip accommodations with checkIn/checkOut
+        day_date (date): Day to look up
+
+    Returns:
+        Dict[str, Any]: {"name", "location", "notes"}, or {} when no stay covers the date
+    """
+    if day_date is None:
+        return {}
+    # Prefer the stay that covers the night over the one checking out that day.
+    for include_checkout in (False, True):
+        for acc in accommodations:
+            check_in = parse_iso_datetime(acc.get("checkIn"))
+            check_out = parse_iso_datetime(acc.get("checkOut"))
+            if not check_in or not check_out:
+                continue
+            if check_in.date() <= day_date < check_out.date() or (include_checkout and day_date == check_out.date()):
+                return {"name": acc.get("name", ""), "location": acc.get("location", ""), "notes": ""}
+    return {}
+
+
+def recompute_total_cost(itinerary: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Recompute the totalCost breakdown from the itinerary's line items.
+
+    Meals without a numeric cost (e.g. kept from an itinerary generated before
+    meals were costed) are estimated from the previous breakdown: its average
+    cost per meal, or per day for days that list no meals.
+    """
+    days = itinerary.get("dailyItinerary", [])
+
+    previous = previous or {}
+    previous_meals = (previous.get("totalCost") or {}).get("meals", 0) or 0
+    previous_days = previous.get("dailyItinerary", [])
+    previous_meal_count = sum(len(day.get("meals", [])) for day in previous_days)
+    per_day = previous_meals / (len(previous_days) or len(days) or 1)
+    per_meal = previous_meals / previous_meal_count if previous_meal_count else None
+
+    meals = 0.0
+    for day in days:
+        day_meals = day.get("meals", [])
+        if not day_meals:
+            meals += per_day
+            continue
+        for meal in day_meals:
+            cost = meal.get("cost")
+            if isinstance(cost, (int, float)):
+                meals += cost
+            else:
+                meals += per_meal if per_meal is not None else per_day / len(day_meals)
+
+    total = {
+        "flights": sum(_cost(f, "price") for f in itinerary.get("flights", [])),
+        "accommodation": sum(_cost(a, "price") for a in itinerary.get("accommodations", [])),
+        "activities": sum(_cost(a, "cost") for day in days for a in day.get("activities", [])),
+        "transportation": sum(_cost(t, "cost") for day in days for t in day.get("transportation", [])),
+        "meals": meals,
+    }
+    total["total"] = sum(total.values())
+    return total
+
+
+def postprocess_day(day: Dict[str, Any], spec: TripSpec, day_number: int) -> Dict[str, Any]:
+    """
+    Fill the derivable fields of one day and normalize its times.
+
+    Args:
+        day (Dict[str, Any]): Day as returned by the model
+        spec (TripSpec): Normalized trip inputs
+        day_number (int): Position of the day in the trip
+
+    Returns:
+        Dict[str, Any]: The day with "day" and "date" set
+    """
+    entry = dict(day)
+    entry["day"] = day_number
+    day_date = spec.date_for_day(day_number)
+    if day_date:
+        entry["date"] = day_date.isoformat()
+    for key in ("activities", "meals", "transportation"):
+        entry[key] = [_normalize_item_time(item) for item in entry.get(key) or [] if isinstance(item, dict)]
+    return entry
+
+
+def postprocess_trip_plan(
+    itinerary: Dict[str, Any],
+    spec: TripSpec,
+    previous: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Derive everything in a trip plan that the model does not need to write.
+
+    Day numbers and dates come from the TripSpec, each day's accommodation
+    from the accommodations' check-in/check-out range, and totalCost from
+    the line items. Times are normalized and an activity or restaurant that
+    already appeared on an earlier day is dropped.
+
+    Args:
+        itinerary (Dict[str, Any]): Parsed model output
+        spec (TripSpec): Normalized trip inputs
+        previous (Dict[str, Any], optional): Itinerary this one replaces, for meal totals
+
+    Returns:
+        Dict[str, Any]: The completed itinerary
+    """
+    result = dict(itinerary)
+    result["flights"] = [
+        {**f, "departureTime": normalize_datetime(f.get("departureTime")), "arrivalTime": normalize_datetime(f.get("arrivalTime"))}
+        for f in itinerary.get("flights") or [] if isinstance(f, dict)
+    ]
+    result["accommodations"] = [
+        {**a, "checkIn": normalize_datetime(a.get("checkIn")), "checkOut": normalize_datetime(a.get("checkOut"))}
+        for a in itinerary.get("accommodations") or [] if isinstance(a, dict)
+    ]
+
+    days = [day for day in itinerary.get("dailyItinerary") or [] if isinstance(day, dict)]
+    days.sort(key=lambda day: day.get("day") if isinstance(day.get("day"), int) else 0)
+
+    seen_places = set()
+    used_numbers = set()
+    daily_itinerary = []
+    for position, day in enumerate(days, start=1):
+        day_number = day.get("day")
+        if (
+            not isinstance(day_number, int)
+            or day_number < 1
+            or day_number in used_numbers
+            or (spec.day_count and day_number > spec.day_count)
+        ):
+            day_number = position if position not in used_numbers else max(used_numbers) + 1
+        used_numbers.add(day_number)
+
+        entry = postprocess_day(day, spec, day_number)
+        entry["activities"] = _dedupe(entry["activities"], ("name", "activity"), seen_places)
+        entry["meals"] = _dedupe(entry["meals"], ("restaurant",), seen_places)
+        if not entry.get("accommodation"):
+            entry["accommodation"] = accommodation_for_date(result["accommodations"], spec.date_for_day(day_number))
+        daily_itinerary.append(entry)
+
+    result["dailyItinerary"] = daily_itinerary
+    result["totalCost"] = recompute_total_cost(result, previous)
+
+    info = result.get("additionalInfo") or {}
+    result["additionalInfo"] = {
+        "emergencyContacts": info.get("emergencyContacts", []),
+        "localCustoms": info.get("localCustoms", []),
+        "packingList": info.get("packingList", []),
+        **info,
+    }
+    return result
+
+
+def _normalize_item_time(item: Dict[str, Any]) -> Dict[str, Any]:
+    if "time" not in item:
+        return item
+    return {**item, "time": normalize_time(item["time"])}
+
+
+def _dedupe(items: List[Dict[str, Any]], keys: tuple, seen: set) -> List[Dict[str, Any]]:
+    kept = []
+    for item in items:
+        name = next((item.get(key) for key in keys if item.get(key)), None)
+        normalized = " ".join(str(name).lower().split()) if name else None
+        if normalized and normalized in seen:
+            continue
+        if normalized:
+            seen.add(normalized)
+        kept.append(item)
+    return kept
+
+
+def _cost(item: Dict[str, Any], key: str) -> float:
+    value = item.get(key, 0)
+    return value if isinstance(value, (int, float)) else 0
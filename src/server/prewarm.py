@@ -0,0 +1,253 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, Optional, Callable, Awaitable
+
+from server.deadlines import clear_deadline, remaining
+from server.trip_spec import TripSpec, trip_key
+
+DayGenerator = Callable[[Dict[str, Any], int], Awaitable[Dict[str, Any]]]
+
+
+class _TripPrewarm:
+    """Speculatively generated days and in-flight tasks for one trip."""
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.days: Dict[int, Dict[str, Any]] = {}
+        self.tasks: Dict[int, asyncio.Task] = {}
+        self.started: set = set()
+        self.created_at = time.monotonic()
+
+    def cancel(self) -> int:
+        cancelled = 0
+        for task in self.tasks.values():
+            if not task.done():
+                task.cancel()
+                cancelled += 1
+        self.tasks.clear()
+        return cancelled
+
+
+class DayPrewarmer:
+    """
+    Speculatively generates the day itineraries of a freshly planned trip in
+    the background so that the interactive generate_day_itinerary call for
+    the same inputs can be served from cache.
+
+    Background work only runs while no interactive request is in flight and
+    is capped per trip, in concurrency and in total days per hour.
+    """
+
+    def __init__(
+        self,
+        generate_day: DayGenerator,
+        enabled: Optional[bool] = None,
+        max_concurrency: Optional[int] = None,
+        max_days_per_trip: Optional[int] = None,
+        max_days_per_hour: Optional[int] = None,
+        max_trips: int = 256,
+        ttl_seconds: float = 3600,
+    ):
+        self.generate_day = generate_day
+        self.enabled = enabled if enabled is not None else os.getenv("PREWARM_DAY_ITINERARIES", "false").lower() == "true"
+        self.max_days_per_trip = max_days_per_trip or int(os.getenv("PREWARM_MAX_DAYS_PER_TRIP", "7"))
+        self.max_days_per_hour = max_days_per_hour or int(os.getenv("PREWARM_MAX_DAYS_PER_HOUR", "200"))
+        self.max_trips = max_trips
+        self.ttl_seconds = ttl_seconds
+
+        self._semaphore = asyncio.Semaphore(max_concurrency or int(os.getenv("PREWARM_CONCURRENCY", "2")))
+        self._trips: "OrderedDict[str, _TripPrewarm]" = OrderedDict()
+        self._interactive_in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._budget_window_start = time.monotonic()
+        self._budget_used = 0
+
+        self.stats = {
+            "scheduled": 0,
+            "generated": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "budget_skipped": 0,
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+        }
+
+    @asynccontextmanager
+    async def interactive(self):
+        """Mark an interactive upstream call; background work yields to it."""
+        self._interactive_in_flight += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._interactive_in_flight -= 1
+            if self._interactive_in_flight == 0:
+                self._idle.set()
+
+    def schedule(self, trip_data: Dict[str, Any], itinerary: Dict[str, Any]) -> int:
+        """
+        Queue background generation for the days of a newly generated trip plan.
+
+        Args:
+            trip_data (Dict[str, Any]): Trip details the plan was generated from
+            itinerary (Dict[str, Any]): The generated trip plan
+
+        Returns:
+            int: Number of days scheduled
+        """
+        if not self.enabled:
+            return 0
+
+        spec = TripSpec.from_trip_data(trip_data)
+        key = trip_key(trip_data)
+        self.cancel(key)
+        self._evict_expired()
+
+        entry = _TripPrewarm(spec.fingerprint)
+        self._trips[key] = entry
+        while len(self._trips) > self.max_trips:
+            _, evicted = self._trips.popitem(last=False)
+            self.stats["cancelled"] += evicted.cancel()
+
+        planned_days = [day for day in itinerary.get("dailyItinerary", []) if day.get("activities")]
+
+        scheduled = 0
+        for day_number in range(1, min(spec.day_count, self.max_days_per_trip) + 1):
+            if not self._take_budget():
+                self.stats["budget_skipped"] += 1
+                continue
+            # Mirror what the client sends: every other planned day as existingDays.
+            speculative_data = {
+                **trip_data,
+                "existingDays": [day for day in planned_days if day.get("day") != day_number],
+            }
+            entry.tasks[day_number] = asyncio.create_task(
+                self._prewarm_day(entry, speculative_data, day_number)
+            )
+            scheduled += 1
+
+        self.stats["scheduled"] += scheduled
+        return scheduled
+
+    async def take(self, trip_data: Dict[str, Any], day_number: int) -> Optional[Dict[str, Any]]:
+        """
+        Pop a prewarmed day if it was generated from the same trip inputs.
+
+        A day whose upstream call is already running is awaited; one still
+        queued is cancelled. A cached day is discarded rather than served when
+        the trip inputs changed since it was scheduled, or when it repeats an
+        activity or restaurant the caller already has in existingDays.
+
+        Args:
+            trip_data (Dict[str, Any]): Trip details for the interactive request
+            day_number (int): Requested day
+
+        Returns:
+            Optional[Dict[str, Any]]: The cached day itinerary, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        key = trip_key(trip_data)
+        entry = self._trips.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        if entry.fingerprint != TripSpec.from_trip_data(trip_data).fingerprint:
+            self.stats["stale"] += 1
+            self.cancel(key)
+            return None
+
+        task = entry.tasks.pop(day_number, None)
+        if task is not None and not task.done():
+            if day_number in entry.started:
+                # Bounded by the caller's deadline; on timeout the day keeps
+                # generating in the background and this lookup is a miss.
+                await asyncio.wait([task], timeout=remaining())
+            else:
+                task.cancel()
+                self.stats["cancelled"] += 1
+
+        day = entry.days.pop(day_number, None)
+        if day is None or _repeats_existing(day, trip_data.get("existingDays") or []):
+            self.stats["misses"] += 1
+            return None
+
+        self._trips.move_to_end(key)
+        self.stats["hits"] += 1
+        return day
+
+    def cancel(self, key: str) -> bool:
+        """
+        Drop cached days and cancel background work for a trip that was edited
+        or deleted.
+
+        Args:
+            key (str): Trip id, or the input fingerprint for trips without one
+
+        Returns:
+            bool: True if anything was cached for the trip
+        """
+        entry = self._trips.pop(key, None)
+        if entry is None:
+            return False
+        self.stats["cancelled"] += entry.cancel()
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["stale"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "trips_cached": len(self._trips),
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+        }
+
+    async def _prewarm_day(self, entry: _TripPrewarm, trip_data: Dict[str, Any], day_number: int):
+        # Scheduled from inside a request; don't inherit that request's deadline.
+        clear_deadline()
+        try:
+            async with self._semaphore:
+                await self._idle.wait()
+                entry.started.add(day_number)
+                entry.days[day_number] = await self.generate_day(trip_data, day_number)
+                self.stats["generated"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"Error prewarming day {day_number}: {str(e)}")
+        finally:
+            entry.tasks.pop(day_number, None)
+
+    def _take_budget(self) -> bool:
+        now = time.monotonic()
+        if now - self._budget_window_start >= 3600:
+            self._budget_window_start = now
+            self._budget_used = 0
+        if self._budget_used >= self.max_days_per_hour:
+            return False
+        self._budget_used += 1
+        return True
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [k for k, entry in self._trips.items() if now - entry.created_at > self.ttl_seconds]:
+            self.cancel(key)
+
+
+def _repeats_existing(day: Dict[str, Any], existing_days: List[Dict[str, Any]]) -> bool:
+    day_body = day.get("dayItinerary", day)
+    seen = set()
+    for existing in existing_days:
+        seen.update(a.get("name") for a in existing.get("activities") or [] if a.get("name"))
+        seen.update(m.get("restaurant") for m in existing.get("meals") or [] if m.get("restaurant"))
+    names = {a.get("name") for a in day_body.get("activities") or []}
+    names |= {m.get("restaurant") for m in day_body.get("meals") or []}
+    return bool(seen & (names - {None}))
@@ -0,0 +1,330 @@
+import os
+import sys
+import time
+import uuid
+import asyncio
+import cProfile
+import threading
+import contextvars
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, List, Optional
+
+# Per-request profiling and whole-process sampling. Profiles are written as
+# collapsed stacks ("frame;frame;frame count" per line), which flamegraph.pl,
+# inferno, speedscope and most flame graph viewers read directly.
+
+_active: contextvars.ContextVar[Optional["_RequestProfile"]] = contextvars.ContextVar("profile", default=None)
+
+
+class ProfilingRateLimited(Exception):
+    """The profiling budget is spent; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Profiling rate limit reached; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # co_qualname is new in 3.11
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)})"
+
+
+def _thread_stack(frame, stop=None) -> List[str]:
+    """Labels from the root of a thread's stack to its leaf, starting at `stop` if it is on the stack."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        if frame is stop:
+            break
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def _await_stack(coro) -> List[str]:
+    """Labels along a suspended coroutine's await chain, ending in what it waits on."""
+    labels = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        labels.append(_frame_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    labels.append("[awaiting]")
+    return labels
+
+
+def _task_stack(task: asyncio.Task, loop_frame) -> List[str]:
+    """Where a task is: its live frames if it is running on the loop thread, else its await chain."""
+    coro = task.get_coro()
+    if loop_frame is not None and asyncio.current_task(task.get_loop()) is task:
+        stack = _thread_stack(loop_frame, getattr(coro, "cr_frame", None))
+        if stack:
+            return stack
+    return _await_stack(coro)
+
+
+class _RequestProfile:
+    """Samples of the asyncio tasks started for one request."""
+
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.tasks: set = set()
+        self.samples: Counter = Counter()
+        # Tasks run on the thread of the loop the request started on
+        self.thread_id = threading.get_ident()
+
+    def collapsed(self) -> str:
+        root = self.name.replace(";", ":").replace(" ", "_")
+        return "".join(f"{root};{';'.join(stack)} {count}\n" for stack, count in self.samples.most_common())
+
+
+class Profiler:
+    """
+    Opt-in sampling profiler for single requests and for the whole process.
+
+    A profiled request's tasks (the request itself and every task it starts,
+    e.g. day batches and hedged calls) are sampled by a background thread
+    every `interval`. Running tasks contribute their live stack, so prompt
+    building and JSON parsing show up as frames. Suspended tasks contribute
+    their await chain ending in "[awaiting]", so time waiting on the upstream
+    or a worker thread shows up too. Each task contributes its own samples,
+    so concurrent tasks add up to more than the request's wall time.
+
+    Nothing is hooked while disabled. While enabled, the only cost to
+    unprofiled requests is a header lookup, plus a context-variable read per
+    task created while a profile is running.
+
+    Configuration (environment):
+        PROFILING_ENABLED: "true" to accept profiling requests
+        PROFILING_TOKEN: if set, required in the X-Profile-Token header
+        PROFILING_INTERVAL_MS: sampling interval (default 5)
+        PROFILING_MAX_PER_MINUTE: profiles (requests or process samples) per minute (default 6)
+        PROFILING_MAX_SECONDS: longest process sample (default 60)
+        PROFILING_KEEP: finished request profiles kept for retrieval (default 20)
+        PROFILING_DIR: also write each profile to <dir>/<id>.folded
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        token: Optional[str] = None,
+        interval: Optional[float] = None,
+        max_per_minute: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+        keep: Optional[int] = None,
+        directory: Optional[str] = None,
+    ):
+        self.enabled = enabled if enabled is not None else os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+        self.token = token if token is not None else os.getenv("PROFILING_TOKEN") or None
+        self.interval = interval or float(os.getenv("PROFILING_INTERVAL_MS", "5")) / 1000
+        self.max_per_minute = max_per_minute or int(os.getenv("PROFILING_MAX_PER_MINUTE", "6"))
+        self.max_seconds = max_seconds or float(os.getenv("PROFILING_MAX_SECONDS", "60"))
+        self.keep = keep or int(os.getenv("PROFILING_KEEP", "20"))
+        self.directory = directory if directory is not None else os.getenv("PROFILING_DIR") or None
+
+        self._recent: List[float] = []
+        self._profiles: "OrderedDict[str, str]" = OrderedDict()
+        self._requests: List[_RequestProfile] = []
+        self._loops: Dict[asyncio.AbstractEventLoop, int] = {}
+        self._sampler: Optional[threading.Thread] = None
+        self._process_sampling = False
+        self.stats = {"request_profiles": 0, "process_profiles": 0, "rate_limited": 0}
+
+    def authorized(self, token: Optional[str]) -> bool:
+        return self.enabled and (self.token is None or token == self.token)
+
+    def take_budget(self):
+        """
+        Count one profile against the per-minute budget.
+
+        Raises:
+            ProfilingRateLimited: If the budget for the last minute is spent
+        """
+        now = time.monotonic()
+        self._recent = [started for started in self._recent if now - started < 60]
+        if len(self._recent) >= self.max_per_minute:
+            self.stats["rate_limited"] += 1
+            raise ProfilingRateLimited(60 - (now - self._recent[0]))
+        self._recent.append(now)
+
+    @asynccontextmanager
+    async def profile_request(self, name: str):
+        """
+        Sample the current task and every task it starts until the block exits.
+
+        Yields:
+            _RequestProfile: The profile; its id is valid once the block exits
+        """
+        profile = _RequestProfile(name)
+        profile.tasks.add(asyncio.current_task())
+        token = _active.set(profile)
+        loop = asyncio.get_running_loop()
+        self._attach(loop)
+        self._requests.append(profile)
+        self._ensure_sampler()
+        try:
+            yield profile
+        finally:
+            self._requests.remove(profile)
+            self._detach(loop)
+            _active.reset(token)
+            self._store(profile.id, profile.collapsed())
+            self.stats["request_profiles"] += 1
+
+    async def sample_process(self, seconds: float) -> str:
+        """
+        Sample every thread and every asyncio task of the running loop for
+        `seconds`, as collapsed stacks rooted at "threads" and "tasks".
+        """
+        if self._process_sampling:
+            raise ProfilingRateLimited(seconds)
+        self._process_sampling = True
+        try:
+            samples = await asyncio.to_thread(
+                self._sample_process, asyncio.get_running_loop(), threading.get_ident(), min(seconds, self.max_seconds)
+            )
+        finally:
+            self._process_sampling = False
+        collapsed = "".join(f"{';'.join(stack)} {count}\n" for stack, count in samples.most_common())
+        self._store(uuid.uuid4().hex[:12], collapsed)
+        self.stats["process_profiles"] += 1
+        return collapsed
+
+    def get(self, profile_id: str) -> Optional[str]:
+        return self._profiles.get(profile_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "enabled": self.enabled, "active_requests": len(self._requests), "stored": len(self._profiles)}
+
+    def _attach(self, loop: asyncio.AbstractEventLoop):
+        # Record tasks created from a profiled request's context. The factory is
+        # only installed while a profile runs and removed after the last one.
+        if self._loops.get(loop, 0) == 0:
+            previous = loop.get_task_factory()
+
+            def factory(loop, coro, **kwargs):
+                task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+                context = kwargs.get("context")
+                profile = context.get(_active) if context is not None else _active.get()
+                if profile is not None:
+                    profile.tasks.add(task)
+                return task
+
+            factory.previous = previous
+            loop.set_task_factory(factory)
+        self._loops[loop] = self._loops.get(loop, 0) + 1
+
+    def _detach(self, loop: asyncio.AbstractEventLoop):
+        self._loops[loop] -= 1
+        if self._loops[loop] == 0:
+            del self._loops[loop]
+            loop.set_task_factory(getattr(loop.get_task_factory(), "previous", None))
+
+    def _ensure_sampler(self):
+        if self._sampler is None or not self._sampler.is_alive():
+            self._sampler = threading.Thread(target=self._sample_requests, name="request-profiler", daemon=True)
+            self._sampler.start()
+
+    def _sample_requests(self):
+        while self._requests:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for profile in list(self._requests):
+                for task in list(profile.tasks):
+                    if task.done():
+                        profile.tasks.discard(task)
+                        continue
+                    stack = _task_stack(task, frames.get(profile.thread_id))
+                    profile.samples[tuple(stack)] += 1
+
+    def _sample_process(self, loop: asyncio.AbstractEventLoop, loop_thread: int, seconds: float) -> Counter:
+        samples: Counter = Counter()
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for thread_id, frame in frames.items():
+                if thread_id == me:
+                    continue
+                name = names.get(thread_id, str(thread_id)).replace(" ", "_")
+                samples[("threads", name, *_thread_stack(frame))] += 1
+            loop_frame = frames.get(loop_thread)
+            for task in list(asyncio.all_tasks(loop)):
+                samples[("tasks", *_task_stack(task, loop_frame))] += 1
+        return samples
+
+    def _store(self, profile_id: str, collapsed: str):
+        self._profiles[profile_id] = collapsed
+        while len(self._profiles) > self.keep:
+            self._profiles.popitem(last=False)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{profile_id}.folded"), "w") as f:
+                f.write(collapsed)
+
+
+@contextmanager
+def deterministic_profile(path: str):
+    """
+    cProfile the calling thread for the duration of the block and write the
+    stats to `path`. For single-request processes (wrapper.py), where nothing
+    else shares the thread. The pstats file converts to a flame graph with
+    flameprof or gprof2dot, and opens in snakeviz.
+    """
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles requests sent with an X-Profile header.
+
+    The response carries X-Profile-Id, under which the collapsed stacks can be
+    fetched once the request has finished, or X-Profile-Skipped with the
+    reason no profile was taken (unauthorized, rate-limited).
+    """
+
+    def __init__(self, app, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if not self.profiler.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        if not headers.get(b"x-profile"):
+            await self.app(scope, receive, send)
+            return
+
+        token = headers.get(b"x-profile-token", b"").decode("latin-1") or None
+        try:
+            if not self.profiler.authorized(token):
+                raise PermissionError("unauthorized")
+            self.profiler.take_budget()
+        except (PermissionError, ProfilingRateLimited) as e:
+            skipped = b"unauthorized" if isinstance(e, PermissionError) else b"rate-limited"
+            await self.app(scope, receive, _with_header(send, b"x-profile-skipped", skipped))
+            return
+
+        async with self.profiler.profile_request(f"{scope['method']} {scope['path']}") as profile:
+            await self.app(scope, receive, _with_header(send, b"x-profile-id", profile.id.encode()))
+
+
+def _with_header(send, name: bytes, value: bytes):
+    async def send_with_header(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message.get("headers", []), (name, value)]}
+        await send(message)
+    return send_with_header
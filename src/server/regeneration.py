@@ -0,0 +1,159 @@
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from server.trip_spec import TripSpec, TRIP_INPUT_FIELDS, parse_iso_datetime
+
+# Preferences whose change invalidates every generated day.
+DAY_WIDE_PREFERENCES = ("activities", "placesToVisit", "transportationType")
+
+Stay = Tuple[str, date, date]
+
+
+@dataclass
+class RegenerationPlan:
+    """
+    Which parts of an existing itinerary have to be regenerated for new trip inputs.
+    """
+
+    full: bool = False
+    reason: str = ""
+    flights: bool = False
+    stays: List[Stay] = field(default_factory=list)
+    days: Set[int] = field(default_factory=set)
+    meal_days: Set[int] = field(default_factory=set)
+    # New day number -> old day number for days that are kept as they are.
+    kept_days: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def is_noop(self) -> bool:
+        return not (self.full or self.flights or self.stays or self.days or self.meal_days)
+
+    def summary(self) -> str:
+        if self.full:
+            return f"full regeneration ({self.reason})"
+        parts = []
+        if self.flights:
+            parts.append("flights")
+        if self.stays:
+            parts.append(f"{len(self.stays)} accommodation(s)")
+        if self.days:
+            parts.append(f"days {sorted(self.days)}")
+        if self.meal_days:
+            parts.append(f"meals for days {sorted(self.meal_days)}")
+        return ", ".join(parts) or "nothing"
+
+
+def generation_inputs(trip_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Snapshot of the inputs an itinerary was generated from, stored alongside
+    it so a later regeneration can diff against it.
+    """
+    return {key: trip_data[key] for key in TRIP_INPUT_FIELDS if trip_data.get(key) is not None}
+
+
+def day_locations(spec: TripSpec) -> Dict[int, Tuple[date, str]]:
+    """Map every day number of a trip to its date and destination."""
+    return {
+        day: (spec.date_for_day(day), spec.destination_for_day(day))
+        for day in range(1, spec.day_count + 1)
+    }
+
+
+def stays_for(spec: TripSpec) -> List[Stay]:
+    """Split a trip into consecutive runs of days spent at the same destination."""
+    stays: List[Stay] = []
+    for day, (day_date, location) in sorted(day_locations(spec).items()):
+        if stays and stays[-1][0] == location and (day_date - stays[-1][2]).days == 1:
+            stays[-1] = (location, stays[-1][1], day_date)
+        else:
+            stays.append((location, day_date, day_date))
+    return stays
+
+
+def _places_for(spec: TripSpec, location: str) -> Tuple[str, ...]:
+    for dest in spec.destinations:
+        if dest.location == location:
+            return dest.places_to_visit
+    return ()
+
+
+def plan_regeneration(
+    old_inputs: Optional[Dict[str, Any]],
+    new_inputs: Dict[str, Any],
+    old_itinerary: Optional[Dict[str, Any]],
+) -> RegenerationPlan:
+    """
+    Diff the inputs an itinerary was generated from against new inputs.
+
+    Args:
+        old_inputs (Dict[str, Any], optional): Inputs of the existing itinerary
+        new_inputs (Dict[str, Any]): Updated trip details and preferences
+        old_itinerary (Dict[str, Any], optional): The existing itinerary
+
+    Returns:
+        RegenerationPlan: The sections to regenerate
+    """
+    if not old_inputs or not old_itinerary or not old_itinerary.get("dailyItinerary"):
+        return RegenerationPlan(full=True, reason="no previous itinerary")
+
+    old = TripSpec.from_trip_data(old_inputs)
+    new = TripSpec.from_trip_data(new_inputs)
+
+    if old.fingerprint == new.fingerprint:
+        return RegenerationPlan(full=True, reason="inputs unchanged")
+    if not new.day_count or not old.day_count:
+        return RegenerationPlan(full=True, reason="trip dates unknown")
+    if old.destination != new.destination:
+        return RegenerationPlan(full=True, reason="main destination changed")
+    if old.budget != new.budget:
+        return RegenerationPlan(full=True, reason="budget changed")
+    for pref in DAY_WIDE_PREFERENCES:
+        if old.preferences.get(pref) != new.preferences.get(pref):
+            return RegenerationPlan(full=True, reason=f"{pref} changed")
+
+    plan = RegenerationPlan()
+
+    plan.flights = (
+        old.departure_location != new.departure_location
+        or old.travelers != new.travelers
+        or old.first_day != new.first_day
+        or old.last_day != new.last_day
+        # Flights between destinations follow the route
+        or [d.location for d in old.destinations] != [d.location for d in new.destinations]
+    )
+
+    old_stays = set(stays_for(old))
+    accommodation_wide = (
+        old.travelers != new.travelers
+        or old.preferences.get("accommodationType") != new.preferences.get("accommodationType")
+    )
+    plan.stays = [stay for stay in stays_for(new) if accommodation_wide or stay not in old_stays]
+
+    old_days_by_date = {}
+    for day in old_itinerary.get("dailyItinerary", []):
+        day_date = parse_iso_datetime(day.get("date")) if day.get("date") else None
+        key = day_date.date() if day_date else old.date_for_day(day.get("day", 0))
+        old_days_by_date[key] = day.get("day")
+
+    old_locations = {day_date: location for day_date, location in day_locations(old).values()}
+    for day, (day_date, location) in day_locations(new).items():
+        old_day = old_days_by_date.get(day_date)
+        if (
+            old_day is None
+            or old_locations.get(day_date) != location
+            or _places_for(old, location) != _places_for(new, location)
+        ):
+            plan.days.add(day)
+        else:
+            plan.kept_days[day] = old_day
+
+    if old.preferences.get("dietaryRestrictions") != new.preferences.get("dietaryRestrictions"):
+        plan.meal_days = set(plan.kept_days)
+
+    if plan.is_noop:
+        return RegenerationPlan(full=True, reason="no section affected")
+    if plan.flights and len(plan.days) == new.day_count:
+        return RegenerationPlan(full=True, reason="every day changed")
+
+    return plan
@@ -1,17 +1,38 @@
 import { ITrip } from '../models/Trip';
 import { spawn } from 'child_process';
 import path from 'path';
+import http from 'http';
+import https from 'https';
+import axios, { AxiosInstance, AxiosRequestConfig } from 'axios';
+
+// Time budget for one generation. The Python side is told about it so it can
+// stop queueing and cut upstream calls short; the caller gives up after it.
+const REQUEST_TIMEOUT_MS = parseInt(process.env.AI_REQUEST_TIMEOUT_MS || '180000', 10);
 
 export class AIService {
   private pythonWrapperPath: string;
+  private pythonServiceClient: AxiosInstance | null;
 
   constructor() {
     this.pythonWrapperPath = path.join(__dirname, '../../ai/wrapper.py');
+
+    // When PYTHON_AI_SERVICE_URL points at src/python/server.py, requests go
+    // over pooled keep-alive connections instead of spawning wrapper.py.
+    const serviceUrl = process.env.PYTHON_AI_SERVICE_URL;
+    this.pythonServiceClient = serviceUrl
+      ? axios.create({
+          baseURL: serviceUrl,
+          httpAgent: new http.Agent({ keepAlive: true }),
+          httpsAgent: new https.Agent({ keepAlive: true }),
+        })
+      : null;
   }
 
-  async generateTravelPlan(tripPreferences: Partial<ITrip>): Promise<Partial<ITrip>> {
+  async generateTravelPlan(tripPreferences: Partial<ITrip>, signal?: AbortSignal): Promise<Partial<ITrip>> {
     try {
-      const itinerary = await this.runPythonScript('generate_trip_plan', JSON.stringify(tripPreferences));
+      const itinerary = this.pythonServiceClient
+        ? (await this.pythonServiceClient.post('/api/generate-trip-plan', tripPreferences, this.requestConfig(signal))).data
+        : await this.runPythonScript('generate_trip_plan', JSON.stringify(tripPreferences), signal);
       
       return {
         itinerary
@@ -22,14 +43,42 @@ export class AIService {
     }
   }
 
-  async generateDayItinerary(tripData: Partial<ITrip>, dayNumber: number): Promise<any> {
+  async regenerateTravelPlan(
+    tripId: string,
+    tripData: Partial<ITrip>,
+    previousItinerary?: any,
+    signal?: AbortSignal
+  ): Promise<Partial<ITrip>> {
+    try {
+      const data = {
+        tripId,
+        tripData,
+        previousItinerary
+      };
+
+      const itinerary = this.pythonServiceClient
+        ? (await this.pythonServiceClient.post('/api/regenerate-trip-plan', data, this.requestConfig(signal))).data
+        : await this.runPythonScript('regenerate_trip_plan', JSON.stringify(data), signal);
+
+      return {
+        itinerary
+      };
+    } catch (error) {
+      console.error('Error calling Python AI service:', error);
+      throw new Error('Failed to regenerate travel plan. Please try again later.');
+    }
+  }
+
+  async generateDayItinerary(tripData: Partial<ITrip>, dayNumber: number, signal?: AbortSignal): Promise<any> {
     try {
       const data = {
         tripData,
         dayNumber
       };
       
-      const dayItinerary = await this.runPythonScript('generate_day_itinerary', JSON.stringify(data));
+      const dayItinerary = this.pythonServiceClient
+        ? (await this.pythonServiceClient.post('/api/generate-day-itinerary', data, this.requestConfig(signal))).data
+        : await this.runPythonScript('generate_day_itinerary', JSON.stringify(data), signal);
       
       return dayItinerary;
     } catch (error) {
@@ -38,20 +87,59 @@ export class AIService {
     }
   }
 
+  /**
+   * Drop speculatively generated days for an edited or deleted trip.
+   * Only the long-lived Python service keeps such state.
+   * @param tripId ID of the trip
+   */
+  cancelPrewarm(tripId: string): void {
+    if (!this.pythonServiceClient) {
+      return;
+    }
+    this.pythonServiceClient
+      .delete(`/api/trips/${tripId}/prewarm`)
+      .catch((error) => console.error(`Error cancelling prewarm for trip ${tripId}:`, error.message));
+  }
+
+  /**
+   * Axios options that carry the deadline to the Python service. Aborting
+   * (timeout or signal) closes the connection, which cancels the generation.
+   * @param signal Aborted when the caller no longer needs the result
+   */
+  private requestConfig(signal?: AbortSignal): AxiosRequestConfig {
+    return {
+      timeout: REQUEST_TIMEOUT_MS,
+      signal,
+      headers: { 'X-Request-Timeout-Ms': String(REQUEST_TIMEOUT_MS) }
+    };
+  }
+
   /**
    * Run Python script and return its output
    * @param command Command to run in the Python script
    * @param data JSON data to pass to the Python script
+   * @param signal Aborted when the caller no longer needs the result
    * @returns Promise<any> Result from Python script
    */
-  private async runPythonScript(command: string, data: string): Promise<any> {
+  private async runPythonScript(command: string, data: string, signal?: AbortSignal): Promise<any> {
     return new Promise((resolve, reject) => {
       const pythonCommand = process.platform === 'win32' ? 'py' : 'python3';
       
-      const pythonProcess = spawn(pythonCommand, [this.pythonWrapperPath, command, data]);
+      const pythonProcess = spawn(pythonCommand, [this.pythonWrapperPath, command, data], {
+        env: { ...process.env, AI_REQUEST_TIMEOUT_SECONDS: String(REQUEST_TIMEOUT_MS / 1000) }
+      });
       let result = '';
       let error = '';
 
+      // Kill the script when the caller gives up so its upstream calls stop too.
+      const abort = () => pythonProcess.kill('SIGTERM');
+      const killTimer = setTimeout(abort, REQUEST_TIMEOUT_MS + 5000);
+      signal?.addEventListener('abort', abort, { once: true });
+      pythonProcess.on('exit', () => {
+        clearTimeout(killTimer);
+        signal?.removeEventListener('abort', abort);
+      });
+
       pythonProcess.stdout.on('data', (data) => {
         const chunk = data.toString();
         result += chunk;
@@ -1,11 +1,17 @@
-from typing import List, Optional
-from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from datetime import datetime, timezone
 from pymongo import MongoClient
 from pymongo.collection import Collection
+from pymongo.errors import OperationFailure, PyMongoError
 from bson import ObjectId
 import os
+import time
+import threading
 from dotenv import load_dotenv
 
+from server.services.itinerary_codec import BLOB_FIELD, FORMAT_FIELD, SUMMARY_FIELD, decode_trip, encode_itinerary
+from server.services.read_cache import ReadThroughCache
+
 load_dotenv()
 
 class DatabaseService:
@@ -15,19 +21,55 @@ class DatabaseService:
         self.trips: Collection = self.db.trips
         self.users: Collection = self.db.users
 
+        # DB_ITINERARY_STORAGE=compressed stores new itineraries as a compressed
+        # blob plus summary fields; reads handle both layouts either way. The
+        # Node backend's Trip model only reads `itinerary`, so the compressed
+        # layout must be acknowledged as Python-only with DB_ITINERARY_STORAGE_EXCLUSIVE.
+        self.compress_itineraries = os.getenv('DB_ITINERARY_STORAGE', 'document').lower() == 'compressed'
+        if self.compress_itineraries and os.getenv('DB_ITINERARY_STORAGE_EXCLUSIVE', 'false').lower() != 'true':
+            raise ValueError(
+                "DB_ITINERARY_STORAGE=compressed writes trips without an `itinerary` field, which the Node "
+                "backend reads. Set DB_ITINERARY_STORAGE_EXCLUSIVE=true only if no other service reads "
+                f"the {self.trips.full_name} collection."
+            )
+
+        # Optional read-through cache for get_trip / get_user / get_user_by_email
+        # (DB_CACHE_ENABLED). Our own writes invalidate it directly; writes from
+        # other processes arrive through a change stream, which needs a replica set.
+        self.cache: Optional[ReadThroughCache] = None
+        self.change_stream_state = "disabled"
+        self.change_stream_retry_seconds = 5.0
+        self._stop_watching = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        if os.getenv('DB_CACHE_ENABLED', 'false').lower() == 'true':
+            self.cache = ReadThroughCache(
+                max_entries=int(os.getenv('DB_CACHE_MAX_ENTRIES', '1024')),
+                ttl_seconds=float(os.getenv('DB_CACHE_TTL_SECONDS', '60')),
+            )
+            if os.getenv('DB_CACHE_CHANGE_STREAM', 'true').lower() == 'true':
+                self.change_stream_state = "starting"
+                self._watcher = threading.Thread(target=self._watch_changes, name='db-cache-change-stream', daemon=True)
+                self._watcher.start()
+
     async def create_trip(self, trip_data: dict) -> dict:
         """Create a new trip in the database"""
         trip_data['created_at'] = datetime.utcnow()
         trip_data['updated_at'] = datetime.utcnow()
+        if self.compress_itineraries and trip_data.get('itinerary') is not None:
+            trip_data.update(encode_itinerary(trip_data.pop('itinerary'), trip_data))
         result = self.trips.insert_one(trip_data)
-        return self.get_trip(str(result.inserted_id))
+        return await self.get_trip(str(result.inserted_id))
 
     async def get_trip(self, trip_id: str) -> Optional[dict]:
         """Get a trip by ID"""
+        return self._read_through(('trip', trip_id), lambda: self._find_trip(trip_id))
+
+    def _find_trip(self, trip_id: str) -> Optional[dict]:
         try:
             trip = self.trips.find_one({'_id': ObjectId(trip_id)})
             if trip:
                 trip['_id'] = str(trip['_id'])
+                decode_trip(trip)
             return trip
         except:
             return None
@@ -35,15 +77,26 @@ class DatabaseService:
     async def get_user_trips(self, user_id: str) -> List[dict]:
         """Get all trips for a user"""
         trips = self.trips.find({'user_id': user_id})
-        return [{**trip, '_id': str(trip['_id'])} for trip in trips]
+        return [decode_trip({**trip, '_id': str(trip['_id'])}) for trip in trips]
+
+    def iter_trips(self, query: dict, batch_size: int = 100) -> Iterator[dict]:
+        """Stream trips matching a query from a cursor (for bulk jobs that can't hold every trip in memory)"""
+        for trip in self.trips.find(query, batch_size=batch_size):
+            yield decode_trip({**trip, '_id': str(trip['_id'])})
 
     async def update_trip(self, trip_id: str, updates: dict) -> Optional[dict]:
         """Update a trip"""
         updates['updated_at'] = datetime.utcnow()
-        result = self.trips.update_one(
-            {'_id': ObjectId(trip_id)},
-            {'$set': updates}
-        )
+        update = {'$set': updates}
+        if updates.get('itinerary') is not None:
+            # Drop whichever layout the trip used before
+            if self.compress_itineraries:
+                updates.update(encode_itinerary(updates.pop('itinerary'), updates))
+                update['$unset'] = {'itinerary': ''}
+            else:
+                update['$unset'] = {BLOB_FIELD: '', FORMAT_FIELD: '', SUMMARY_FIELD: ''}
+        result = self.trips.update_one({'_id': ObjectId(trip_id)}, update)
+        self._invalidate_trip(trip_id)
         if result.modified_count > 0:
             return await self.get_trip(trip_id)
         return None
@@ -51,6 +104,7 @@ class DatabaseService:
     async def delete_trip(self, trip_id: str) -> bool:
         """Delete a trip"""
         result = self.trips.delete_one({'_id': ObjectId(trip_id)})
+        self._invalidate_trip(trip_id)
         return result.deleted_count > 0
 
     async def create_user(self, user_data: dict) -> dict:
@@ -63,6 +117,9 @@ class DatabaseService:
 
     async def get_user(self, user_id: str) -> Optional[dict]:
         """Get a user by ID"""
+        return self._read_through(('user', user_id), lambda: self._find_user(user_id))
+
+    def _find_user(self, user_id: str) -> Optional[dict]:
         try:
             user = self.users.find_one({'_id': ObjectId(user_id)})
             if user:
@@ -73,6 +130,9 @@ class DatabaseService:
 
     async def get_user_by_email(self, email: str) -> Optional[dict]:
         """Get a user by email"""
+        return self._read_through(('user_email', email), lambda: self._find_user_by_email(email))
+
+    def _find_user_by_email(self, email: str) -> Optional[dict]:
         user = self.users.find_one({'email': email})
         if user:
             user['_id'] = str(user['_id'])
@@ -84,6 +144,96 @@ class DatabaseService:
             {'_id': ObjectId(user_id)},
             {'$set': updates}
         )
+        self._invalidate_user(user_id)
         if result.modified_count > 0:
             return await self.get_user(user_id)
-        return None 
\ No newline at end of file
+        return None
+
+    def cache_metrics(self) -> Dict[str, Any]:
+        """Hit ratio, staleness and invalidation counters of the read cache."""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, "change_stream": self.change_stream_state, **self.cache.metrics()}
+
+    def close(self):
+        """Stop the change-stream watcher and close the client."""
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+        self.client.close()
+
+    def _read_through(self, key: tuple, load: Callable[[], Optional[dict]]) -> Optional[dict]:
+        if self.cache is None:
+            return load()
+        if self._watcher is not None and self.change_stream_state != "active":
+            # Other processes' writes would go unseen; read from the database until the stream is up.
+            return load()
+        hit, value = self.cache.get(key)
+        if hit:
+            return value
+        epoch = self.cache.epoch()
+        value = load()
+        # Misses are not cached, so a document created elsewhere shows up at once.
+        if value is not None:
+            self.cache.put(key, value, epoch)
+        return value
+
+    def _invalidate_trip(self, trip_id: str, lag_seconds: Optional[float] = None, from_change_stream: bool = False):
+        if self.cache is not None:
+            self.cache.invalidate(('trip', trip_id), from_change_stream, lag_seconds)
+
+    def _invalidate_user(self, user_id: str, lag_seconds: Optional[float] = None, from_change_stream: bool = False):
+        # The by-email entry has to go too; its key may be the old address.
+        if self.cache is not None:
+            self.cache.invalidate_where(
+                lambda key, user: key == ('user', user_id) or (key[0] == 'user_email' and user.get('_id') == user_id),
+                from_change_stream,
+                lag_seconds,
+            )
+
+    def _watch_changes(self):
+        """Invalidate cached trips and users written by other processes."""
+        pipeline = [{'$match': {
+            'ns.coll': {'$in': [self.trips.name, self.users.name]},
+            'operationType': {'$in': ['update', 'replace', 'delete']},
+        }}]
+        resume_token = None
+        while not self._stop_watching.is_set():
+            try:
+                with self.db.watch(pipeline, resume_after=resume_token, max_await_time_ms=1000) as stream:
+                    if self.change_stream_state != "active" and resume_token is None:
+                        # Anything written while the stream was down was missed.
+                        self.cache.clear()
+                    self.change_stream_state = "active"
+                    while stream.alive and not self._stop_watching.is_set():
+                        change = stream.try_next()
+                        resume_token = stream.resume_token
+                        if change is not None:
+                            self._apply_change(change)
+            except OperationFailure as e:
+                if e.code == 40573:
+                    # Standalone server: change streams need a replica set; reads bypass the cache.
+                    print(f"Change streams unavailable, reading from the database directly: {str(e)}")
+                    self.change_stream_state = "unavailable"
+                    return
+                print(f"Change stream error: {str(e)}")
+                self.change_stream_state = "reconnecting"
+                resume_token = None
+                self._stop_watching.wait(self.change_stream_retry_seconds)
+            except PyMongoError as e:
+                print(f"Change stream error: {str(e)}")
+                self.change_stream_state = "reconnecting"
+                self._stop_watching.wait(self.change_stream_retry_seconds)
+
+    def _apply_change(self, change: dict):
+        document_id = str(change['documentKey']['_id'])
+        lag_seconds = None
+        if change.get('wallTime'):
+            lag_seconds = time.time() - change['wallTime'].replace(tzinfo=timezone.utc).timestamp()
+        elif change.get('clusterTime'):
+            lag_seconds = time.time() - change['clusterTime'].time
+
+        if change['ns']['coll'] == self.trips.name:
+            self._invalidate_trip(document_id, lag_seconds, from_change_stream=True)
+        else:
+            self._invalidate_user(document_id, lag_seconds, from_change_stream=True) 
\ No newline at end of file
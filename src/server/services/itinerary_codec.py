@@ -0,0 +1,127 @@
+import json
+import zlib
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional
+
+from bson import Binary
+
+# Stored next to the blob so the encoding can change without rewriting old trips.
+ITINERARY_SCHEMA_VERSION = 1
+ITINERARY_CODEC = "zlib+json"
+
+BLOB_FIELD = "itineraryBlob"
+FORMAT_FIELD = "itineraryFormat"
+SUMMARY_FIELD = "itinerarySummary"
+
+
+def summarize_itinerary(itinerary: Dict[str, Any], trip: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Small queryable projection of an itinerary, kept uncompressed.
+
+    Destinations come from the trip document when it is at hand, else from
+    the inputs the itinerary was generated from.
+
+    Args:
+        itinerary (Dict[str, Any]): Full itinerary
+        trip (Dict[str, Any], optional): Trip fields written alongside it
+
+    Returns:
+        Dict[str, Any]: {"totalCost", "dayCount", "destinations"}
+    """
+    source = trip if trip and (trip.get("destination") or trip.get("destinations")) else itinerary.get("generatedFrom") or {}
+    destinations: List[str] = []
+    for name in [source.get("destination")] + [
+        d.get("location") or d.get("name") for d in source.get("destinations") or [] if isinstance(d, dict)
+    ]:
+        if name and name not in destinations:
+            destinations.append(name)
+
+    total_cost = (itinerary.get("totalCost") or {}).get("total", 0)
+    return {
+        "totalCost": total_cost if isinstance(total_cost, (int, float)) else 0,
+        "dayCount": len(itinerary.get("dailyItinerary") or []),
+        "destinations": destinations,
+    }
+
+
+def encode_itinerary(itinerary: Dict[str, Any], trip: Optional[Dict[str, Any]] = None, level: int = 6) -> Dict[str, Any]:
+    """
+    Fields that store an itinerary in the compressed layout.
+
+    Args:
+        itinerary (Dict[str, Any]): Full itinerary (a LazyItinerary is decoded first)
+        trip (Dict[str, Any], optional): Trip fields, for the summary's destinations
+        level (int): zlib compression level
+
+    Returns:
+        Dict[str, Any]: Blob, format and summary fields to $set on the trip
+    """
+    plain = itinerary.to_dict() if isinstance(itinerary, LazyItinerary) else itinerary
+    raw = json.dumps(plain, separators=(",", ":"), default=str).encode("utf-8")
+    return {
+        BLOB_FIELD: Binary(zlib.compress(raw, level)),
+        FORMAT_FIELD: {"version": ITINERARY_SCHEMA_VERSION, "codec": ITINERARY_CODEC, "rawSize": len(raw)},
+        SUMMARY_FIELD: summarize_itinerary(plain, trip),
+    }
+
+
+def decode_blob(blob: bytes, format_info: Dict[str, Any]) -> Dict[str, Any]:
+    version = format_info.get("version")
+    if version != ITINERARY_SCHEMA_VERSION or format_info.get("codec") != ITINERARY_CODEC:
+        raise ValueError(f"Unsupported itinerary format: version {version}, codec {format_info.get('codec')}")
+    return json.loads(zlib.decompress(blob))
+
+
+class LazyItinerary(MutableMapping):
+    """
+    Itinerary read from the compressed layout. The blob is decompressed the
+    first time the itinerary's contents are accessed; the summary is
+    available without decoding.
+    """
+
+    def __init__(self, blob: bytes, format_info: Dict[str, Any], summary: Optional[Dict[str, Any]] = None):
+        self._blob = blob
+        self._format = format_info
+        self.summary = summary or {}
+        self._decoded: Optional[Dict[str, Any]] = None
+
+    @property
+    def is_decoded(self) -> bool:
+        return self._decoded is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The decoded itinerary as a plain dict (for JSON responses)."""
+        if self._decoded is None:
+            self._decoded = decode_blob(self._blob, self._format)
+        return self._decoded
+
+    def __getitem__(self, key: str) -> Any:
+        return self.to_dict()[key]
+
+    def __setitem__(self, key: str, value: Any):
+        self.to_dict()[key] = value
+
+    def __delitem__(self, key: str):
+        del self.to_dict()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_dict())
+
+    def __len__(self) -> int:
+        return len(self.to_dict())
+
+    def __repr__(self) -> str:
+        state = "decoded" if self.is_decoded else f"{len(self._blob)} compressed bytes"
+        return f"LazyItinerary({state}, summary={self.summary})"
+
+
+def decode_trip(trip: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Replace a compressed itinerary in a trip document with a LazyItinerary.
+    Documents in the nested layout are returned unchanged.
+    """
+    if BLOB_FIELD not in trip:
+        return trip
+    blob = trip.pop(BLOB_FIELD)
+    trip["itinerary"] = LazyItinerary(bytes(blob), trip.pop(FORMAT_FIELD, {}), trip.get(SUMMARY_FIELD))
+    return trip
@@ -0,0 +1,156 @@
+import copy
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+
+def _percentile(values: Deque[float], percentile: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percentile / 100), len(ordered) - 1)]
+
+
+class ReadThroughCache:
+    """
+    Bounded LRU cache with a TTL, shared between the event loop and the
+    change-stream thread that invalidates it.
+
+    Values are deep-copied in and out so callers can mutate what they get
+    back. A read that started before an invalidation is not cached, so a
+    concurrent update cannot leave an old document in the cache until the
+    TTL runs out.
+
+    Args:
+        max_entries: Entries kept before the least recently used is evicted
+        ttl_seconds: Maximum age of a served entry
+        sample_window: Number of recent ages/lags kept for percentiles
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0, sample_window: int = 500):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._invalidation_epoch = 0
+        self._served_ages: Deque[float] = deque(maxlen=sample_window)
+        self._invalidation_lags: Deque[float] = deque(maxlen=sample_window)
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "change_stream_invalidations": 0,
+            "discarded_fills": 0,
+        }
+
+    def epoch(self) -> int:
+        """Token to pass to put(); taken before reading from the database."""
+        with self._lock:
+            return self._invalidation_epoch
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Look up a key.
+
+        Returns:
+            Tuple[bool, Any]: (hit, copy of the cached value)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return False, None
+            value, cached_at = entry
+            age = now - cached_at
+            if age > self.ttl_seconds:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            self._served_ages.append(age)
+        return True, copy.deepcopy(value)
+
+    def put(self, key: Hashable, value: Any, epoch: int) -> bool:
+        """
+        Cache a value read from the database, unless something was
+        invalidated since the read began (epoch from epoch()).
+
+        Returns:
+            bool: True if the value was cached
+        """
+        stored = copy.deepcopy(value)
+        with self._lock:
+            if epoch != self._invalidation_epoch:
+                self.stats["discarded_fills"] += 1
+                return False
+            self._entries[key] = (stored, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return True
+
+    def invalidate(self, key: Hashable, from_change_stream: bool = False, lag_seconds: Optional[float] = None):
+        """
+        Drop a key.
+
+        Args:
+            key: Key to drop
+            from_change_stream (bool): The write was observed on the change stream
+            lag_seconds (float, optional): Time between the write and this invalidation
+        """
+        with self._lock:
+            self._invalidation_epoch += 1
+            self._entries.pop(key, None)
+            self._count_invalidation(from_change_stream, lag_seconds)
+
+    def invalidate_where(
+        self,
+        predicate: Callable[[Hashable, Any], bool],
+        from_change_stream: bool = False,
+        lag_seconds: Optional[float] = None,
+    ) -> int:
+        """
+        Drop every entry for which predicate(key, value) is true.
+
+        Returns:
+            int: Number of entries dropped
+        """
+        with self._lock:
+            self._invalidation_epoch += 1
+            keys = [key for key, (value, _) in self._entries.items() if predicate(key, value)]
+            for key in keys:
+                del self._entries[key]
+            self._count_invalidation(from_change_stream, lag_seconds)
+        return len(keys)
+
+    def _count_invalidation(self, from_change_stream: bool, lag_seconds: Optional[float]):
+        self.stats["change_stream_invalidations" if from_change_stream else "invalidations"] += 1
+        if lag_seconds is not None:
+            self._invalidation_lags.append(max(0.0, lag_seconds))
+
+    def clear(self):
+        with self._lock:
+            self._invalidation_epoch += 1
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "hit_ratio": self.stats["hits"] / lookups if lookups else 0.0,
+                # How old the documents we served were, i.e. how stale they could be
+                "served_age_p50_seconds": _percentile(self._served_ages, 50),
+                "served_age_p95_seconds": _percentile(self._served_ages, 95),
+                # Window during which another process's write could be served stale
+                "invalidation_lag_p50_seconds": _percentile(self._invalidation_lags, 50),
+                "invalidation_lag_p95_seconds": _percentile(self._invalidation_lags, 95),
+            }
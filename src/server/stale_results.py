@@ -0,0 +1,148 @@
+import os
+import copy
+import time
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from server.deadlines import clear_deadline
+
+Refresh = Callable[[], Awaitable[Any]]
+
+
+class _Entry:
+    def __init__(self, result: Dict[str, Any], refresh: Optional[Refresh]):
+        self.result = result
+        self.refresh = refresh
+        self.stored_at = time.time()
+
+
+class StaleResultStore:
+    """
+    Last good result per request, served marked as stale when the upstream
+    cannot produce a fresh one (circuit open, timeouts, API errors).
+
+    Results are looked up by their exact key first, then by looser aliases
+    (e.g. the same trip and dates with different preferences), so a caller
+    gets the best result available for a matching request. Entries that were
+    served stale are revalidated in the background once the upstream recovers,
+    by re-running the refresh callable stored with them.
+
+    Configuration (environment):
+        AI_STALE_MAX_ENTRIES: results kept (default 500)
+        AI_STALE_MAX_AGE_SECONDS: oldest result that may be served (default 86400)
+        AI_STALE_REVALIDATE_CONCURRENCY: background refreshes at once (default 2)
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_age_seconds: Optional[float] = None,
+        revalidate_concurrency: Optional[int] = None,
+    ):
+        self.max_entries = max_entries or int(os.getenv("AI_STALE_MAX_ENTRIES", "500"))
+        self.max_age_seconds = max_age_seconds or float(os.getenv("AI_STALE_MAX_AGE_SECONDS", "86400"))
+        self.revalidate_concurrency = revalidate_concurrency or int(os.getenv("AI_STALE_REVALIDATE_CONCURRENCY", "2"))
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._aliases: Dict[str, str] = {}
+        self._pending: "OrderedDict[str, None]" = OrderedDict()
+        self._revalidation: Optional[asyncio.Task] = None
+        self.stats = {"stored": 0, "served": 0, "misses": 0, "revalidated": 0, "revalidation_failed": 0}
+
+    def put(self, key: str, result: Dict[str, Any], aliases: Iterable[str] = (), refresh: Optional[Refresh] = None):
+        """
+        Remember a fresh result.
+
+        Args:
+            key (str): Exact request key
+            result (Dict[str, Any]): The fresh result
+            aliases (Iterable[str]): Looser keys the result may also be served for
+            refresh (Callable, optional): Regenerates (and re-stores) the result
+        """
+        self._entries[key] = _Entry(copy.deepcopy(result), refresh)
+        self._entries.move_to_end(key)
+        for alias in aliases:
+            self._aliases[alias] = key
+        self._pending.pop(key, None)
+        self.stats["stored"] += 1
+
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._pending.pop(evicted, None)
+        if len(self._aliases) > self.max_entries * 2:
+            self._aliases = {alias: target for alias, target in self._aliases.items() if target in self._entries}
+
+    def get(self, key: str, aliases: Iterable[str] = (), reason: str = "upstream_unavailable") -> Optional[Dict[str, Any]]:
+        """
+        Best stored result for a request, marked as stale, or None.
+
+        The entry is queued for revalidation.
+
+        Args:
+            key (str): Exact request key
+            aliases (Iterable[str]): Looser keys to fall back to, best first
+            reason (str): Why a stale result is being served
+
+        Returns:
+            Optional[Dict[str, Any]]: A copy of the result with "stale",
+                "staleReason" and "generatedAt" set
+        """
+        for candidate in (key, *(self._aliases.get(alias) for alias in aliases)):
+            entry = self._entries.get(candidate) if candidate else None
+            if entry is None:
+                continue
+            if time.time() - entry.stored_at > self.max_age_seconds:
+                continue
+
+            self._entries.move_to_end(candidate)
+            if entry.refresh is not None:
+                self._pending[candidate] = None
+            self.stats["served"] += 1
+
+            result = copy.deepcopy(entry.result)
+            result["stale"] = True
+            result["staleReason"] = reason
+            result["generatedAt"] = datetime.fromtimestamp(entry.stored_at, timezone.utc).isoformat()
+            return result
+
+        self.stats["misses"] += 1
+        return None
+
+    def revalidate(self):
+        """Refresh every entry served stale, in the background. Safe to call repeatedly."""
+        if not self._pending or (self._revalidation and not self._revalidation.done()):
+            return
+        try:
+            self._revalidation = asyncio.get_running_loop().create_task(self._revalidate_pending())
+        except RuntimeError:
+            pass  # No loop (e.g. a sync caller); the next revalidate() call will pick them up
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "entries": len(self._entries), "pending_revalidation": len(self._pending)}
+
+    async def _revalidate_pending(self):
+        # Started from inside a request; don't inherit that request's deadline.
+        clear_deadline()
+        semaphore = asyncio.Semaphore(self.revalidate_concurrency)
+
+        async def refresh(key: str):
+            entry = self._entries.get(key)
+            if entry is None or entry.refresh is None:
+                return
+            async with semaphore:
+                try:
+                    # The refresh goes through the normal generation path, which re-stores the result
+                    await entry.refresh()
+                    self.stats["revalidated"] += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._pending[key] = None
+                    self.stats["revalidation_failed"] += 1
+                    print(f"Error revalidating stale result: {str(e)}")
+
+        keys = list(self._pending)
+        self._pending.clear()
+        await asyncio.gather(*[refresh(key) for key in keys])
@@ -0,0 +1,192 @@
+import json
+import hashlib
+from dataclasses import dataclass, field, replace
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+
+# Keys of the trip payload that influence generated output. Everything else
+# (ids, timestamps, an already generated itinerary, existingDays) is context.
+TRIP_INPUT_FIELDS = (
+    "destination",
+    "startDate",
+    "endDate",
+    "budget",
+    "departureLocation",
+    "travelers",
+    "numberOfTravelers",
+    "destinations",
+    "preferences",
+)
+
+
+def parse_iso_datetime(value: Any) -> Optional[datetime]:
+    """
+    Parse an ISO-8601 date string as sent by the Node backend.
+
+    Args:
+        value (Any): Date string (optionally with a trailing 'Z'), or a datetime/date
+
+    Returns:
+        Optional[datetime]: Naive datetime, or None when the value cannot be parsed
+    """
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True)
+class DestinationSpec:
+    location: str
+    start_date: Optional[date]
+    end_date: Optional[date]
+    places_to_visit: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class TripSpec:
+    """
+    Normalized view of the trip inputs that drive generation.
+    """
+
+    destination: str
+    start_date: Optional[date]
+    end_date: Optional[date]
+    budget: float
+    departure_location: str
+    travelers: int
+    destinations: Tuple[DestinationSpec, ...]
+    preferences: Dict[str, Any] = field(hash=False)
+    fingerprint: str = ""
+
+    @classmethod
+    def from_trip_data(cls, trip_data: Dict[str, Any]) -> "TripSpec":
+        """
+        Build a TripSpec from the raw trip payload.
+
+        Args:
+            trip_data (Dict[str, Any]): Trip details and preferences
+
+        Returns:
+            TripSpec: Normalized trip inputs
+        """
+        destinations = []
+        for dest in trip_data.get("destinations") or []:
+            dest_start = parse_iso_datetime(dest.get("startDate"))
+            dest_end = parse_iso_datetime(dest.get("endDate"))
+            destinations.append(DestinationSpec(
+                location=dest.get("location", "Unknown"),
+                start_date=dest_start.date() if dest_start else None,
+                end_date=dest_end.date() if dest_end else None,
+                places_to_visit=tuple(dest.get("placesToVisit") or []),
+            ))
+
+        start = parse_iso_datetime(trip_data.get("startDate"))
+        end = parse_iso_datetime(trip_data.get("endDate"))
+
+        spec = cls(
+            destination=trip_data.get("destination", "Unknown"),
+            start_date=start.date() if start else None,
+            end_date=end.date() if end else None,
+            budget=trip_data.get("budget") or 0,
+            departure_location=trip_data.get("departureLocation") or "",
+            travelers=trip_data.get("travelers") or trip_data.get("numberOfTravelers") or 1,
+            destinations=tuple(destinations),
+            preferences=dict(trip_data.get("preferences") or {}),
+        )
+        return replace(spec, fingerprint=spec_fingerprint(spec))
+
+    @property
+    def first_day(self) -> Optional[date]:
+        dates = [self.start_date] + [d.start_date for d in self.destinations]
+        dates = [d for d in dates if d]
+        return min(dates) if self.start_date and dates else None
+
+    @property
+    def last_day(self) -> Optional[date]:
+        dates = [self.end_date] + [d.end_date for d in self.destinations]
+        dates = [d for d in dates if d]
+        return max(dates) if self.end_date and dates else None
+
+    @property
+    def day_count(self) -> int:
+        if not self.first_day or not self.last_day:
+            return 0
+        return max((self.last_day - self.first_day).days + 1, 0)
+
+    def date_for_day(self, day_number: int) -> Optional[date]:
+        if not self.first_day:
+            return None
+        return self.first_day + timedelta(days=day_number - 1)
+
+    def destination_for_day(self, day_number: int) -> str:
+        target = self.date_for_day(day_number)
+        if target:
+            for dest in self.destinations:
+                if dest.start_date and dest.end_date and dest.start_date <= target <= dest.end_date:
+                    return dest.location
+        return self.destination
+
+
+def spec_fingerprint(spec: "TripSpec") -> str:
+    """
+    Stable hash of the normalized generation inputs.
+
+    Hashing the parsed values rather than the raw payload means requests for
+    the same trip match even when callers send different shapes: travelers
+    vs numberOfTravelers, dates with or without a time, numbers as ints or
+    floats, empty preference lists or none at all, and Mongoose subdocument ids.
+
+    Args:
+        spec (TripSpec): Normalized trip inputs
+
+    Returns:
+        str: Hex digest that changes whenever any of the inputs change
+    """
+    preferences = {
+        key: value for key, value in spec.preferences.items()
+        if key != "_id" and value not in (None, "", [], {})
+    }
+    relevant = {
+        "destination": spec.destination,
+        "startDate": spec.start_date,
+        "endDate": spec.end_date,
+        "budget": float(spec.budget),
+        "departureLocation": spec.departure_location,
+        "travelers": int(spec.travelers),
+        "destinations": [
+            [dest.location, dest.start_date, dest.end_date, list(dest.places_to_visit)]
+            for dest in spec.destinations
+        ],
+        "preferences": preferences,
+    }
+    encoded = json.dumps(relevant, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def trip_fingerprint(trip_data: Dict[str, Any]) -> str:
+    """
+    Stable hash of the generation-relevant trip inputs (see spec_fingerprint).
+
+    Args:
+        trip_data (Dict[str, Any]): Trip details and preferences
+
+    Returns:
+        str: Hex digest that changes whenever any of the inputs change
+    """
+    return TripSpec.from_trip_data(trip_data).fingerprint
+
+
+def trip_key(trip_data: Dict[str, Any]) -> str:
+    """
+    Identify a trip: its database id when the caller sent one, otherwise its
+    input fingerprint.
+    """
+    trip_id = trip_data.get("tripId") or trip_data.get("_id")
+    return str(trip_id) if trip_id else trip_fingerprint(trip_data)
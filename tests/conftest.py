@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Import the Python services the way src/python/server.py and src/ai/wrapper.py do
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
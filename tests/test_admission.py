@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+
+from server.admission import AdmissionController, AdmissionMiddleware
+
+
+def _app(release: asyncio.Event, seen: list):
+    async def app(scope, receive, send):
+        seen.append(scope["state"]["arrived_at"])
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    controller = AdmissionController(["/work"], enabled=True, max_in_flight=1, max_queued=4, queue_timeout=30)
+    return AdmissionMiddleware(app, controller), controller
+
+
+def test_queue_wait_is_capped_by_request_deadline():
+    async def main():
+        release, seen = asyncio.Event(), []
+        app, controller = _app(release, seen)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            holder = asyncio.create_task(client.get("/work"))
+            await asyncio.sleep(0.01)
+
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            queued = await client.get("/work", headers={"X-Request-Timeout-Ms": "50"})
+            waited = loop.time() - start
+
+            release.set()
+            assert (await holder).status_code == 200
+
+        assert queued.status_code == 504
+        assert waited < 1
+        assert len(seen) == 1
+        assert controller.gates["/work"].stats["deadline_exceeded_in_queue"] == 1
+
+    asyncio.run(main())
+
+
+def test_requests_without_deadline_wait_for_a_slot():
+    async def main():
+        release, seen = asyncio.Event(), []
+        app, _ = _app(release, seen)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            holder = asyncio.create_task(client.get("/work"))
+            queued = asyncio.create_task(client.get("/work"))
+            await asyncio.sleep(0.05)
+            release.set()
+            responses = await asyncio.gather(holder, queued)
+
+        assert [response.status_code for response in responses] == [200, 200]
+        # Arrival is stamped before queueing, so the handler can charge the wait to the deadline
+        assert len(seen) == 2 and seen[1] - seen[0] < 0.05
+
+    asyncio.run(main())
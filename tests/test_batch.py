@@ -0,0 +1,40 @@
+from server.batch import trip_requests
+
+
+def _trip():
+    return {
+        "_id": "trip-1",
+        "destination": "Paris",
+        "startDate": "2025-06-01T00:00:00.000Z",
+        "endDate": "2025-06-03T00:00:00.000Z",
+        "budget": 1500,
+        "itinerary": {"dailyItinerary": [{"day": day, "activities": [{"name": f"Stop {day}"}]} for day in (1, 2, 3)]},
+    }
+
+
+def test_day_command_expands_trips_into_day_requests():
+    requests = list(trip_requests([_trip()], "generate_day_itinerary"))
+
+    assert [request["id"] for request in requests] == ["trip-1:day-1", "trip-1:day-2", "trip-1:day-3"]
+    for day_number, request in enumerate(requests, start=1):
+        data = request["data"]
+        assert data["dayNumber"] == day_number
+        assert data["tripData"]["tripId"] == "trip-1"
+        assert data["tripData"]["destination"] == "Paris"
+        assert [day["day"] for day in data["tripData"]["existingDays"]] == [d for d in (1, 2, 3) if d != day_number]
+
+
+def test_day_command_reports_trips_without_dates():
+    trip = {"_id": "trip-2", "destination": "Rome"}
+
+    assert list(trip_requests([trip], "generate_day_itinerary")) == [
+        {"id": "trip-2", "command": "generate_day_itinerary", "error": "Trip has no dates to plan days for"}
+    ]
+
+
+def test_regenerate_command_carries_previous_itinerary():
+    [request] = trip_requests([_trip()])
+
+    assert request["id"] == "trip-1"
+    assert request["data"]["tripId"] == "trip-1"
+    assert len(request["data"]["previousItinerary"]["dailyItinerary"]) == 3
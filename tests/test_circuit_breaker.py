@@ -0,0 +1,104 @@
+import json
+import asyncio
+
+import pytest
+
+from server.ai_service import AIService
+from server.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def _breaker(**kwargs) -> CircuitBreaker:
+    options = {"enabled": True, "window": 4, "min_samples": 2, "max_error_rate": 0.5, "open_seconds": 60}
+    return CircuitBreaker(**{**options, **kwargs})
+
+
+def _open(breaker: CircuitBreaker):
+    for _ in range(breaker.min_samples):
+        breaker.record(False, 0.1, breaker.before_call())
+    assert breaker.state == OPEN
+
+
+def test_opens_on_error_rate_and_short_circuits():
+    breaker = _breaker()
+    breaker.record(True, 0.1, breaker.before_call())
+    assert breaker.state == CLOSED
+
+    breaker.record(False, 0.1, breaker.before_call())
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert 0 < raised.value.retry_after <= 60
+    assert breaker.stats["short_circuited"] == 1
+
+
+def test_opens_on_slow_calls():
+    breaker = _breaker(max_p95_seconds=1)
+    breaker.record(True, 5, breaker.before_call())
+    breaker.record(True, 5, breaker.before_call())
+
+    assert breaker.state == OPEN
+
+
+def test_half_open_admits_limited_probes_and_closes_after_successes():
+    closed = []
+    breaker = _breaker(open_seconds=0, max_probes=1, probes_to_close=2, on_close=lambda: closed.append(True))
+    _open(breaker)
+
+    assert breaker.recovering()
+    probe = breaker.before_call()
+    assert probe and breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record(True, 0.1, probe)
+    assert breaker.state == HALF_OPEN
+    breaker.record(True, 0.1, breaker.before_call())
+    assert breaker.state == CLOSED
+    assert closed == [True]
+    assert not breaker.recovering()
+
+
+def test_failed_probe_reopens_and_released_probe_frees_its_slot():
+    breaker = _breaker(open_seconds=0)
+    _open(breaker)
+
+    probe = breaker.before_call()
+    breaker.release(probe)
+    probe = breaker.before_call()
+    assert probe
+
+    breaker.record(False, 0.1, probe)
+    assert breaker.state == OPEN
+    assert breaker.stats["opened"] == 2
+
+
+def test_disabled_breaker_admits_everything():
+    breaker = CircuitBreaker(enabled=False)
+    for _ in range(10):
+        breaker.record(False, 0.1, breaker.before_call())
+
+    assert breaker.state == CLOSED
+    assert not breaker.recovering()
+
+
+def test_long_trip_closes_a_half_open_breaker():
+    service = AIService()
+    service.prewarmer.enabled = False
+    service.breaker = _breaker(open_seconds=0, max_probes=1, probes_to_close=1, on_close=service.stale_results.revalidate)
+    _open(service.breaker)
+    prompts = []
+
+    async def healthy_upstream(prompt, task, output_format=None):
+        prompts.append(task)
+        return json.dumps({"flights": [], "accommodations": [], "dailyItinerary": [{"day": 1, "activities": []}]})
+
+    service._get_model_response = healthy_upstream
+    trip = {"destination": "Paris", "startDate": "2025-06-01", "endDate": "2025-06-07", "budget": 3000}
+
+    asyncio.run(service.generate_trip_plan(trip))
+
+    # One unchunked call was the probe, and it closed the circuit
+    assert len(prompts) == 1
+    assert service.breaker.state == CLOSED
+    assert service.breaker.stats["short_circuited"] == 0
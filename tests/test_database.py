@@ -0,0 +1,204 @@
+import os
+import asyncio
+import threading
+import time
+
+import pytest
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from server.services import database
+from server.services.database import DatabaseService
+
+
+def test_compressed_storage_requires_exclusive_acknowledgement(monkeypatch):
+    # MongoClient connects lazily, so no server is needed
+    monkeypatch.setenv("MONGODB_URI", "mongodb://localhost:27017")
+    monkeypatch.setenv("DB_ITINERARY_STORAGE", "compressed")
+    monkeypatch.delenv("DB_ITINERARY_STORAGE_EXCLUSIVE", raising=False)
+
+    with pytest.raises(ValueError, match="DB_ITINERARY_STORAGE_EXCLUSIVE"):
+        DatabaseService()
+
+    monkeypatch.setenv("DB_ITINERARY_STORAGE_EXCLUSIVE", "true")
+    assert DatabaseService().compress_itineraries
+
+
+@pytest.fixture
+def cached_service(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    monkeypatch.setattr(database, "MongoClient", mongomock.MongoClient)
+    monkeypatch.setenv("DB_ITINERARY_STORAGE", "document")
+    monkeypatch.setenv("DB_CACHE_ENABLED", "true")
+    monkeypatch.setenv("DB_CACHE_CHANGE_STREAM", "false")
+    return DatabaseService()
+
+
+def test_own_writes_invalidate_cached_trips(cached_service):
+    service = cached_service
+
+    async def main():
+        trip = await service.create_trip({"destination": "Paris", "budget": 1000})
+        trip_id = trip["_id"]
+        await service.get_trip(trip_id)
+        assert (await service.get_trip(trip_id))["budget"] == 1000
+        assert service.cache.stats["hits"] >= 1
+
+        await service.update_trip(trip_id, {"budget": 2000})
+        assert (await service.get_trip(trip_id))["budget"] == 2000
+
+        await service.delete_trip(trip_id)
+        assert await service.get_trip(trip_id) is None
+
+    asyncio.run(main())
+
+
+def test_user_update_invalidates_lookup_by_email(cached_service):
+    service = cached_service
+
+    async def main():
+        user = await service.create_user({"email": "a@example.com", "name": "Ada"})
+        assert (await service.get_user_by_email("a@example.com"))["name"] == "Ada"
+        await service.get_user(user["_id"])
+
+        await service.update_user(user["_id"], {"name": "Grace"})
+        assert (await service.get_user_by_email("a@example.com"))["name"] == "Grace"
+        assert (await service.get_user(user["_id"]))["name"] == "Grace"
+
+    asyncio.run(main())
+
+
+class _Stream:
+    """Change stream yielding scripted changes, then failing with `error` if given."""
+
+    def __init__(self, changes, error=None):
+        self.changes = list(changes)
+        self.error = error
+        self.resume_token = None
+        self.alive = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def try_next(self):
+        if self.changes:
+            change = self.changes.pop(0)
+            self.resume_token = change["_id"]
+            return change
+        if self.error:
+            raise self.error
+        self.alive = False
+        return None
+
+
+class _WatchableDatabase:
+    """Stands in for service.db: each watch() call opens the next scripted stream."""
+
+    def __init__(self, service, streams):
+        self.service = service
+        self.streams = list(streams)
+        self.resume_after = []
+
+    def watch(self, pipeline, resume_after=None, max_await_time_ms=None):
+        self.resume_after.append(resume_after)
+        if not self.streams:
+            self.service._stop_watching.set()
+            return _Stream([])
+        stream = self.streams.pop(0)
+        if isinstance(stream, Exception):
+            raise stream
+        return stream
+
+
+def _change(token, collection, document_id):
+    return {"_id": token, "ns": {"coll": collection}, "documentKey": {"_id": document_id}, "operationType": "update"}
+
+
+def _watch(service, streams):
+    service.db = _WatchableDatabase(service, streams)
+    service.change_stream_retry_seconds = 0
+    service._watch_changes()
+    return service.db
+
+
+def test_change_stream_invalidates_and_resumes_after_an_error(cached_service):
+    service = cached_service
+    for trip_id in ("t1", "t2"):
+        service.cache.put(("trip", trip_id), {"_id": trip_id}, service.cache.epoch())
+
+    db = _watch(service, [
+        _Stream([_change("token-1", "trips", "t1")], error=AutoReconnect("primary stepped down")),
+        _Stream([_change("token-2", "trips", "t2")]),
+    ])
+
+    # The second stream resumed from the last change seen on the first
+    assert db.resume_after[:2] == [None, "token-1"]
+    assert service.cache.get(("trip", "t1"))[0] is False
+    assert service.cache.get(("trip", "t2"))[0] is False
+    assert service.cache.stats["change_stream_invalidations"] == 2
+
+
+def test_change_stream_restart_clears_the_cache(cached_service):
+    service = cached_service
+    service.cache.put(("trip", "t1"), {"_id": "t1"}, service.cache.epoch())
+
+    db = _watch(service, [
+        _Stream([], error=OperationFailure("resume token expired", code=286)),
+        _Stream([]),
+    ])
+
+    # A restart without a resume token may have missed writes, so nothing cached survives
+    assert db.resume_after[:2] == [None, None]
+    assert service.cache.get(("trip", "t1"))[0] is False
+    assert service.change_stream_state == "active"
+
+
+def test_reads_bypass_the_cache_without_change_streams(cached_service):
+    service = cached_service
+    service._watcher = threading.current_thread()  # as if DB_CACHE_CHANGE_STREAM were on
+    _watch(service, [OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)])
+    assert service.change_stream_state == "unavailable"
+
+    async def main():
+        trip = await service.create_trip({"destination": "Paris"})
+        await service.get_trip(trip["_id"])
+        await service.get_trip(trip["_id"])
+
+    asyncio.run(main())
+    assert service.cache.stats["hits"] == 0
+    assert service.cache.metrics()["entries"] == 0
+
+
+@pytest.mark.skipif(not os.getenv("MONGODB_REPLSET_TEST_URI"), reason="needs MONGODB_REPLSET_TEST_URI (a single-node replica set)")
+def test_writes_from_another_process_invalidate_through_the_change_stream(monkeypatch):
+    # mongod --replSet rs0, rs.initiate(), then
+    # MONGODB_REPLSET_TEST_URI="mongodb://localhost:27017/?replicaSet=rs0"
+    monkeypatch.setenv("MONGODB_URI", os.environ["MONGODB_REPLSET_TEST_URI"])
+    monkeypatch.setenv("MONGODB_DB_NAME", "itinerai_cache_test")
+    monkeypatch.setenv("DB_ITINERARY_STORAGE", "document")
+    monkeypatch.setenv("DB_CACHE_ENABLED", "true")
+    monkeypatch.setenv("DB_CACHE_CHANGE_STREAM", "true")
+    service = DatabaseService()
+    other = service.client.itinerai_cache_test.trips
+
+    async def main():
+        deadline = time.monotonic() + 10
+        while service.change_stream_state != "active" and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        trip = await service.create_trip({"destination": "Paris", "budget": 1000})
+        await service.get_trip(trip["_id"])
+
+        other.update_one({"destination": "Paris", "budget": 1000}, {"$set": {"budget": 3000}})
+        while time.monotonic() < deadline:
+            if (await service.get_trip(trip["_id"]))["budget"] == 3000:
+                return
+            await asyncio.sleep(0.05)
+        pytest.fail("Cached trip was not invalidated by the change stream")
+
+    try:
+        asyncio.run(main())
+    finally:
+        service.client.drop_database("itinerai_cache_test")
+        service.close()
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from server.ai_service import AIService
+from server.deadlines import (
+    ClientDisconnected,
+    DeadlineExceeded,
+    bounded_timeout,
+    deadline_scope,
+    gather_or_cancel,
+    remaining,
+    run_until,
+)
+
+
+class _Cancellable:
+    """Sleeps for `seconds`, recording whether it finished or was cancelled."""
+
+    def __init__(self, seconds: float = 5):
+        self.seconds = seconds
+        self.calls = {"finished": 0, "cancelled": 0}
+
+    async def __call__(self, *args, **kwargs):
+        try:
+            await asyncio.sleep(self.seconds)
+            self.calls["finished"] += 1
+        except asyncio.CancelledError:
+            self.calls["cancelled"] += 1
+            raise
+
+
+def test_nested_scope_only_brings_the_deadline_forward():
+    async def main():
+        with deadline_scope(10):
+            with deadline_scope(60):
+                assert 9 < remaining() <= 10
+            with deadline_scope(1):
+                assert remaining() <= 1
+            with deadline_scope(None):
+                assert 9 < remaining() <= 10
+        assert remaining() is None
+
+    asyncio.run(main())
+
+
+def test_bounded_timeout_clamps_and_raises_once_expired():
+    async def main():
+        assert bounded_timeout(30) == 30
+        with deadline_scope(1):
+            assert bounded_timeout(30) <= 1
+            assert bounded_timeout(None) <= 1
+        with deadline_scope(0):
+            with pytest.raises(DeadlineExceeded):
+                bounded_timeout(30)
+
+    asyncio.run(main())
+
+
+def test_expired_deadline_raises_and_cancels_the_work():
+    work = _Cancellable()
+
+    async def main():
+        with pytest.raises(DeadlineExceeded):
+            await run_until(work(), timeout_seconds=0.05)
+
+    asyncio.run(main())
+    assert work.calls == {"finished": 0, "cancelled": 1}
+
+
+def test_client_disconnect_cancels_the_work():
+    work = _Cancellable()
+    checks = []
+
+    async def is_disconnected():
+        checks.append(True)
+        return len(checks) >= 2
+
+    async def main():
+        with pytest.raises(ClientDisconnected):
+            await run_until(work(), is_disconnected=is_disconnected, poll_interval=0.01)
+
+    asyncio.run(main())
+    assert work.calls == {"finished": 0, "cancelled": 1}
+
+
+def test_expired_request_aborts_the_upstream_call():
+    service = AIService()
+    service.prewarmer.enabled = False
+    upstream = _Cancellable()
+    service.openai_client.chat.completions.create = upstream
+    trip = {"destination": "Paris", "startDate": "2025-06-01", "endDate": "2025-06-03"}
+
+    async def main():
+        with pytest.raises(DeadlineExceeded):
+            await service.run_request(service.generate_day_itinerary(trip, 1), timeout_seconds=0.05)
+
+    asyncio.run(main())
+    assert upstream.calls == {"finished": 0, "cancelled": 1}
+    assert service.abandoned["deadline_exceeded"] == 1
+    assert service.abandoned["upstream_calls_aborted"] == 1
+
+
+def test_gather_or_cancel_cancels_siblings_on_failure():
+    calls = {"finished": 0, "cancelled": 0}
+
+    async def slow():
+        try:
+            await asyncio.sleep(2)
+            calls["finished"] += 1
+        except asyncio.CancelledError:
+            calls["cancelled"] += 1
+            raise
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream error")
+
+    async def main():
+        with pytest.raises(ValueError):
+            await gather_or_cancel(slow(), failing(), slow())
+        # The siblings were cancelled before the error was raised
+        assert calls == {"finished": 0, "cancelled": 2}
+
+    asyncio.run(main())
+
+
+def test_gather_or_cancel_returns_results_in_order():
+    async def value(result, delay):
+        await asyncio.sleep(delay)
+        return result
+
+    assert asyncio.run(gather_or_cancel(value(1, 0.02), value(2, 0.0))) == [1, 2]
@@ -0,0 +1,75 @@
+import asyncio
+
+from server.hedging import Hedger, LatencyTracker
+
+
+def _slow_hedger(delay: float) -> Hedger:
+    hedger = Hedger(enabled=True, min_samples=1, min_delay=delay, budget_percent=100)
+    hedger.latency["default"] = LatencyTracker()
+    hedger.latency["default"].record(delay)
+    return hedger
+
+
+def test_caller_cancelled_before_hedge_delay_cancels_primary():
+    calls = {"finished": 0, "cancelled": 0}
+
+    async def call():
+        try:
+            await asyncio.sleep(2)
+            calls["finished"] += 1
+        except asyncio.CancelledError:
+            calls["cancelled"] += 1
+            raise
+
+    async def main():
+        hedger = _slow_hedger(1.0)
+        try:
+            await asyncio.wait_for(hedger.run(call), 0.1)
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    assert calls == {"finished": 0, "cancelled": 1}
+
+
+def test_losing_attempt_is_cancelled():
+    delays = iter([1.0, 0.01])
+    cancelled = []
+
+    async def call():
+        delay = next(delays)
+        try:
+            await asyncio.sleep(delay)
+            return delay
+        except asyncio.CancelledError:
+            cancelled.append(delay)
+            raise
+
+    async def main():
+        hedger = _slow_hedger(0.05)
+        result = await hedger.run(call)
+        await asyncio.sleep(0)
+        return result, hedger.stats
+
+    result, stats = asyncio.run(main())
+    assert result == 0.01
+    assert cancelled == [1.0]
+    assert stats["hedge_wins"] == 1
+
+
+def test_hedge_win_records_the_primary_elapsed_time_not_the_hedge_latency():
+    delays = iter([1.0, 0.01])
+
+    async def call():
+        await asyncio.sleep(next(delays))
+
+    async def main():
+        hedger = _slow_hedger(0.05)
+        await hedger.run(call)
+        return hedger.latency["default"]._samples
+
+    samples = list(asyncio.run(main()))
+    # The seeded sample, then the primary's time until the hedge won: past the hedge delay
+    assert len(samples) == 2
+    assert samples[1] >= 0.05
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from server.model_router import DEFAULT_ROUTES, TASK_DAY, TASK_TRIP_PLAN, ModelRouter, supports_structured_output
+
+
+def test_structured_calls_skip_models_without_json_schema_support():
+    router = ModelRouter()
+
+    assert router.route(TASK_TRIP_PLAN)["models"] == ["gpt-3.5-turbo", "gpt-4o-mini"]
+    assert router.route(TASK_TRIP_PLAN, structured_output=True)["models"] == ["gpt-4o-mini"]
+
+
+def test_structured_route_without_supported_model_is_refused(tmp_path):
+    routes_file = tmp_path / "routes.json"
+    routes_file.write_text(json.dumps({"tasks": {TASK_DAY: {"models": ["gpt-3.5-turbo"]}}}))
+    router = ModelRouter(routes_file=str(routes_file))
+
+    with pytest.raises(ValueError, match="AI_STRUCTURED_OUTPUT"):
+        router.route(TASK_DAY, structured_output=True)
+
+
+def test_routers_do_not_share_the_default_config():
+    router = ModelRouter()
+    router.config["tasks"][TASK_DAY]["models"].append("gpt-4o")
+    router.config["health"]["window"] = 1
+
+    assert DEFAULT_ROUTES["tasks"][TASK_DAY]["models"] == ["gpt-3.5-turbo", "gpt-4o-mini"]
+    assert ModelRouter().config == DEFAULT_ROUTES
+
+
+def test_supported_models_can_be_configured(monkeypatch):
+    assert supports_structured_output("ft:gpt-4o-mini-2024-07-18:acme::abc123")
+    assert supports_structured_output("gpt-4o-2024-08-06")
+    assert not supports_structured_output("gpt-3.5-turbo")
+    # Snapshots from before json_schema support
+    assert not supports_structured_output("gpt-4o-2024-05-13")
+    assert not supports_structured_output("o1-preview")
+
+    monkeypatch.setenv("AI_STRUCTURED_OUTPUT_MODELS", "gpt-3.5-turbo")
+    assert supports_structured_output("gpt-3.5-turbo")
+    assert not supports_structured_output("gpt-4o-mini")
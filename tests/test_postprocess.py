@@ -0,0 +1,59 @@
+import pytest
+
+from server.postprocess import recompute_total_cost
+
+
+def _meal(cost=None):
+    meal = {"restaurant": "Somewhere"}
+    if cost is not None:
+        meal["cost"] = cost
+    return meal
+
+
+def _day(day, meals, activity_cost=0):
+    return {"day": day, "activities": [{"cost": activity_cost}], "meals": meals, "transportation": []}
+
+
+def test_sums_line_items():
+    itinerary = {
+        "flights": [{"price": 500}, {"price": "n/a"}],
+        "accommodations": [{"price": 300}],
+        "dailyItinerary": [_day(1, [_meal(20), _meal(30)], activity_cost=15), _day(2, [_meal(25)], activity_cost=5)],
+    }
+    total = recompute_total_cost(itinerary)
+    assert total == {
+        "flights": 500,
+        "accommodation": 300,
+        "activities": 20,
+        "transportation": 0,
+        "meals": 75,
+        "total": 895,
+    }
+
+
+def test_uncosted_meals_use_previous_average_per_meal():
+    # Two days kept from an itinerary generated before meals had costs; one
+    # regenerated day with costed meals.
+    previous = {
+        "totalCost": {"meals": 540},
+        "dailyItinerary": [_day(day, [_meal(), _meal(), _meal()]) for day in (1, 2, 3)],
+    }
+    itinerary = {
+        "dailyItinerary": [
+            _day(1, [_meal(), _meal(), _meal()]),
+            _day(2, [_meal(20), _meal(30), _meal(40)]),
+            _day(3, [_meal(), _meal(), _meal()]),
+        ],
+    }
+    assert recompute_total_cost(itinerary, previous)["meals"] == pytest.approx(90 + 6 * 60)
+
+
+def test_days_without_meals_use_previous_average_per_day():
+    previous = {"totalCost": {"meals": 300}, "dailyItinerary": [_day(1, []), _day(2, [])]}
+    itinerary = {"dailyItinerary": [_day(1, []), _day(2, []), _day(3, [_meal(10)])]}
+    assert recompute_total_cost(itinerary, previous)["meals"] == pytest.approx(150 + 150 + 10)
+
+
+def test_uncosted_meals_without_history_cost_nothing():
+    itinerary = {"dailyItinerary": [_day(1, [_meal(), _meal(12)])]}
+    assert recompute_total_cost(itinerary)["meals"] == 12
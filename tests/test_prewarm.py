@@ -0,0 +1,92 @@
+import asyncio
+
+from server.prewarm import DayPrewarmer
+from server.trip_spec import TripSpec
+
+# A stored trip as Mongoose serializes it to JSON
+TRIP = {
+    "_id": "665f1c2e9b1d4a0012345678",
+    "destination": "Paris",
+    "startDate": "2025-06-01T00:00:00.000Z",
+    "endDate": "2025-06-03T00:00:00.000Z",
+    "budget": 2000,
+    "travelers": 2,
+    "preferences": {"activities": ["museums"], "dietaryRestrictions": ["vegetarian"]},
+    "destinations": [{
+        "_id": "665f1c2e9b1d4a0012345679",
+        "location": "Paris",
+        "startDate": "2025-06-01T00:00:00.000Z",
+        "endDate": "2025-06-03T00:00:00.000Z",
+        "placesToVisit": [],
+    }],
+}
+
+
+def plan_payload(client_trip_data):
+    """tripDataForAI as built by tripController.regenerateTripPlan."""
+    return {
+        "tripId": TRIP["_id"],
+        "destination": client_trip_data.get("destination") or TRIP["destination"],
+        "startDate": client_trip_data.get("startDate") or TRIP["startDate"],
+        "endDate": client_trip_data.get("endDate") or TRIP["endDate"],
+        "budget": client_trip_data["budget"] if "budget" in client_trip_data else TRIP["budget"],
+        "numberOfTravelers": client_trip_data.get("numberOfTravelers") or TRIP["travelers"] or 1,
+        "preferences": client_trip_data.get("preferences") or TRIP["preferences"],
+        "destinations": client_trip_data.get("destinations") or TRIP["destinations"],
+    }
+
+
+def day_payload(client_trip_data, existing_days):
+    """tripDataForAI as built by tripController.generateDayItinerary."""
+    return {
+        **plan_payload(client_trip_data),
+        "itinerary": client_trip_data.get("itinerary"),
+        "existingDays": existing_days,
+    }
+
+
+def test_controller_plan_and_day_payloads_share_a_fingerprint():
+    plan = plan_payload({})
+    # The client sends its copy of the trip, with the same values in another shape
+    day = day_payload({**TRIP, "budget": 2000.0, "itinerary": {"dailyItinerary": []}}, [{"day": 1}])
+    assert TripSpec.from_trip_data(plan).fingerprint == TripSpec.from_trip_data(day).fingerprint
+
+
+def test_fingerprint_ignores_payload_shape():
+    base = TripSpec.from_trip_data({
+        "destination": "Paris", "startDate": "2025-06-01", "endDate": "2025-06-03",
+        "budget": 2000, "travelers": 2, "preferences": {"activities": ["museums"]},
+    })
+    reshaped = TripSpec.from_trip_data({
+        "destination": "Paris", "startDate": "2025-06-01T00:00:00Z", "endDate": "2025-06-03T00:00:00.000Z",
+        "budget": 2000.0, "numberOfTravelers": 2,
+        "preferences": {"activities": ["museums"], "dietaryRestrictions": [], "_id": "abc"},
+    })
+    changed = TripSpec.from_trip_data({
+        "destination": "Paris", "startDate": "2025-06-01", "endDate": "2025-06-03",
+        "budget": 2000, "travelers": 3, "preferences": {"activities": ["museums"]},
+    })
+    assert base.fingerprint == reshaped.fingerprint
+    assert base.fingerprint != changed.fingerprint
+
+
+def test_prewarmed_day_is_served_to_the_controllers_day_request():
+    generated = []
+
+    async def generate_day(trip_data, day_number):
+        generated.append(day_number)
+        return {"dayItinerary": {"day": day_number, "activities": [{"name": f"Spot {day_number}"}], "meals": []}}
+
+    async def main():
+        prewarmer = DayPrewarmer(generate_day, enabled=True, max_days_per_trip=3)
+        plan = plan_payload({})
+        itinerary = {"dailyItinerary": [{"day": day, "activities": [{"name": f"Old {day}"}]} for day in (1, 2, 3)]}
+        prewarmer.schedule(plan, itinerary)
+        await asyncio.sleep(0.01)
+        day = await prewarmer.take(day_payload({}, [{"day": 1, "activities": [{"name": "Old 1"}]}]), 2)
+        return day, prewarmer.stats
+
+    day, stats = asyncio.run(main())
+    assert day["dayItinerary"]["day"] == 2
+    assert stats["hits"] == 1
+    assert stats["stale"] == 0
@@ -0,0 +1,11 @@
+from types import SimpleNamespace
+
+from server.profiling import _frame_label
+
+
+def test_frame_label_falls_back_to_co_name_before_python_311():
+    # Code objects before 3.11 have no co_qualname
+    code = SimpleNamespace(co_name="generate", co_filename="/srv/src/server/ai_service.py")
+
+    assert _frame_label(SimpleNamespace(f_code=code)) == "generate (ai_service.py)"
+
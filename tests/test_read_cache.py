@@ -0,0 +1,51 @@
+import time
+
+from server.services.read_cache import ReadThroughCache
+
+
+def test_values_are_copied_in_and_out():
+    cache = ReadThroughCache()
+    trip = {"name": "Paris"}
+    cache.put("trip", trip, cache.epoch())
+    trip["name"] = "changed"
+
+    _, cached = cache.get("trip")
+    cached["name"] = "mutated"
+    assert cache.get("trip") == (True, {"name": "Paris"})
+
+
+def test_expired_entries_and_evictions():
+    cache = ReadThroughCache(max_entries=2, ttl_seconds=60)
+    for key in ("a", "b", "c"):
+        cache.put(key, key, cache.epoch())
+    assert cache.get("a") == (False, None)
+    assert cache.stats["evictions"] == 1
+
+    cache._entries["b"] = ("b", time.monotonic() - 120)
+    assert cache.get("b") == (False, None)
+    assert cache.stats["expired"] == 1
+    assert cache.get("c") == (True, "c")
+
+
+def test_fill_that_raced_an_invalidation_is_discarded():
+    cache = ReadThroughCache()
+    epoch = cache.epoch()
+    # Another writer invalidates while our read is in flight
+    cache.invalidate("trip", from_change_stream=True, lag_seconds=0.2)
+
+    assert not cache.put("trip", {"old": True}, epoch)
+    assert cache.get("trip") == (False, None)
+    metrics = cache.metrics()
+    assert metrics["discarded_fills"] == 1
+    assert metrics["change_stream_invalidations"] == 1
+    assert metrics["invalidation_lag_p50_seconds"] == 0.2
+
+
+def test_invalidate_where_drops_matching_entries():
+    cache = ReadThroughCache()
+    cache.put(("user", "1"), {"_id": "1"}, cache.epoch())
+    cache.put(("user_email", "a@example.com"), {"_id": "1"}, cache.epoch())
+    cache.put(("user", "2"), {"_id": "2"}, cache.epoch())
+
+    assert cache.invalidate_where(lambda key, user: user["_id"] == "1") == 2
+    assert cache.get(("user", "2"))[0]
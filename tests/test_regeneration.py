@@ -0,0 +1,176 @@
+import json
+import asyncio
+from datetime import date
+
+from server.ai_service import AIService
+from server.regeneration import generation_inputs, plan_regeneration
+
+
+def _inputs(start="2025-06-01", end="2025-06-04", destinations=None, **preferences):
+    return {
+        "destination": "Paris",
+        "startDate": start,
+        "endDate": end,
+        "budget": 2000,
+        "travelers": 2,
+        "preferences": {"activities": ["museums"], "dietaryRestrictions": [], **preferences},
+        "destinations": destinations or [],
+    }
+
+
+def _two_cities(second="Lyon", second_places=()):
+    return _inputs(destinations=[
+        {"location": "Paris", "startDate": "2025-06-01", "endDate": "2025-06-02", "placesToVisit": []},
+        {"location": second, "startDate": "2025-06-03", "endDate": "2025-06-04", "placesToVisit": list(second_places)},
+    ])
+
+
+def _itinerary(inputs, days=4):
+    return {
+        "flights": [{"airline": "Air France", "price": 300}],
+        "accommodations": [
+            {"name": "Hotel Paris", "checkIn": "2025-06-01", "checkOut": "2025-06-03", "price": 400},
+            {"name": "Hotel Lyon", "checkIn": "2025-06-03", "checkOut": "2025-06-05", "price": 300},
+        ],
+        "dailyItinerary": [
+            {
+                "day": day,
+                "date": f"2025-06-0{day}",
+                "activities": [{"name": f"Old activity {day}", "cost": 10}],
+                "meals": [{"restaurant": f"Old restaurant {day}", "cost": 30}],
+            }
+            for day in range(1, days + 1)
+        ],
+        "totalCost": {"total": 1160},
+        "generatedFrom": generation_inputs(inputs),
+    }
+
+
+def test_full_regeneration_without_previous_itinerary_or_changes():
+    inputs = _inputs()
+
+    assert plan_regeneration(None, inputs, None).reason == "no previous itinerary"
+    assert plan_regeneration(inputs, dict(inputs), _itinerary(inputs)).reason == "inputs unchanged"
+    assert plan_regeneration(inputs, {**inputs, "budget": 3000}, _itinerary(inputs)).reason == "budget changed"
+
+
+def test_extension_keeps_existing_days_and_adds_new_ones():
+    old = _inputs()
+    plan = plan_regeneration(old, _inputs(end="2025-06-06"), _itinerary(old))
+
+    assert not plan.full
+    assert plan.flights
+    assert plan.kept_days == {1: 1, 2: 2, 3: 3, 4: 4}
+    assert plan.days == {5, 6}
+    assert plan.stays == [("Paris", date(2025, 6, 1), date(2025, 6, 6))]
+
+
+def test_later_start_remaps_kept_days_by_date():
+    old = _inputs()
+    plan = plan_regeneration(old, _inputs(start="2025-06-03", end="2025-06-06"), _itinerary(old))
+
+    # New day 1 is the old day 3 (June 3)
+    assert plan.kept_days == {1: 3, 2: 4}
+    assert plan.days == {3, 4}
+
+
+def test_changed_city_regenerates_only_its_stay_and_days():
+    old = _two_cities()
+    plan = plan_regeneration(old, _two_cities(second="Nice"), _itinerary(old))
+
+    # The flight into Lyon has to become one into Nice
+    assert plan.flights
+    assert plan.stays == [("Nice", date(2025, 6, 3), date(2025, 6, 4))]
+    assert plan.days == {3, 4}
+    assert plan.kept_days == {1: 1, 2: 2}
+
+
+def test_changed_places_regenerate_days_but_keep_the_stay():
+    old = _two_cities()
+    plan = plan_regeneration(old, _two_cities(second_places=["Vieux Lyon"]), _itinerary(old))
+
+    assert not plan.flights
+    assert plan.stays == []
+    assert plan.days == {3, 4}
+
+
+def test_dietary_change_regenerates_meals_of_kept_days():
+    old = _inputs()
+    plan = plan_regeneration(old, _inputs(dietaryRestrictions=["vegan"]), _itinerary(old))
+
+    assert not plan.flights and not plan.stays and not plan.days
+    assert plan.meal_days == {1, 2, 3, 4}
+
+
+def test_regenerated_stay_replaces_only_its_accommodation():
+    old = _two_cities()
+    new = _two_cities(second="Nice")
+    previous = _itinerary(old)
+    plan = plan_regeneration(old, new, previous)
+    service = AIService()
+
+    async def fake_response(prompt, task, output_format=None):
+        return json.dumps({"flights": [{"airline": "Air France", "to": "Nice", "price": 120}], "accommodations": [
+            {"name": "Hotel Nice", "checkIn": "2025-06-03", "checkOut": "2025-06-05", "price": 350},
+        ]})
+
+    async def fake_day(trip_data, day_number):
+        return {"dayItinerary": {"day": day_number, "activities": [{"name": f"Nice {day_number}", "cost": 20}], "meals": []}}
+
+    service._get_ai_response = fake_response
+    service._generate_day_itinerary = fake_day
+    itinerary = asyncio.run(service._regenerate_sections(new, previous, plan))
+
+    assert [acc["name"] for acc in itinerary["accommodations"]] == ["Hotel Paris", "Hotel Nice"]
+    assert [flight.get("to") for flight in itinerary["flights"]] == ["Nice"]
+    assert [day["activities"][0]["name"] for day in itinerary["dailyItinerary"]] == [
+        "Old activity 1", "Old activity 2", "Nice 3", "Nice 4",
+    ]
+    assert itinerary["generatedFrom"]["destinations"][1]["location"] == "Nice"
+
+
+def test_shifted_dates_replace_the_old_accommodation():
+    old = _inputs()
+    new = _inputs(start="2025-06-03", end="2025-06-06")
+    previous = _itinerary(old)
+    previous["accommodations"] = [{"name": "Old Hotel", "checkIn": "2025-06-01", "checkOut": "2025-06-05", "price": 800}]
+    plan = plan_regeneration(old, new, previous)
+    service = AIService()
+
+    async def fake_response(prompt, task, output_format=None):
+        return json.dumps({"flights": [], "accommodations": [
+            {"name": "New Hotel", "checkIn": "2025-06-03", "checkOut": "2025-06-07", "price": 800},
+        ]})
+
+    async def fake_day(trip_data, day_number):
+        return {"dayItinerary": {"day": day_number, "activities": [], "meals": []}}
+
+    service._get_ai_response = fake_response
+    service._generate_day_itinerary = fake_day
+    itinerary = asyncio.run(service._regenerate_sections(new, previous, plan))
+
+    assert [acc["name"] for acc in itinerary["accommodations"]] == ["New Hotel"]
+    assert itinerary["totalCost"]["accommodation"] == 800
+
+
+def test_kept_days_name_the_regenerated_accommodation():
+    old = _inputs(accommodationType="hostel")
+    new = _inputs(accommodationType="hotel")
+    previous = _itinerary(old)
+    previous["accommodations"] = [{"name": "Old Hostel", "checkIn": "2025-06-01", "checkOut": "2025-06-05", "price": 200}]
+    for day in previous["dailyItinerary"]:
+        day["accommodation"] = {"name": "Old Hostel"}
+    plan = plan_regeneration(old, new, previous)
+    service = AIService()
+
+    async def fake_response(prompt, task, output_format=None):
+        return json.dumps({"accommodations": [
+            {"name": "New Hotel", "checkIn": "2025-06-01", "checkOut": "2025-06-05", "price": 800},
+        ]})
+
+    service._get_ai_response = fake_response
+    itinerary = asyncio.run(service._regenerate_sections(new, previous, plan))
+
+    assert plan.kept_days == {1: 1, 2: 2, 3: 3, 4: 4}
+    assert [acc["name"] for acc in itinerary["accommodations"]] == ["New Hotel"]
+    assert [day["accommodation"]["name"] for day in itinerary["dailyItinerary"]] == ["New Hotel"] * 4
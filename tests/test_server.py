@@ -0,0 +1,149 @@
+import os
+import asyncio
+import importlib.util
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+SERVER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "python", "server.py")
+
+TRIP = {"destination": "Paris", "startDate": "2025-06-01", "endDate": "2025-06-03", "budget": 1500}
+
+
+@pytest.fixture
+def server():
+    # Loaded from its path: importing it as "server" would shadow the src/server package
+    spec = importlib.util.spec_from_file_location("itinerai_api", SERVER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.ai_service.prewarmer.enabled = False
+    return module
+
+
+class _SlowGeneration:
+    def __init__(self):
+        self.cancelled = 0
+
+    async def __call__(self, *args, **kwargs):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {}
+
+
+def test_deadline_exceeded_returns_504_and_cancels_generation(server, monkeypatch):
+    generation = _SlowGeneration()
+    monkeypatch.setattr(server.ai_service, "generate_trip_plan", generation)
+
+    response = TestClient(server.app).post("/api/generate-trip-plan", json=TRIP, headers={"X-Request-Timeout-Ms": "50"})
+
+    assert response.status_code == 504
+    assert response.json() == {"detail": "Deadline exceeded"}
+    assert generation.cancelled == 1
+    assert server.ai_service.abandoned["deadline_exceeded"] == 1
+
+
+def test_client_disconnect_returns_499_and_cancels_generation(server, monkeypatch):
+    generation = _SlowGeneration()
+    monkeypatch.setattr(server.ai_service, "generate_day_itinerary", generation)
+
+    async def disconnected(self):
+        return True
+
+    monkeypatch.setattr(Request, "is_disconnected", disconnected)
+
+    response = TestClient(server.app).post("/api/generate-day-itinerary", json={"tripData": TRIP, "dayNumber": 2})
+
+    assert response.status_code == 499
+    assert generation.cancelled == 1
+    assert server.ai_service.abandoned["client_disconnected"] == 1
+
+
+class _Recorder:
+    """Generation stand-in returning `result` and recording its arguments."""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = []
+
+    async def __call__(self, *args):
+        self.calls.append(args)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_generate_trip_plan_passes_trip_data_and_returns_the_itinerary(server, monkeypatch):
+    generation = _Recorder({"dailyItinerary": [{"day": 1}]})
+    monkeypatch.setattr(server.ai_service, "generate_trip_plan", generation)
+
+    response = TestClient(server.app).post(
+        "/api/generate-trip-plan?mode=single",
+        json={**TRIP, "destinations": [{"location": "Paris", "startDate": "2025-06-01", "endDate": "2025-06-03"}]},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"dailyItinerary": [{"day": 1}]}
+    trip_data, mode = generation.calls[0]
+    assert mode == "single"
+    assert trip_data["destination"] == "Paris"
+    assert trip_data["destinations"][0]["location"] == "Paris"
+
+
+def test_generate_day_itinerary_and_regenerate_trip_plan(server, monkeypatch):
+    day = _Recorder({"dayItinerary": {"day": 2}})
+    regenerate = _Recorder({"dailyItinerary": []})
+    monkeypatch.setattr(server.ai_service, "generate_day_itinerary", day)
+    monkeypatch.setattr(server.ai_service, "regenerate_trip_plan", regenerate)
+    client = TestClient(server.app)
+
+    response = client.post("/api/generate-day-itinerary", json={"tripData": TRIP, "dayNumber": 2})
+    assert response.status_code == 200
+    assert response.json() == {"dayItinerary": {"day": 2}}
+    assert day.calls[0][1] == 2
+
+    response = client.post(
+        "/api/regenerate-trip-plan",
+        json={"tripId": "trip-1", "tripData": TRIP, "previousItinerary": {"dailyItinerary": []}},
+    )
+    assert response.status_code == 200
+    trip_id, trip_data, previous = regenerate.calls[0]
+    assert (trip_id, trip_data["destination"], previous) == ("trip-1", "Paris", {"dailyItinerary": []})
+
+
+def test_legacy_travel_plan_endpoint_uses_the_trip_plan_generation(server, monkeypatch):
+    generation = _Recorder({"flights": []})
+    monkeypatch.setattr(server.ai_service, "generate_trip_plan", generation)
+    client = TestClient(server.app)
+
+    response = client.post("/api/generate-travel-plan", json={"tripPreferences": TRIP})
+    assert response.status_code == 200
+    assert response.json() == {"flights": []}
+
+    response = client.post("/api/generate-travel-plan", json={"tripPreferences": {"destination": "Paris"}})
+    assert response.status_code == 422
+
+
+def test_invalid_requests_are_rejected_before_generation(server, monkeypatch):
+    generation = _Recorder({})
+    monkeypatch.setattr(server.ai_service, "generate_trip_plan", generation)
+    monkeypatch.setattr(server.ai_service, "generate_day_itinerary", generation)
+    client = TestClient(server.app)
+
+    assert client.post("/api/generate-trip-plan", json={**TRIP, "startDate": "June 1st"}).status_code == 422
+    assert client.post("/api/generate-trip-plan", json={**TRIP, "budget": -1}).status_code == 422
+    assert client.post("/api/generate-day-itinerary", json={"tripData": TRIP, "dayNumber": 0}).status_code == 422
+    assert generation.calls == []
+
+
+def test_generation_errors_return_500(server, monkeypatch):
+    monkeypatch.setattr(server.ai_service, "generate_trip_plan", _Recorder(error=RuntimeError("upstream exploded")))
+
+    response = TestClient(server.app).post("/api/generate-trip-plan", json=TRIP)
+
+    assert response.status_code == 500
+    assert "upstream exploded" in response.json()["detail"]
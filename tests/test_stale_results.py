@@ -0,0 +1,68 @@
+import time
+import asyncio
+
+from server.stale_results import StaleResultStore
+
+
+def test_serves_a_copy_marked_stale_by_key_or_alias():
+    store = StaleResultStore(max_entries=10)
+    store.put("exact", {"plan": ["day 1"]}, aliases=["same-trip"])
+
+    stale = store.get("exact", reason="circuit_open")
+    assert stale["plan"] == ["day 1"]
+    assert stale["stale"] is True and stale["staleReason"] == "circuit_open"
+    assert "generatedAt" in stale
+
+    stale["plan"].append("mutated")
+    assert store.get("other", aliases=["same-trip"])["plan"] == ["day 1"]
+    assert store.get("other", aliases=["unknown"]) is None
+    assert store.stats["served"] == 2 and store.stats["misses"] == 1
+
+
+def test_expired_and_evicted_results_are_not_served():
+    store = StaleResultStore(max_entries=2, max_age_seconds=60)
+    for key in ("a", "b", "c"):
+        store.put(key, {"key": key})
+    assert store.get("a") is None
+
+    store._entries["b"].stored_at = time.time() - 120
+    assert store.get("b") is None
+    assert store.get("c")["key"] == "c"
+
+
+def test_revalidates_entries_served_stale():
+    store = StaleResultStore(max_entries=10)
+    refreshed = []
+
+    async def refresh():
+        refreshed.append(True)
+        store.put("trip", {"fresh": True}, refresh=refresh)
+
+    async def main():
+        store.put("trip", {"fresh": False}, refresh=refresh)
+        store.put("untouched", {}, refresh=refresh)
+        store.get("trip")
+        store.revalidate()
+        await store._revalidation
+
+    asyncio.run(main())
+    assert refreshed == [True]
+    assert store.stats["revalidated"] == 1
+    assert store.metrics()["pending_revalidation"] == 0
+
+
+def test_failed_revalidation_is_retried_later():
+    store = StaleResultStore(max_entries=10)
+
+    async def refresh():
+        raise RuntimeError("still down")
+
+    async def main():
+        store.put("trip", {}, refresh=refresh)
+        store.get("trip")
+        store.revalidate()
+        await store._revalidation
+
+    asyncio.run(main())
+    assert store.stats["revalidation_failed"] == 1
+    assert store.metrics()["pending_revalidation"] == 1